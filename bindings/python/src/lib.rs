@@ -2,7 +2,7 @@
 // PyO3 0.24 wrapper for ironbase-core
 
 use pyo3::prelude::*;
-use pyo3::types::{PyDict, PyList, PyTuple};
+use pyo3::types::{PyByteArray, PyBytes, PyDict, PyList, PyMapping, PyString, PyTuple};
 use serde_json::Value;
 use std::collections::HashMap;
 use std::sync::Arc;
@@ -19,12 +19,13 @@ pub struct IronBase {
 impl IronBase {
     /// Create or open a database
     #[new]
-    #[pyo3(signature = (path, durability="safe", batch_size=100, auto_checkpoint=None))]
+    #[pyo3(signature = (path, durability="safe", batch_size=100, auto_checkpoint=None, auto_compact=None))]
     fn new(
         path: String,
         durability: &str,
         batch_size: usize,
         auto_checkpoint: Option<usize>,
+        auto_compact: Option<f64>,
     ) -> PyResult<Self> {
         let mode = match durability {
             "safe" => DurabilityMode::Safe,
@@ -44,8 +45,18 @@ impl IronBase {
             }
         };
 
-        let db = DatabaseCore::open_with_durability(&path, mode)
+        if let Some(ratio) = auto_compact {
+            if !(ratio > 0.0 && ratio <= 1.0) {
+                return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(format!(
+                    "Invalid auto_compact ratio {}. Must be in (0, 1]",
+                    ratio
+                )));
+            }
+        }
+
+        let mut db = DatabaseCore::open_with_durability(&path, mode)
             .map_err(|e| PyErr::new::<pyo3::exceptions::PyIOError, _>(e.to_string()))?;
+        db.set_auto_compact(auto_compact);
 
         Ok(IronBase { db: Arc::new(db) })
     }
@@ -94,16 +105,34 @@ impl IronBase {
     }
 
     /// Close and flush database
-    fn close(&self) -> PyResult<()> {
-        self.db
-            .flush()
+    fn close(&self, py: Python<'_>) -> PyResult<()> {
+        let db = &self.db;
+        py.allow_threads(|| db.flush())
             .map_err(|e| PyErr::new::<pyo3::exceptions::PyIOError, _>(e.to_string()))
     }
 
+    /// Context manager entry
+    fn __enter__(slf: PyRef<'_, Self>) -> PyRef<'_, Self> {
+        slf
+    }
+
+    /// Context manager exit - close and flush database
+    #[pyo3(signature = (_exc_type=None, _exc_value=None, _traceback=None))]
+    fn __exit__(
+        &self,
+        py: Python<'_>,
+        _exc_type: Option<PyObject>,
+        _exc_value: Option<PyObject>,
+        _traceback: Option<PyObject>,
+    ) -> PyResult<bool> {
+        self.close(py)?;
+        Ok(false)
+    }
+
     /// Checkpoint - Clear WAL
-    fn checkpoint(&self) -> PyResult<()> {
-        self.db
-            .checkpoint()
+    fn checkpoint(&self, py: Python<'_>) -> PyResult<()> {
+        let db = &self.db;
+        py.allow_threads(|| db.checkpoint())
             .map_err(|e| PyErr::new::<pyo3::exceptions::PyIOError, _>(e.to_string()))
     }
 
@@ -135,9 +164,9 @@ impl IronBase {
 
     /// Storage compaction
     fn compact<'py>(&self, py: Python<'py>) -> PyResult<Bound<'py, PyDict>> {
-        let stats = self
-            .db
-            .compact()
+        let db = &self.db;
+        let stats = py
+            .allow_threads(|| db.compact())
             .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
 
         let dict = PyDict::new(py);
@@ -295,9 +324,10 @@ impl Collection {
             doc_map.insert(key_str, json_value);
         }
 
-        let inserted_id = self
-            .db
-            .insert_one(&self.name, doc_map)
+        // The GIL is released while the write (and its WAL fsync) runs
+        let (db, name) = (&self.db, &self.name);
+        let inserted_id = py
+            .allow_threads(|| db.insert_one(name, doc_map))
             .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
 
         let result = PyDict::new(py);
@@ -308,13 +338,26 @@ impl Collection {
     }
 
     /// Insert many documents
+    ///
+    /// Accepts any iterable of dicts (list, tuple, generator). Each dict is
+    /// converted and released as it is consumed, so a generator expression
+    /// never materializes the whole batch on the Python side. A single
+    /// mapping is rejected rather than iterated by its keys.
     fn insert_many<'py>(
         &self,
         py: Python<'py>,
-        documents: Bound<'_, PyList>,
+        documents: Bound<'_, PyAny>,
     ) -> PyResult<Bound<'py, PyDict>> {
-        let mut docs = Vec::with_capacity(documents.len());
-        for doc in documents.iter() {
+        if documents.downcast::<PyMapping>().is_ok() {
+            return Err(PyErr::new::<pyo3::exceptions::PyTypeError, _>(
+                "insert_many() takes an iterable of documents, not a single document \
+                 (use insert_one() or wrap it in a list)",
+            ));
+        }
+
+        let mut docs = Vec::with_capacity(documents.len().unwrap_or(0));
+        for doc in documents.try_iter()? {
+            let doc = doc?;
             let doc_dict = doc.downcast::<PyDict>()?;
             let mut fields = HashMap::new();
 
@@ -327,23 +370,66 @@ impl Collection {
             docs.push(fields);
         }
 
-        let inserted_ids = self
-            .db
-            .insert_many(&self.name, docs)
-            .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
+        self.insert_docs(py, docs)
+    }
 
-        let result_dict = PyDict::new(py);
-        result_dict.set_item("acknowledged", true)?;
-        result_dict.set_item("inserted_count", inserted_ids.len())?;
+    /// Insert many documents given column-wise
+    ///
+    /// `columns` maps each field name to an iterable of values (list,
+    /// range, NumPy array, ...); row i is built from the i-th value of
+    /// every column, so no per-row dict is created on the Python side.
+    /// All columns must have the same length, and there must be at least
+    /// one. A str or bytes column raises ValueError instead of being split
+    /// into one row per character or byte.
+    fn insert_many_columns<'py>(
+        &self,
+        py: Python<'py>,
+        columns: Bound<'_, PyDict>,
+    ) -> PyResult<Bound<'py, PyDict>> {
+        if columns.is_empty() {
+            return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(
+                "insert_many_columns() requires at least one column",
+            ));
+        }
 
-        let ids_list = PyList::empty(py);
-        for doc_id in inserted_ids {
-            let id_value = doc_id_to_py(py, &doc_id)?;
-            ids_list.append(id_value)?;
+        let mut docs: Vec<HashMap<String, Value>> = Vec::new();
+
+        for (i, (key, column)) in columns.iter().enumerate() {
+            let field: String = key.extract()?;
+            if column.is_instance_of::<PyString>()
+                || column.is_instance_of::<PyBytes>()
+                || column.is_instance_of::<PyByteArray>()
+            {
+                return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(format!(
+                    "Column '{}' must be an iterable of values, not {}",
+                    field,
+                    column.get_type().name()?
+                )));
+            }
+            let mut values = Vec::with_capacity(column.len().unwrap_or(0));
+            for value in column.try_iter()? {
+                values.push(python_to_json(py, &value?)?);
+            }
+
+            if i == 0 {
+                docs = (0..values.len())
+                    .map(|_| HashMap::with_capacity(columns.len()))
+                    .collect();
+            } else if values.len() != docs.len() {
+                return Err(PyErr::new::<pyo3::exceptions::PyValueError, _>(format!(
+                    "Column '{}' has {} values, expected {}",
+                    field,
+                    values.len(),
+                    docs.len()
+                )));
+            }
+
+            for (doc, value) in docs.iter_mut().zip(values) {
+                doc.insert(field.clone(), value);
+            }
         }
-        result_dict.set_item("inserted_ids", ids_list)?;
 
-        Ok(result_dict)
+        self.insert_docs(py, docs)
     }
 
     /// Find documents with options
@@ -441,6 +527,19 @@ impl Collection {
             .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))
     }
 
+    /// Check several filters in one call: one bool per filter, true if any
+    /// document matches it
+    fn exists_many(&self, py: Python<'_>, queries: Bound<'_, PyList>) -> PyResult<Vec<bool>> {
+        let mut query_jsons = Vec::with_capacity(queries.len());
+        for query in queries.iter() {
+            query_jsons.push(python_dict_to_json_value(py, query.downcast::<PyDict>()?)?);
+        }
+
+        self.core
+            .exists_many(&query_jsons)
+            .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))
+    }
+
     /// Distinct values
     fn distinct<'py>(
         &self,
@@ -466,6 +565,34 @@ impl Collection {
         Ok(py_list)
     }
 
+    /// Count documents per field value in one scan: [(value, count), ...]
+    ///
+    /// A list of pairs rather than a dict, so values Python treats as equal
+    /// keys (1, 1.0, True) keep separate counts, and arrays or objects can be
+    /// counted too. Pairs come back in no particular order.
+    fn count_by<'py>(
+        &self,
+        py: Python<'py>,
+        field: &str,
+        query: Option<Bound<'_, PyDict>>,
+    ) -> PyResult<Bound<'py, PyList>> {
+        let query_json = match query {
+            Some(q) => python_dict_to_json_value(py, &q)?,
+            None => serde_json::json!({}),
+        };
+
+        let counts = self
+            .core
+            .count_by(field, &query_json)
+            .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
+
+        let py_list = PyList::empty(py);
+        for (value, count) in counts {
+            py_list.append((json_value_to_python(py, &value)?, count))?;
+        }
+        Ok(py_list)
+    }
+
     /// Update one document
     fn update_one<'py>(
         &self,
@@ -476,9 +603,9 @@ impl Collection {
         let query_json = python_dict_to_json_value(py, &query)?;
         let update_json = python_dict_to_json_value(py, &update)?;
 
-        let (matched_count, modified_count) = self
-            .db
-            .update_one(&self.name, &query_json, &update_json)
+        let (db, name) = (&self.db, &self.name);
+        let (matched_count, modified_count) = py
+            .allow_threads(|| db.update_one(name, &query_json, &update_json))
             .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
 
         let result = PyDict::new(py);
@@ -488,6 +615,27 @@ impl Collection {
         Ok(result)
     }
 
+    /// Update one document and return it after the update (None if no match)
+    fn update_one_returning(
+        &self,
+        py: Python<'_>,
+        query: Bound<'_, PyDict>,
+        update: Bound<'_, PyDict>,
+    ) -> PyResult<PyObject> {
+        let query_json = python_dict_to_json_value(py, &query)?;
+        let update_json = python_dict_to_json_value(py, &update)?;
+
+        let (db, name) = (&self.db, &self.name);
+        let result = py
+            .allow_threads(|| db.update_one_returning(name, &query_json, &update_json))
+            .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
+
+        match result {
+            Some(doc) => Ok(json_to_python_dict(py, &doc)?.into_any().unbind()),
+            None => Ok(py.None()),
+        }
+    }
+
     /// Update many documents
     fn update_many<'py>(
         &self,
@@ -498,9 +646,9 @@ impl Collection {
         let query_json = python_dict_to_json_value(py, &query)?;
         let update_json = python_dict_to_json_value(py, &update)?;
 
-        let (matched_count, modified_count) = self
-            .db
-            .update_many(&self.name, &query_json, &update_json)
+        let (db, name) = (&self.db, &self.name);
+        let (matched_count, modified_count) = py
+            .allow_threads(|| db.update_many(name, &query_json, &update_json))
             .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
 
         let result = PyDict::new(py);
@@ -518,9 +666,9 @@ impl Collection {
     ) -> PyResult<Bound<'py, PyDict>> {
         let query_json = python_dict_to_json_value(py, &query)?;
 
-        let deleted_count = self
-            .db
-            .delete_one(&self.name, &query_json)
+        let (db, name) = (&self.db, &self.name);
+        let deleted_count = py
+            .allow_threads(|| db.delete_one(name, &query_json))
             .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
 
         let result = PyDict::new(py);
@@ -537,9 +685,9 @@ impl Collection {
     ) -> PyResult<Bound<'py, PyDict>> {
         let query_json = python_dict_to_json_value(py, &query)?;
 
-        let deleted_count = self
-            .db
-            .delete_many(&self.name, &query_json)
+        let (db, name) = (&self.db, &self.name);
+        let deleted_count = py
+            .allow_threads(|| db.delete_many(name, &query_json))
             .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
 
         let result = PyDict::new(py);
@@ -680,6 +828,33 @@ impl Collection {
     }
 }
 
+impl Collection {
+    /// Insert converted documents with the GIL released and build the
+    /// `insert_many` result dict
+    fn insert_docs<'py>(
+        &self,
+        py: Python<'py>,
+        docs: Vec<HashMap<String, Value>>,
+    ) -> PyResult<Bound<'py, PyDict>> {
+        let (db, name) = (&self.db, &self.name);
+        let inserted_ids = py
+            .allow_threads(|| db.insert_many(name, docs))
+            .map_err(|e| PyErr::new::<pyo3::exceptions::PyRuntimeError, _>(e.to_string()))?;
+
+        let result_dict = PyDict::new(py);
+        result_dict.set_item("acknowledged", true)?;
+        result_dict.set_item("inserted_count", inserted_ids.len())?;
+
+        let ids_list = PyList::empty(py);
+        for doc_id in inserted_ids {
+            ids_list.append(doc_id_to_py(py, &doc_id)?)?;
+        }
+        result_dict.set_item("inserted_ids", ids_list)?;
+
+        Ok(result_dict)
+    }
+}
+
 /// Cursor for iterating through query results
 #[pyclass]
 pub struct Cursor {
@@ -7,7 +7,6 @@ operations. Run `python crash_stress.py --iterations 10` to execute.
 """
 
 import argparse
-import os
 import random
 import signal
 import subprocess
@@ -15,17 +14,11 @@ import sys
 import time
 
 from ironbase import IronBase
+from test_support import remove_database_files
 
 DEFAULT_DB = "stress_crash.mlite"
 
 
-def cleanup(db_path: str):
-    for ext in (".mlite", ".wal"):
-        target = db_path.replace(".mlite", ext)
-        if os.path.exists(target):
-            os.remove(target)
-
-
 def count_documents(db_path: str) -> int:
     db = IronBase(db_path)
     col = db.collection("stress")
@@ -36,7 +29,7 @@ def count_documents(db_path: str) -> int:
 
 def run_controller(args):
     db_path = args.db
-    cleanup(db_path)
+    remove_database_files(db_path)
     expected_count = 0
     ops_commit = args.ops_commit
     ops_crash = args.ops_crash
@@ -99,7 +92,7 @@ def run_controller(args):
             print("  ✓ State consistent")
 
     print("\nCleaning up...")
-    cleanup(db_path)
+    remove_database_files(db_path)
 
 
 def run_worker(args):
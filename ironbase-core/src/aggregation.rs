@@ -4,7 +4,7 @@
 use crate::document::Document;
 use crate::error::{MongoLiteError, Result};
 use crate::query::Query;
-use crate::value_utils::{canonical_json_string, get_nested_value, set_nested_value};
+use crate::value_utils::{canonical_json_string, get_nested_value, set_nested_value, FieldPath};
 use serde_json::Value;
 use std::collections::{HashMap, HashSet};
 
@@ -33,32 +33,6 @@ fn parse_field_reference(value: &Value, op_name: &str) -> Result<String> {
     }
 }
 
-/// Compute min or max over documents using a comparison function
-///
-/// Used by $min and $max accumulators
-fn compute_extremum<F>(docs: &[Value], field: &str, compare: F) -> Result<Value>
-where
-    F: Fn(f64, f64) -> f64,
-{
-    let mut result: Option<f64> = None;
-
-    for doc in docs {
-        if let Some(value) = get_nested_value(doc, field) {
-            let num = if let Some(n) = value.as_f64() {
-                n
-            } else if let Some(n) = value.as_i64() {
-                n as f64
-            } else {
-                continue;
-            };
-
-            result = Some(result.map_or(num, |r| compare(r, num)));
-        }
-    }
-
-    Ok(result.map(Value::from).unwrap_or(Value::Null))
-}
-
 /// Aggregation pipeline
 #[derive(Debug, Clone)]
 pub struct Pipeline {
@@ -856,27 +830,49 @@ impl GroupStage {
     }
 
     fn execute(&self, docs: Vec<Value>) -> Result<Vec<Value>> {
-        // Step 1: Group documents by _id expression
-        let mut groups: HashMap<String, Vec<Value>> = HashMap::new();
+        // Field references are split into paths once, not per document
+        let id_path = match &self.id {
+            GroupId::Null => None,
+            GroupId::Field(field) => Some(FieldPath::new(field.trim_start_matches('$'))),
+        };
+        let field_paths: Vec<Option<FieldPath>> = self
+            .accumulators
+            .values()
+            .map(Accumulator::field_path)
+            .collect();
+        let initial_states: Vec<AccumulatorState> = self
+            .accumulators
+            .values()
+            .map(AccumulatorState::new)
+            .collect();
+
+        // Step 1: Fold each document into its group's running accumulators
+        // (early aggregation: documents are dropped as soon as they are
+        // consumed instead of being buffered per group)
+        let mut groups: HashMap<String, Vec<AccumulatorState>> = HashMap::new();
 
         for doc in docs {
-            let group_key = self.extract_group_key(&doc)?;
-            groups.entry(group_key).or_default().push(doc);
+            let group_key = Self::extract_group_key(id_path.as_ref(), &doc)?;
+            let states = groups
+                .entry(group_key)
+                .or_insert_with(|| initial_states.clone());
+            for (state, path) in states.iter_mut().zip(&field_paths) {
+                state.add(path.as_ref().and_then(|path| path.get(&doc)));
+            }
         }
 
-        // Step 2: Compute accumulators for each group
-        let mut results = Vec::new();
+        // Step 2: Finish the accumulators of each group
+        let mut results = Vec::with_capacity(groups.len());
 
-        for (key, group_docs) in groups {
+        for (key, states) in groups {
             let mut result = serde_json::Map::new();
 
             // Set _id
             result.insert("_id".to_string(), self.parse_group_key(&key)?);
 
-            // Compute each accumulator
-            for (field, accumulator) in &self.accumulators {
-                let value = accumulator.compute(&group_docs)?;
-                result.insert(field.clone(), value);
+            // States are in the iteration order of self.accumulators
+            for (field, state) in self.accumulators.keys().zip(states) {
+                result.insert(field.clone(), state.finish()?);
             }
 
             results.push(Value::Object(result));
@@ -885,18 +881,15 @@ impl GroupStage {
         Ok(results)
     }
 
-    fn extract_group_key(&self, doc: &Value) -> Result<String> {
-        match &self.id {
-            GroupId::Null => Ok("__all__".to_string()),
-            GroupId::Field(field) => {
-                let field_name = field.trim_start_matches('$');
-                // Use get_nested_value to support dot notation (e.g., "$address.city")
-                if let Some(value) = get_nested_value(doc, field_name) {
-                    Ok(serde_json::to_string(value)?)
-                } else {
-                    Ok("null".to_string())
-                }
-            }
+    /// Group key of `doc`; `id_path` is the `_id` field path (None for `_id: null`)
+    fn extract_group_key(id_path: Option<&FieldPath>, doc: &Value) -> Result<String> {
+        match id_path {
+            None => Ok("__all__".to_string()),
+            // Paths support dot notation (e.g., "$address.city")
+            Some(path) => match path.get(doc) {
+                Some(value) => Ok(serde_json::to_string(value)?),
+                None => Ok("null".to_string()),
+            },
         }
     }
 
@@ -910,6 +903,21 @@ impl GroupStage {
 }
 
 impl Accumulator {
+    /// Path of the field this accumulator reads (None for counters)
+    fn field_path(&self) -> Option<FieldPath> {
+        match self {
+            Accumulator::Count | Accumulator::Sum(SumExpression::Constant(_)) => None,
+            Accumulator::Sum(SumExpression::Field(field))
+            | Accumulator::Avg(field)
+            | Accumulator::Min(field)
+            | Accumulator::Max(field)
+            | Accumulator::First(field)
+            | Accumulator::Last(field)
+            | Accumulator::Push(field)
+            | Accumulator::AddToSet(field) => Some(FieldPath::new(field)),
+        }
+    }
+
     fn from_json(spec: &Value) -> Result<Self> {
         if let Value::Object(obj) = spec {
             if obj.len() != 1 {
@@ -961,57 +969,171 @@ impl Accumulator {
             ))
         }
     }
+}
 
-    fn compute(&self, docs: &[Value]) -> Result<Value> {
+/// Running state of one accumulator within one group
+///
+/// The state only sees the value its accumulator's field resolves to in
+/// each document; field paths are resolved by `GroupStage::execute()`.
+#[derive(Debug, Clone)]
+enum AccumulatorState {
+    Count(i64),
+    SumConstant {
+        value: i64,
+        count: i64,
+    },
+    SumField {
+        sum_int: i64,
+        sum_float: f64,
+        has_float: bool,
+    },
+    Avg {
+        sum: f64,
+        count: usize,
+    },
+    Extremum {
+        compare: fn(f64, f64) -> f64,
+        result: Option<f64>,
+    },
+    First(Option<Option<Value>>),
+    Last(Option<Value>),
+    Push(Vec<Value>),
+    AddToSet {
+        seen: HashSet<String>,
+        values: Vec<Value>,
+    },
+}
+
+impl AccumulatorState {
+    fn new(accumulator: &Accumulator) -> Self {
+        match accumulator {
+            Accumulator::Count => AccumulatorState::Count(0),
+            Accumulator::Sum(SumExpression::Constant(n)) => AccumulatorState::SumConstant {
+                value: *n,
+                count: 0,
+            },
+            Accumulator::Sum(SumExpression::Field(_)) => AccumulatorState::SumField {
+                sum_int: 0,
+                sum_float: 0.0,
+                has_float: false,
+            },
+            Accumulator::Avg(_) => AccumulatorState::Avg { sum: 0.0, count: 0 },
+            Accumulator::Min(_) => AccumulatorState::Extremum {
+                compare: f64::min,
+                result: None,
+            },
+            Accumulator::Max(_) => AccumulatorState::Extremum {
+                compare: f64::max,
+                result: None,
+            },
+            Accumulator::First(_) => AccumulatorState::First(None),
+            Accumulator::Last(_) => AccumulatorState::Last(None),
+            Accumulator::Push(_) => AccumulatorState::Push(Vec::new()),
+            Accumulator::AddToSet(_) => AccumulatorState::AddToSet {
+                seen: HashSet::new(),
+                values: Vec::new(),
+            },
+        }
+    }
+
+    /// Fold one document of the group into the state, given the value of
+    /// the accumulator's field in it (None if missing or no field)
+    fn add(&mut self, field_value: Option<&Value>) {
         match self {
-            Accumulator::Count => Ok(Value::from(docs.len() as i64)),
+            AccumulatorState::Count(count) => *count = count.saturating_add(1),
 
-            Accumulator::Sum(expr) => match expr {
-                SumExpression::Constant(n) => {
-                    Ok(Value::from((*n).saturating_mul(docs.len() as i64)))
+            AccumulatorState::SumConstant { count, .. } => *count = count.saturating_add(1),
+
+            AccumulatorState::SumField {
+                sum_int,
+                sum_float,
+                has_float,
+            } => {
+                if let Some(value) = field_value {
+                    if let Some(n) = value.as_i64() {
+                        *sum_int = sum_int.saturating_add(n);
+                    } else if let Some(f) = value.as_f64() {
+                        *sum_float += f;
+                        *has_float = true;
+                    }
                 }
-                SumExpression::Field(field) => {
-                    let mut sum_int: i64 = 0;
-                    let mut sum_float: f64 = 0.0;
-                    let mut has_float = false;
-
-                    for doc in docs {
-                        // Use get_nested_value to support dot notation (e.g., "$order.total")
-                        if let Some(value) = get_nested_value(doc, field) {
-                            if let Some(n) = value.as_i64() {
-                                sum_int = sum_int.saturating_add(n);
-                            } else if let Some(f) = value.as_f64() {
-                                sum_float += f;
-                                has_float = true;
-                            }
-                        }
+            }
+
+            AccumulatorState::Avg { sum, count } => {
+                if let Some(value) = field_value {
+                    if let Some(n) = value.as_f64() {
+                        *sum += n;
+                        *count = count.saturating_add(1);
+                    } else if let Some(n) = value.as_i64() {
+                        *sum += n as f64;
+                        *count = count.saturating_add(1);
                     }
+                }
+            }
 
-                    if has_float {
-                        Ok(Value::from(sum_float + sum_int as f64))
+            AccumulatorState::Extremum { compare, result } => {
+                if let Some(value) = field_value {
+                    let num = if let Some(n) = value.as_f64() {
+                        n
+                    } else if let Some(n) = value.as_i64() {
+                        n as f64
                     } else {
-                        Ok(Value::from(sum_int))
-                    }
+                        return;
+                    };
+                    let compare = *compare;
+                    *result = Some(result.map_or(num, |r| compare(r, num)));
                 }
-            },
+            }
 
-            Accumulator::Avg(field) => {
-                let mut sum = 0.0;
-                let mut count: usize = 0;
-
-                for doc in docs {
-                    // Use get_nested_value to support dot notation
-                    if let Some(value) = get_nested_value(doc, field) {
-                        if let Some(n) = value.as_f64() {
-                            sum += n;
-                            count = count.saturating_add(1);
-                        } else if let Some(n) = value.as_i64() {
-                            sum += n as f64;
-                            count = count.saturating_add(1);
-                        }
+            AccumulatorState::First(first) => {
+                if first.is_none() {
+                    *first = Some(field_value.cloned());
+                }
+            }
+
+            AccumulatorState::Last(last) => *last = field_value.cloned(),
+
+            AccumulatorState::Push(values) => {
+                // Collect all values from the field into an array
+                if let Some(value) = field_value {
+                    values.push(value.clone());
+                }
+            }
+
+            AccumulatorState::AddToSet { seen, values } => {
+                if let Some(value) = field_value {
+                    // Use canonical JSON string for uniqueness check
+                    // This ensures {"a":1,"b":2} == {"b":2,"a":1}
+                    if seen.insert(canonical_json_string(value)) {
+                        values.push(value.clone());
                     }
                 }
+            }
+        }
+    }
+
+    /// Final value of the accumulator
+    fn finish(self) -> Result<Value> {
+        match self {
+            AccumulatorState::Count(count) => Ok(Value::from(count)),
 
+            AccumulatorState::SumConstant { value, count } => {
+                Ok(Value::from(value.saturating_mul(count)))
+            }
+
+            AccumulatorState::SumField {
+                sum_int,
+                sum_float,
+                has_float,
+            } => {
+                if has_float {
+                    Ok(Value::from(sum_float + sum_int as f64))
+                } else {
+                    Ok(Value::from(sum_int))
+                }
+            }
+
+            AccumulatorState::Avg { sum, count } => {
                 if count > 0 {
                     Ok(Value::from(sum / count as f64))
                 } else {
@@ -1019,55 +1141,21 @@ impl Accumulator {
                 }
             }
 
-            Accumulator::Min(field) => compute_extremum(docs, field, f64::min),
-
-            Accumulator::Max(field) => compute_extremum(docs, field, f64::max),
-
-            Accumulator::First(field) => docs
-                .first()
-                // Use get_nested_value to support dot notation
-                .and_then(|doc| get_nested_value(doc, field).cloned())
-                .ok_or_else(|| {
-                    MongoLiteError::AggregationError("No documents in group".to_string())
-                }),
+            AccumulatorState::Extremum { result, .. } => {
+                Ok(result.map(Value::from).unwrap_or(Value::Null))
+            }
 
-            Accumulator::Last(field) => docs
-                .last()
-                // Use get_nested_value to support dot notation
-                .and_then(|doc| get_nested_value(doc, field).cloned())
-                .ok_or_else(|| {
-                    MongoLiteError::AggregationError("No documents in group".to_string())
-                }),
+            AccumulatorState::First(first) => first.flatten().ok_or_else(|| {
+                MongoLiteError::AggregationError("No documents in group".to_string())
+            }),
 
-            Accumulator::Push(field) => {
-                // Collect all values from the field into an array
-                let values: Vec<Value> = docs
-                    .iter()
-                    .filter_map(|doc| get_nested_value(doc, field).cloned())
-                    .collect();
-                Ok(Value::Array(values))
-            }
+            AccumulatorState::Last(last) => last.ok_or_else(|| {
+                MongoLiteError::AggregationError("No documents in group".to_string())
+            }),
 
-            Accumulator::AddToSet(field) => {
-                // Collect unique values from the field into an array
-                // Use canonical JSON for equality comparison to handle
-                // objects with different key ordering (MongoDB compatible)
-                let mut seen = HashSet::new();
-                let mut values = Vec::new();
-
-                for doc in docs {
-                    if let Some(value) = get_nested_value(doc, field) {
-                        // Use canonical JSON string for uniqueness check
-                        // This ensures {"a":1,"b":2} == {"b":2,"a":1}
-                        let key = canonical_json_string(value);
-                        if seen.insert(key) {
-                            values.push(value.clone());
-                        }
-                    }
-                }
+            AccumulatorState::Push(values) => Ok(Value::Array(values)),
 
-                Ok(Value::Array(values))
-            }
+            AccumulatorState::AddToSet { values, .. } => Ok(Value::Array(values)),
         }
     }
 }
@@ -1105,27 +1193,43 @@ impl SortStage {
         }
     }
 
-    fn execute(&self, mut docs: Vec<Value>) -> Result<Vec<Value>> {
-        docs.sort_by(|a, b| {
-            for (field, direction) in &self.fields {
-                // Use get_nested_value to support dot notation (e.g., "address.city")
-                let val_a = get_nested_value(a, field);
-                let val_b = get_nested_value(b, field);
-
-                let cmp = compare_values(val_a, val_b);
-                let cmp = match direction {
-                    SortDirection::Ascending => cmp,
-                    SortDirection::Descending => cmp.reverse(),
-                };
-
-                if cmp != std::cmp::Ordering::Equal {
-                    return cmp;
+    fn execute(&self, docs: Vec<Value>) -> Result<Vec<Value>> {
+        // Resolve each sort field once per document into a key column, then
+        // sort row indices: comparisons read the columns instead of walking
+        // field paths O(n log n) times
+        let order = {
+            let columns: Vec<Vec<Option<&Value>>> = self
+                .fields
+                .iter()
+                .map(|(field, _)| {
+                    // Dot notation is supported (e.g., "address.city")
+                    let path = FieldPath::new(field);
+                    docs.iter().map(|doc| path.get(doc)).collect()
+                })
+                .collect();
+
+            let mut order: Vec<usize> = (0..docs.len()).collect();
+            // Stable, like sorting the documents directly
+            order.sort_by(|&a, &b| {
+                for (column, (_, direction)) in columns.iter().zip(&self.fields) {
+                    let cmp = compare_values(column[a], column[b]);
+                    let cmp = match direction {
+                        SortDirection::Ascending => cmp,
+                        SortDirection::Descending => cmp.reverse(),
+                    };
+
+                    if cmp != std::cmp::Ordering::Equal {
+                        return cmp;
+                    }
                 }
-            }
-            std::cmp::Ordering::Equal
-        });
+                std::cmp::Ordering::Equal
+            });
+            order
+        };
 
-        Ok(docs)
+        // Gather the documents in sorted order
+        let mut slots: Vec<Option<Value>> = docs.into_iter().map(Some).collect();
+        Ok(order.into_iter().filter_map(|i| slots[i].take()).collect())
     }
 }
 
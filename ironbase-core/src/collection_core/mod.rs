@@ -5,12 +5,12 @@ use std::sync::Arc;
 
 use parking_lot::RwLock;
 use serde_json::Value;
-use std::collections::{HashMap, HashSet};
+use std::collections::{BTreeSet, HashMap, HashSet};
 
 use crate::document::{Document, DocumentId};
 use crate::error::{MongoLiteError, Result};
 use crate::index::{IndexKey, IndexManager};
-use crate::query::Query;
+use crate::query::CompiledFilter;
 use crate::query_cache::{QueryCache, QueryHash};
 use crate::query_planner::{QueryPlan, QueryPlanner};
 use crate::storage::{RawStorage, Storage};
@@ -34,6 +34,15 @@ pub struct InsertManyResult {
     pub inserted_count: usize,
 }
 
+/// Before/after images of a document changed by update_one_returning_raw
+#[derive(Debug, Clone)]
+pub(crate) struct UpdatedDocument {
+    pub id: DocumentId,
+    pub old: Value,
+    /// `None` if the update operators left the document unchanged
+    pub new: Option<Value>,
+}
+
 /// Query execution context extracted from FindOptions
 /// Single Responsibility: Transform user options into execution strategy
 #[derive(Debug)]
@@ -145,7 +154,8 @@ pub struct CollectionCore<S: Storage + RawStorage> {
     pub storage: Arc<RwLock<S>>,
     /// Index manager for B+ tree indexes
     pub indexes: Arc<RwLock<IndexManager>>,
-    /// Query result cache with LRU eviction (capacity: 1000 queries)
+    /// Query result cache with LRU eviction (capacity: 1000 queries),
+    /// shared by every handle `DatabaseCore::collection()` returns
     pub query_cache: Arc<QueryCache>,
     schema: Arc<RwLock<Option<CompiledSchema>>>,
 }
@@ -155,6 +165,19 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
 
     /// Create new collection (or get existing)
     pub fn new(name: String, storage: Arc<RwLock<S>>) -> Result<Self> {
+        Self::with_query_cache(name, storage, Arc::new(QueryCache::new(1000)))
+    }
+
+    /// Create new collection (or get existing) using an existing query cache
+    ///
+    /// Cached results are keyed by collection name, so one cache can serve
+    /// every collection of a database; writes through any handle then
+    /// invalidate the results all other handles see.
+    pub(crate) fn with_query_cache(
+        name: String,
+        storage: Arc<RwLock<S>>,
+        query_cache: Arc<QueryCache>,
+    ) -> Result<Self> {
         // Collection létrehozása, ha nem létezik
         {
             let mut storage_guard = storage.write();
@@ -332,7 +355,7 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
             name,
             storage,
             indexes: Arc::new(RwLock::new(index_manager)),
-            query_cache: Arc::new(QueryCache::new(1000)), // LRU cache with 1000 query capacity
+            query_cache,
             schema: Arc::new(RwLock::new(compiled_schema)),
         })
     }
@@ -485,27 +508,22 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
 
     /// Find one document matching query
     pub fn find_one(&self, query_json: &Value) -> Result<Option<Value>> {
-        let parsed_query = Query::from_json(query_json)?;
-
-        // OPTIMIZATION: Check if this is an _id equality query (O(1) lookup)
-        if let Some(query_obj) = query_json.as_object() {
-            if query_obj.len() == 1 && query_obj.contains_key("_id") {
-                if let Some(id_val) = query_obj.get("_id") {
-                    // Direct O(1) lookup using document_catalog (direct DocumentId conversion!)
-                    if let Ok(doc_id) = serde_json::from_value::<DocumentId>(id_val.clone()) {
-                        if let Some(doc) = self.read_document_by_id(&doc_id)? {
-                            // Verify query still matches (for consistency)
-                            let doc_json_str = serde_json::to_string(&doc)?;
-                            let document = Document::from_json(&doc_json_str)?;
-
-                            if parsed_query.matches(&document) {
-                                return Ok(Some(doc));
-                            }
-                        }
-                    }
-                    return Ok(None);
-                }
-            }
+        // OPTIMIZATION: {"_id": <scalar>} is a direct document_catalog probe
+        // (O(1), no query parsing or re-matching). Operator filters on _id
+        // such as {"_id": {"$gt": 5}} fall through to the general path.
+        if let Some(doc_id) = Self::extract_id_query(query_json) {
+            return self.read_document_by_id(&doc_id);
+        }
+
+        let filter = CompiledFilter::new(query_json);
+
+        // Equality/range filters on an indexed field only need to verify the
+        // first index hit instead of scanning the whole catalog.
+        if let Some(doc_ids) = self.index_candidates(&filter, query_json, Some(1))? {
+            return match doc_ids.first() {
+                Some(doc_id) => self.read_document_by_id(doc_id),
+                None => Ok(None),
+            };
         }
 
         // Fallback: Full scan using catalog iteration (still faster than file scan)
@@ -513,16 +531,13 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
 
         // Find first matching document (skip tombstones)
         for (_, doc) in docs_by_id {
-            let doc_json_str = match serde_json::to_string(&doc) {
-                Ok(json) => json,
-                Err(_) => continue,
-            };
-            let document = match Document::from_json(&doc_json_str) {
+            let document = match Document::from_value(&doc) {
                 Ok(doc) => doc,
                 Err(_) => continue,
             };
 
-            if parsed_query.matches(&document) {
+            // Invalid filters match nothing
+            if filter.matches(&document).unwrap_or(false) {
                 return Ok(Some(doc));
             }
         }
@@ -545,7 +560,7 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
             });
         }
 
-        let parsed_query = Query::from_json(query_json)?;
+        let filter = CompiledFilter::new(query_json);
 
         // OPTIMIZATION: Use catalog iteration instead of full file scan
         let docs_by_id = self.scan_documents_via_catalog()?;
@@ -553,10 +568,9 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
         // Count matching documents (skip tombstones already filtered by catalog scan)
         let mut count = 0u64;
         for (_, doc) in docs_by_id {
-            let doc_json_str = serde_json::to_string(&doc)?;
-            let document = Document::from_json(&doc_json_str)?;
+            let document = Document::from_value(&doc)?;
 
-            if parsed_query.matches(&document) {
+            if filter.matches(&document).unwrap_or(false) {
                 count += 1;
             }
         }
@@ -564,6 +578,51 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
         Ok(count)
     }
 
+    /// Check several filters at once: `result[i]` is true if any document
+    /// matches `queries[i]`
+    ///
+    /// `{}` and `{"_id": <value>}` filters are answered from the live count
+    /// and the catalog. All other filters share a single collection scan,
+    /// which stops as soon as each of them has matched.
+    pub fn exists_many(&self, queries: &[Value]) -> Result<Vec<bool>> {
+        let mut found = vec![false; queries.len()];
+        let mut pending = Vec::new();
+
+        for (i, query_json) in queries.iter().enumerate() {
+            if Self::query_matches_all(query_json) {
+                let storage = self.storage.read();
+                found[i] = storage.get_live_count(&self.name).unwrap_or(0) > 0;
+            } else if let Some(doc_id) = Self::extract_id_query(query_json) {
+                found[i] = self.read_document_by_id(&doc_id)?.is_some();
+            } else {
+                pending.push((i, CompiledFilter::new(query_json)));
+            }
+        }
+
+        if pending.is_empty() {
+            return Ok(found);
+        }
+
+        let docs_by_id = self.scan_documents_via_catalog()?;
+        for (_, doc) in docs_by_id {
+            let document = Document::from_value(&doc)?;
+            pending.retain(|(i, filter)| {
+                // Invalid filters match nothing, as in find()
+                if filter.matches(&document).unwrap_or(false) {
+                    found[*i] = true;
+                    false
+                } else {
+                    true
+                }
+            });
+            if pending.is_empty() {
+                break;
+            }
+        }
+
+        Ok(found)
+    }
+
     // =========================================================================
     // HELPER FUNCTIONS (Extracted for reduced CC and cognitive complexity)
     // =========================================================================
@@ -630,10 +689,10 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
         }
 
         let match_all = Self::query_matches_all(query_json);
-        let parsed_query = if match_all {
+        let filter = if match_all {
             None
         } else {
-            Some(Query::from_json(query_json)?)
+            Some(CompiledFilter::new(query_json))
         };
 
         let docs_by_id = self.scan_documents_via_catalog()?;
@@ -652,10 +711,9 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
                 continue;
             }
 
-            let matches = if let Some(query) = &parsed_query {
-                let doc_json_str = serde_json::to_string(&doc)?;
-                let document = Document::from_json(&doc_json_str)?;
-                query.matches(&document)
+            let matches = if let Some(filter) = &filter {
+                let document = Document::from_value(&doc)?;
+                filter.matches(&document).unwrap_or(false)
             } else {
                 true
             };
@@ -675,6 +733,43 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
         Ok(distinct_values)
     }
 
+    /// Count matching documents per value of a (dot-notation) field
+    ///
+    /// One collection scan instead of one `count_documents` per value.
+    /// Values come back in no particular order; documents without the
+    /// field are not counted.
+    pub fn count_by(&self, field: &str, query_json: &Value) -> Result<Vec<(Value, u64)>> {
+        let filter = if Self::query_matches_all(query_json) {
+            None
+        } else {
+            Some(CompiledFilter::new(query_json))
+        };
+
+        let docs_by_id = self.scan_documents_via_catalog()?;
+
+        let mut slots: HashMap<String, usize> = HashMap::new();
+        let mut counts: Vec<(Value, u64)> = Vec::new();
+        for (_, doc) in docs_by_id {
+            if let Some(filter) = &filter {
+                let document = Document::from_value(&doc)?;
+                if !filter.matches(&document).unwrap_or(false) {
+                    continue;
+                }
+            }
+
+            if let Some(field_value) = get_nested_value(&doc, field) {
+                let value_key = serde_json::to_string(field_value)?;
+                let slot = *slots.entry(value_key).or_insert_with(|| {
+                    counts.push((field_value.clone(), 0));
+                    counts.len() - 1
+                });
+                counts[slot].1 += 1;
+            }
+        }
+
+        Ok(counts)
+    }
+
     // ========== PRIVATE HELPER METHODS ==========
 
     /// Extract field name from index name (e.g., "users_age" -> "age")
@@ -751,9 +846,8 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
     }
 
     /// Execute query using an index
-    fn find_with_index(&self, parsed_query: Query, plan: QueryPlan) -> Result<Vec<Value>> {
-        let (doc_ids, _) =
-            self.collect_doc_ids_from_plan(&parsed_query, plan, None, false, 0, None)?;
+    fn find_with_index(&self, filter: &CompiledFilter<'_>, plan: QueryPlan) -> Result<Vec<Value>> {
+        let (doc_ids, _) = self.collect_doc_ids_from_plan(filter, plan, None, false, 0, None)?;
         let mut results = Vec::with_capacity(doc_ids.len());
         for doc_id in doc_ids {
             if let Some(doc) = self.read_document_by_id(&doc_id)? {
@@ -929,6 +1023,39 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
         let mut indexes = self.indexes.write();
         let id_index_name = format!("{}_id", self.name);
 
+        // Check every unique index before changing any of them: a duplicate,
+        // either already indexed or repeated within the batch, must not
+        // leave the documents before it indexed without a stored record
+        for index_name in indexes.list_indexes() {
+            if let Some(index) = indexes.get_btree_index(&index_name) {
+                if !index.metadata.unique {
+                    continue;
+                }
+
+                let mut batch_keys = BTreeSet::new();
+                for doc in docs {
+                    let key = if index_name == id_index_name {
+                        Some(match &doc.id {
+                            DocumentId::Int(i) => IndexKey::Int(*i),
+                            DocumentId::String(s) => IndexKey::String(s.clone()),
+                            DocumentId::ObjectId(oid) => IndexKey::String(oid.clone()),
+                        })
+                    } else {
+                        doc.get(&index.metadata.field).map(IndexKey::from)
+                    };
+
+                    if let Some(key) = key {
+                        if index.search(&key).is_some() || !batch_keys.insert(key.clone()) {
+                            return Err(MongoLiteError::IndexError(format!(
+                                "Duplicate key: {:?} in field '{}' (unique index)",
+                                key, index.metadata.field
+                            )));
+                        }
+                    }
+                }
+            }
+        }
+
         for doc in docs {
             // Add to _id index
             if let Some(id_index) = indexes.get_btree_index_mut(&id_index_name) {
@@ -1353,7 +1480,7 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
 
     /// Find with manual index hint
     pub fn find_with_hint(&self, query_json: &Value, hint: &str) -> Result<Vec<Value>> {
-        let parsed_query = Query::from_json(query_json)?;
+        let filter = CompiledFilter::new(query_json);
 
         // Verify hint index exists
         {
@@ -1374,7 +1501,7 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
         let plan = self.create_plan_for_hint(query_json, hint, &field)?;
 
         // Execute with the forced plan
-        self.find_with_index(parsed_query, plan)
+        self.find_with_index(&filter, plan)
     }
 
     // ========== AGGREGATION ==========
@@ -2034,7 +2161,7 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
             }
         }
 
-        let parsed_query = Query::from_json(query_json)?;
+        let filter = CompiledFilter::new(query_json);
 
         let plan = if let Some(hint_name) = hint {
             let field = self.extract_field_from_index_name(hint_name);
@@ -2047,7 +2174,7 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
         };
 
         let (doc_ids_vec, used_sort) = if let Some(plan) = plan {
-            self.collect_doc_ids_from_plan(&parsed_query, plan, sort_field, sort_desc, skip, limit)?
+            self.collect_doc_ids_from_plan(&filter, plan, sort_field, sort_desc, skip, limit)?
         } else {
             // Fallback to full scan using catalog
             let docs_by_id = self.scan_documents_via_catalog()?;
@@ -2063,7 +2190,8 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
                 // Avoids Value → String → Document round-trip serialization
                 let document = Document::from_value(&doc)?;
 
-                if parsed_query.matches(&document) {
+                // Invalid filters match nothing
+                if filter.matches(&document).unwrap_or(false) {
                     if skipped < skip {
                         skipped += 1;
                         continue;
@@ -2088,9 +2216,36 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
         Ok((doc_ids_vec, used_sort))
     }
 
+    /// Resolve matching document ids through a B+ tree index
+    ///
+    /// Returns `None` when the planner finds no usable index, so the caller
+    /// can fall back to a catalog scan. Index hits are verified against the
+    /// full filter before they are returned.
+    fn index_candidates(
+        &self,
+        filter: &CompiledFilter<'_>,
+        query_json: &Value,
+        limit: Option<usize>,
+    ) -> Result<Option<Vec<DocumentId>>> {
+        let plan = {
+            let indexes = self.indexes.read();
+            let available_indexes = indexes.list_indexes();
+            QueryPlanner::analyze_query(query_json, &available_indexes).map(|(_, plan)| plan)
+        };
+
+        match plan {
+            None | Some(QueryPlan::CollectionScan) => Ok(None),
+            Some(plan) => {
+                let (doc_ids, _) =
+                    self.collect_doc_ids_from_plan(filter, plan, None, false, 0, limit)?;
+                Ok(Some(doc_ids))
+            }
+        }
+    }
+
     fn collect_doc_ids_from_plan(
         &self,
-        parsed_query: &Query,
+        filter: &CompiledFilter<'_>,
         plan: QueryPlan,
         sort_field: Option<&str>,
         sort_desc: bool,
@@ -2150,10 +2305,9 @@ impl<S: Storage + RawStorage> CollectionCore<S> {
 
         for doc_id in doc_ids {
             if let Some(doc) = self.read_document_by_id(&doc_id)? {
-                let doc_json_str = serde_json::to_string(&doc)?;
-                let document = Document::from_json(&doc_json_str)?;
+                let document = Document::from_value(&doc)?;
 
-                if parsed_query.matches(&document) {
+                if filter.matches(&document).unwrap_or(false) {
                     if skipped < skip {
                         skipped += 1;
                         continue;
@@ -18,10 +18,10 @@ use serde_json::Value;
 
 use crate::document::{Document, DocumentId};
 use crate::error::{MongoLiteError, Result};
-use crate::query::Query;
+use crate::query::CompiledFilter;
 use crate::storage::{RawStorage, Storage};
 
-use super::{CollectionCore, InsertManyResult};
+use super::{CollectionCore, InsertManyResult, UpdatedDocument};
 
 /// Private module that seals the trait
 mod sealed {
@@ -56,6 +56,15 @@ pub(crate) trait RawOperations: sealed::Sealed {
     /// Update one document WITHOUT WAL protection
     fn update_one_raw(&self, query: &Value, update: &Value) -> Result<(u64, u64)>;
 
+    /// Update one document WITHOUT WAL protection, returning what changed
+    ///
+    /// `None` if nothing matched; `new` is `None` if the match was left unchanged.
+    fn update_one_returning_raw(
+        &self,
+        query: &Value,
+        update: &Value,
+    ) -> Result<Option<UpdatedDocument>>;
+
     /// Update many documents WITHOUT WAL protection
     fn update_many_raw(&self, query: &Value, update: &Value) -> Result<(u64, u64)>;
 
@@ -155,12 +164,8 @@ impl<S: Storage + RawStorage> RawOperations for CollectionCore<S> {
             .get_collection_meta_mut(&self.name)
             .ok_or_else(|| MongoLiteError::CollectionNotFound(self.name.clone()))?;
 
-        // Get starting ID for auto-generation (don't pre-reserve)
-        let start_id = meta.last_id;
-
         // Prepare all documents with IDs
         let mut prepared_docs = Vec::with_capacity(documents.len());
-        let mut auto_id_count = 0u64;
         for mut fields in documents.into_iter() {
             // Check if _id already exists in fields (same logic as insert_one)
             let doc_id = if let Some(existing_id) = fields.get("_id") {
@@ -182,9 +187,10 @@ impl<S: Storage + RawStorage> RawOperations for CollectionCore<S> {
 
                 parsed_id
             } else {
-                // Auto-generate new _id only if not provided
-                let new_id = DocumentId::new_auto(start_id + auto_id_count);
-                auto_id_count += 1;
+                // Auto-generate new _id only if not provided, from the running
+                // last_id so it cannot collide with a manual _id seen earlier
+                let new_id = DocumentId::new_auto(meta.last_id);
+                meta.last_id += 1;
                 fields.insert("_id".to_string(), serde_json::to_value(&new_id).unwrap());
                 new_id
             };
@@ -199,9 +205,6 @@ impl<S: Storage + RawStorage> RawOperations for CollectionCore<S> {
             inserted_ids.push(doc_id);
         }
 
-        // Update last_id with max of manual + auto-generated IDs
-        meta.last_id = meta.last_id.max(start_id + auto_id_count);
-
         // Update indexes in batch BEFORE writing to storage
         let docs_for_index: Vec<Document> =
             prepared_docs.iter().map(|(_, doc)| doc.clone()).collect();
@@ -232,7 +235,25 @@ impl<S: Storage + RawStorage> RawOperations for CollectionCore<S> {
     /// Update one document (raw, no WAL) - use DatabaseCore::update_one for durability
     /// Returns (matched_count, modified_count)
     fn update_one_raw(&self, query_json: &Value, update_json: &Value) -> Result<(u64, u64)> {
-        let parsed_query = Query::from_json(query_json)?;
+        let counts = match self.update_one_returning_raw(query_json, update_json)? {
+            None => (0, 0),
+            Some(updated) if updated.new.is_none() => (1, 0),
+            Some(_) => (1, 1),
+        };
+        Ok(counts)
+    }
+
+    /// Update one document (raw, no WAL) and return its before/after images
+    ///
+    /// The first candidate is re-read and re-matched under the storage write
+    /// lock, which is then held until the new version is written, so a
+    /// concurrent writer cannot change or delete it in between.
+    fn update_one_returning_raw(
+        &self,
+        query_json: &Value,
+        update_json: &Value,
+    ) -> Result<Option<UpdatedDocument>> {
+        let filter = CompiledFilter::new(query_json);
 
         // OPTIMIZATION: Check if this is an _id equality query (O(1) lookup)
         let docs_by_id = if let Some(query_obj) = query_json.as_object() {
@@ -253,6 +274,15 @@ impl<S: Storage + RawStorage> RawOperations for CollectionCore<S> {
                 } else {
                     self.scan_documents_via_catalog()?
                 }
+            } else if let Some(doc_ids) = self.index_candidates(&filter, query_json, Some(1))? {
+                // Indexed field: only the first verified index hit is loaded
+                let mut single_doc_map = HashMap::new();
+                for doc_id in doc_ids {
+                    if let Some(doc) = self.read_document_by_id(&doc_id)? {
+                        single_doc_map.insert(doc_id, doc);
+                    }
+                }
+                single_doc_map
             } else {
                 // Fallback: Full scan using catalog iteration
                 self.scan_documents_via_catalog()?
@@ -262,82 +292,96 @@ impl<S: Storage + RawStorage> RawOperations for CollectionCore<S> {
         };
 
         // Find first matching and update (skip tombstones already filtered by catalog scan)
-        let mut matched = 0u64;
-        let mut modified = 0u64;
         let mut storage = self.storage.write();
 
-        for (_, doc) in docs_by_id {
-            if matched > 0 {
-                break; // Only update first match
+        for (doc_id, candidate) in docs_by_id {
+            // Cheap pre-check on the unlocked read
+            if !filter
+                .matches(&Document::from_value(&candidate)?)
+                .unwrap_or(false)
+            {
+                continue;
             }
 
-            let doc_json_str = serde_json::to_string(&doc)?;
-            let mut document = Document::from_json(&doc_json_str)?;
-
-            // Check if matches query
-            if parsed_query.matches(&document) {
-                matched = 1;
-
-                // Save original document for index removal
-                let original_document = document.clone();
-
-                // Apply update operators
-                let was_modified = self.apply_update_operators(&mut document, update_json)?;
+            // Re-read under the lock: the candidate may have changed since
+            let offset = match storage
+                .get_collection_meta(&self.name)
+                .and_then(|meta| meta.document_catalog.get(&doc_id).copied())
+            {
+                Some(offset) => offset,
+                None => continue,
+            };
+            let doc: Value = serde_json::from_slice(&storage.read_data(offset)?)?;
+            if doc
+                .get("_tombstone")
+                .and_then(|v| v.as_bool())
+                .unwrap_or(false)
+            {
+                continue;
+            }
 
-                if was_modified {
-                    // ✅ Ensure updated document has _collection before constraint check
-                    document.set("_collection".to_string(), Value::String(self.name.clone()));
+            let mut document = Document::from_value(&doc)?;
 
-                    // 🔒 CHECK UNIQUE CONSTRAINTS BEFORE ANY CHANGES
-                    // exclude_id = Some to allow updating same document's non-key fields
-                    self.check_index_constraints(&document, Some(&document.id))?;
+            // Check if it still matches the query (invalid filters match nothing)
+            if !filter.matches(&document).unwrap_or(false) {
+                continue;
+            }
 
-                    // Release storage lock for index operations
-                    drop(storage);
+            // Save original document for index removal
+            let original_document = document.clone();
 
-                    // 📤 REMOVE OLD DOCUMENT FROM INDEXES
-                    self.remove_from_indexes(&original_document)?;
+            // Apply update operators
+            if !self.apply_update_operators(&mut document, update_json)? {
+                return Ok(Some(UpdatedDocument {
+                    id: doc_id,
+                    old: doc,
+                    new: None,
+                }));
+            }
 
-                    // 📥 ADD UPDATED DOCUMENT TO INDEXES
-                    self.add_to_indexes(&document)?;
+            // ✅ Ensure updated document has _collection before constraint check
+            document.set("_collection".to_string(), Value::String(self.name.clone()));
 
-                    // Re-acquire storage lock
-                    storage = self.storage.write();
+            // 🔒 CHECK UNIQUE CONSTRAINTS BEFORE ANY CHANGES
+            // exclude_id = Some to allow updating same document's non-key fields
+            self.check_index_constraints(&document, Some(&document.id))?;
+            self.validate_document(&document)?;
 
-                    // Mark old document as tombstone
-                    let mut tombstone = doc.clone();
-                    if let Value::Object(ref mut map) = tombstone {
-                        map.insert("_tombstone".to_string(), Value::Bool(true));
-                        map.insert("_collection".to_string(), Value::String(self.name.clone()));
-                    }
-                    let tombstone_json = serde_json::to_string(&tombstone)?;
+            // 📤 REMOVE OLD DOCUMENT FROM INDEXES
+            self.remove_from_indexes(&original_document)?;
 
-                    // Write tombstone (no catalog tracking for tombstones)
-                    storage.write_data(tombstone_json.as_bytes())?;
+            // 📥 ADD UPDATED DOCUMENT TO INDEXES
+            self.add_to_indexes(&document)?;
 
-                    self.validate_document(&document)?;
+            // Mark old document as tombstone
+            let mut tombstone = doc.clone();
+            if let Value::Object(ref mut map) = tombstone {
+                map.insert("_tombstone".to_string(), Value::Bool(true));
+                map.insert("_collection".to_string(), Value::String(self.name.clone()));
+            }
+            let tombstone_json = serde_json::to_string(&tombstone)?;
 
-                    // Write updated document WITH catalog tracking
-                    let updated_json = document.to_json()?;
-                    storage.write_document_raw(
-                        &self.name,
-                        &document.id,
-                        updated_json.as_bytes(),
-                    )?;
-                    storage.adjust_live_count(&self.name, -1);
-                    storage.adjust_live_count(&self.name, 1);
+            // Write tombstone (no catalog tracking for tombstones)
+            storage.write_data(tombstone_json.as_bytes())?;
 
-                    modified = 1;
-                }
-            }
-        }
+            // Write updated document WITH catalog tracking
+            let updated_json = document.to_json()?;
+            storage.write_document_raw(&self.name, &document.id, updated_json.as_bytes())?;
+            storage.adjust_live_count(&self.name, -1);
+            storage.adjust_live_count(&self.name, 1);
+            drop(storage);
 
-        // Invalidate query cache if any document was modified
-        if modified > 0 {
+            // Invalidate query cache
             self.query_cache.invalidate_collection(&self.name);
+
+            return Ok(Some(UpdatedDocument {
+                id: doc_id,
+                old: doc,
+                new: Some(serde_json::from_str(&updated_json)?),
+            }));
         }
 
-        Ok((matched, modified))
+        Ok(None)
     }
 
     /// Update many documents (raw, no WAL) - use DatabaseCore::update_many for durability
@@ -378,8 +422,7 @@ impl<S: Storage + RawStorage> RawOperations for CollectionCore<S> {
             matched += 1;
 
             // Deserialize with proper _id handling
-            let doc_json_str = serde_json::to_string(&doc)?;
-            let mut document = Document::from_json(&doc_json_str)?;
+            let mut document = Document::from_value(&doc)?;
 
             // Save original document for index removal
             let original_document = document.clone();
@@ -432,7 +475,7 @@ impl<S: Storage + RawStorage> RawOperations for CollectionCore<S> {
     /// Delete one document (raw, no WAL) - use DatabaseCore::delete_one for durability
     /// Returns deleted_count
     fn delete_one_raw(&self, query_json: &Value) -> Result<u64> {
-        let parsed_query = Query::from_json(query_json)?;
+        let filter = CompiledFilter::new(query_json);
 
         // OPTIMIZATION: Try O(1) _id lookup first, fallback to full scan
         let docs_by_id = match self.try_id_query_optimization(query_json)? {
@@ -449,11 +492,10 @@ impl<S: Storage + RawStorage> RawOperations for CollectionCore<S> {
                 break; // Only delete first match
             }
 
-            let doc_json_str = serde_json::to_string(&doc)?;
-            let document = Document::from_json(&doc_json_str)?;
+            let document = Document::from_value(&doc)?;
 
-            // Check if matches query
-            if parsed_query.matches(&document) {
+            // Check if matches query (invalid filters match nothing)
+            if filter.matches(&document).unwrap_or(false) {
                 // Remove from all indexes BEFORE deleting
                 // Drop storage lock temporarily to avoid potential deadlock
                 drop(storage);
@@ -487,7 +529,8 @@ impl<S: Storage + RawStorage> RawOperations for CollectionCore<S> {
     /// Delete many documents (raw, no WAL) - use DatabaseCore::delete_many for durability
     /// Returns deleted_count
     fn delete_many_raw(&self, query_json: &Value) -> Result<u64> {
-        let parsed_query = Query::from_json(query_json)?;
+        // Resolve the filter once; it is tested against every document
+        let filter = CompiledFilter::new(query_json);
         let docs_by_id = self.scan_documents_via_catalog()?;
         let mut storage = self.storage.write();
 
@@ -503,11 +546,10 @@ impl<S: Storage + RawStorage> RawOperations for CollectionCore<S> {
                 continue;
             }
 
-            let doc_json_str = serde_json::to_string(&doc)?;
-            let document = Document::from_json(&doc_json_str)?;
+            let document = Document::from_value(&doc)?;
 
-            // Check if matches query
-            if parsed_query.matches(&document) {
+            // Check if matches query (invalid filters match nothing)
+            if filter.matches(&document).unwrap_or(false) {
                 // Remove from all indexes BEFORE deleting
                 // Drop storage lock temporarily to avoid potential deadlock
                 drop(storage);
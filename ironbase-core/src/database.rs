@@ -11,6 +11,7 @@ use crate::collection_core::{CollectionCore, RawOperations};
 use crate::document::DocumentId;
 use crate::durability::DurabilityMode;
 use crate::error::Result;
+use crate::query_cache::QueryCache;
 use crate::storage::{MemoryStorage, RawStorage, Storage, StorageEngine};
 use crate::transaction::{Operation, Transaction, TransactionId};
 use serde_json::Value;
@@ -42,6 +43,11 @@ fn convert_index_key(tx_key: &crate::transaction::IndexKey) -> crate::index::Ind
     }
 }
 
+/// Minimum number of stored records before auto-compaction is considered
+///
+/// Keeps small databases from being rewritten on every delete.
+pub const AUTO_COMPACT_MIN_RECORDS: u64 = 1000;
+
 /// Pure Rust IronBase Database - language-independent
 ///
 /// Generic over Storage backend:
@@ -65,6 +71,12 @@ pub struct DatabaseCore<S: Storage + RawStorage> {
 
     // NEW: Operation counter for Unsafe mode auto-checkpoint
     unsafe_op_counter: AtomicU64,
+
+    // Dead-record ratio that triggers compaction after deletes (None = manual only)
+    auto_compact_ratio: Option<f64>,
+
+    // Query result cache shared by all collection handles of this database
+    query_cache: Arc<QueryCache>,
 }
 
 // ============================================================================
@@ -95,6 +107,8 @@ impl DatabaseCore<StorageEngine> {
             durability_mode: DurabilityMode::default(), // Safe mode by default
             batch_buffer: Arc::new(RwLock::new(Vec::new())),
             unsafe_op_counter: AtomicU64::new(0),
+            auto_compact_ratio: None,
+            query_cache: Arc::new(QueryCache::default()),
         };
 
         // Apply recovered index changes to collections
@@ -193,6 +207,8 @@ impl DatabaseCore<StorageEngine> {
             durability_mode: mode,
             batch_buffer: Arc::new(RwLock::new(Vec::new())),
             unsafe_op_counter: AtomicU64::new(0),
+            auto_compact_ratio: None,
+            query_cache: Arc::new(QueryCache::default()),
         };
 
         // Apply recovered index changes to collections
@@ -247,6 +263,51 @@ impl DatabaseCore<StorageEngine> {
         storage.compact()
     }
 
+    /// Enable or disable automatic compaction after deletes
+    ///
+    /// When set, every delete that removes at least one document checks the
+    /// fraction of dead records in the file (tombstones and superseded
+    /// versions) and runs `compact()` once it exceeds `ratio`. Databases with
+    /// fewer than `AUTO_COMPACT_MIN_RECORDS` records are never auto-compacted.
+    pub fn set_auto_compact(&mut self, ratio: Option<f64>) {
+        self.auto_compact_ratio = ratio;
+    }
+
+    /// Get the auto-compaction threshold (None = manual compaction only)
+    pub fn auto_compact_ratio(&self) -> Option<f64> {
+        self.auto_compact_ratio
+    }
+
+    /// Compact if the dead-record ratio exceeds the configured threshold
+    fn maybe_auto_compact(&self) -> Result<()> {
+        let threshold = match self.auto_compact_ratio {
+            Some(ratio) => ratio,
+            None => return Ok(()),
+        };
+
+        let (total, live) = {
+            let storage = self.storage.read();
+            storage
+                .list_collections()
+                .iter()
+                .filter_map(|name| storage.get_collection_meta(name))
+                .fold((0u64, 0u64), |(total, live), meta| {
+                    (total + meta.document_count, live + meta.live_document_count)
+                })
+        };
+
+        if total < AUTO_COMPACT_MIN_RECORDS {
+            return Ok(());
+        }
+
+        let dead = total.saturating_sub(live);
+        if dead as f64 / total as f64 > threshold {
+            self.compact()?;
+        }
+
+        Ok(())
+    }
+
     /// Commit a transaction (applies all buffered operations atomically) - StorageEngine-specific
     pub fn commit_transaction(&self, tx_id: TransactionId) -> Result<()> {
         // Remove transaction from active list
@@ -263,6 +324,7 @@ impl DatabaseCore<StorageEngine> {
         // Commit through storage engine
         let mut storage = self.storage.write();
         storage.commit_transaction(&mut transaction)?;
+        self.invalidate_cached_queries(&transaction);
 
         Ok(())
     }
@@ -303,10 +365,24 @@ impl DatabaseCore<StorageEngine> {
         // Commit through storage engine with index operations
         let mut storage = self.storage.write();
         storage.commit_transaction(&mut transaction)?;
+        self.invalidate_cached_queries(&transaction);
 
         Ok(())
     }
 
+    /// Drop cached query results of every collection a committed
+    /// transaction wrote to (its operations bypass `CollectionCore`)
+    fn invalidate_cached_queries(&self, transaction: &Transaction) {
+        for operation in transaction.operations() {
+            let collection = match operation {
+                Operation::Insert { collection, .. }
+                | Operation::Update { collection, .. }
+                | Operation::Delete { collection, .. } => collection,
+            };
+            self.query_cache.invalidate_collection(collection);
+        }
+    }
+
     // ========== Auto-Commit Transaction Helpers (StorageEngine-specific, INTERNAL) ==========
 
     /// Begin an auto-transaction (internal use only for auto-commit mode)
@@ -629,6 +705,66 @@ impl DatabaseCore<StorageEngine> {
         }
     }
 
+    /// Update one document and return it as it is after the update
+    ///
+    /// Same durability as `update_one()`. The match, the update and the
+    /// returned document all come from one pass in the collection, made under
+    /// its storage write lock, so a concurrent writer cannot slip in between.
+    /// Returns None if no document matches, or the document unchanged if the
+    /// update did not modify it.
+    pub fn update_one_returning(
+        &self,
+        collection_name: &str,
+        query: &Value,
+        update: &Value,
+    ) -> Result<Option<Value>> {
+        let collection = self.collection(collection_name)?;
+        let updated = match collection.update_one_returning_raw(query, update)? {
+            Some(updated) => updated,
+            None => return Ok(None),
+        };
+        let new_doc = match updated.new {
+            Some(new_doc) => new_doc,
+            None => return Ok(Some(updated.old)),
+        };
+
+        let op = Operation::Update {
+            collection: collection_name.to_string(),
+            doc_id: updated.id,
+            old_doc: updated.old,
+            new_doc: new_doc.clone(),
+        };
+
+        match self.durability_mode {
+            DurabilityMode::Safe => {
+                let mut auto_tx = self.begin_auto_transaction();
+                auto_tx.add_operation(op)?;
+                auto_tx.mark_operations_applied();
+                self.commit_auto_transaction(auto_tx)?;
+            }
+
+            DurabilityMode::Batch { .. } => {
+                if self.add_to_batch(op)? {
+                    self.flush_batch()?;
+                }
+            }
+
+            DurabilityMode::Unsafe {
+                auto_checkpoint_ops,
+            } => {
+                if let Some(threshold) = auto_checkpoint_ops {
+                    let count = self.unsafe_op_counter.fetch_add(1, Ordering::Relaxed) + 1;
+                    if count >= threshold as u64 {
+                        self.unsafe_op_counter.store(0, Ordering::Relaxed);
+                        self.checkpoint()?;
+                    }
+                }
+            }
+        }
+
+        Ok(Some(new_doc))
+    }
+
     /// Delete one document with WAL durability
     ///
     /// This method wraps delete_one with proper WAL logging for crash recovery.
@@ -636,6 +772,14 @@ impl DatabaseCore<StorageEngine> {
     ///
     /// Returns deleted_count
     pub fn delete_one(&self, collection_name: &str, query: &Value) -> Result<u64> {
+        let deleted = self.delete_one_durable(collection_name, query)?;
+        if deleted > 0 {
+            self.maybe_auto_compact()?;
+        }
+        Ok(deleted)
+    }
+
+    fn delete_one_durable(&self, collection_name: &str, query: &Value) -> Result<u64> {
         match self.durability_mode {
             DurabilityMode::Safe => {
                 let collection = self.collection(collection_name)?;
@@ -760,29 +904,16 @@ impl DatabaseCore<StorageEngine> {
             DurabilityMode::Safe => {
                 let collection = self.collection(collection_name)?;
                 let mut auto_tx = self.begin_auto_transaction();
-                let mut inserted_ids = Vec::with_capacity(documents.len());
-
-                for document in documents {
-                    let doc_id = collection.insert_one_raw(document.clone())?;
-
-                    // Add full document to WAL
-                    let mut doc_with_metadata = document.clone();
-                    doc_with_metadata
-                        .insert("_id".to_string(), serde_json::to_value(&doc_id).unwrap());
-                    doc_with_metadata.insert(
-                        "_collection".to_string(),
-                        Value::String(collection_name.to_string()),
-                    );
-                    let doc_value = serde_json::to_value(&doc_with_metadata)
-                        .map_err(|e| crate::error::MongoLiteError::Serialization(e.to_string()))?;
 
+                // One bulk insert (single storage lock, batched index update),
+                // then one WAL operation per document in a single commit
+                let inserted_ids = collection.insert_many_raw(documents.clone())?.inserted_ids;
+                for (document, doc_id) in documents.into_iter().zip(&inserted_ids) {
                     auto_tx.add_operation(Operation::Insert {
                         collection: collection_name.to_string(),
                         doc_id: doc_id.clone(),
-                        doc: doc_value,
+                        doc: Self::insert_wal_doc(collection_name, document, doc_id)?,
                     })?;
-
-                    inserted_ids.push(doc_id);
                 }
 
                 auto_tx.mark_operations_applied();
@@ -793,32 +924,18 @@ impl DatabaseCore<StorageEngine> {
 
             DurabilityMode::Batch { .. } => {
                 let collection = self.collection(collection_name)?;
-                let mut inserted_ids = Vec::with_capacity(documents.len());
-
-                for document in documents {
-                    let doc_id = collection.insert_one_raw(document.clone())?;
-
-                    let mut doc_with_metadata = document.clone();
-                    doc_with_metadata
-                        .insert("_id".to_string(), serde_json::to_value(&doc_id).unwrap());
-                    doc_with_metadata.insert(
-                        "_collection".to_string(),
-                        Value::String(collection_name.to_string()),
-                    );
-                    let doc_value = serde_json::to_value(&doc_with_metadata)
-                        .map_err(|e| crate::error::MongoLiteError::Serialization(e.to_string()))?;
 
+                let inserted_ids = collection.insert_many_raw(documents.clone())?.inserted_ids;
+                for (document, doc_id) in documents.into_iter().zip(&inserted_ids) {
                     let should_flush = self.add_to_batch(Operation::Insert {
                         collection: collection_name.to_string(),
                         doc_id: doc_id.clone(),
-                        doc: doc_value,
+                        doc: Self::insert_wal_doc(collection_name, document, doc_id)?,
                     })?;
 
                     if should_flush {
                         self.flush_batch()?;
                     }
-
-                    inserted_ids.push(doc_id);
                 }
 
                 Ok(inserted_ids)
@@ -828,12 +945,7 @@ impl DatabaseCore<StorageEngine> {
                 auto_checkpoint_ops,
             } => {
                 let collection = self.collection(collection_name)?;
-                let mut inserted_ids = Vec::with_capacity(documents.len());
-
-                for document in documents {
-                    let doc_id = collection.insert_one_raw(document)?;
-                    inserted_ids.push(doc_id);
-                }
+                let inserted_ids = collection.insert_many_raw(documents)?.inserted_ids;
 
                 if let Some(threshold) = auto_checkpoint_ops {
                     let count = self
@@ -851,6 +963,21 @@ impl DatabaseCore<StorageEngine> {
         }
     }
 
+    /// Build the WAL copy of an inserted document (fields + `_id` + `_collection`)
+    fn insert_wal_doc(
+        collection_name: &str,
+        mut document: HashMap<String, Value>,
+        doc_id: &DocumentId,
+    ) -> Result<Value> {
+        document.insert("_id".to_string(), serde_json::to_value(doc_id).unwrap());
+        document.insert(
+            "_collection".to_string(),
+            Value::String(collection_name.to_string()),
+        );
+        serde_json::to_value(&document)
+            .map_err(|e| crate::error::MongoLiteError::Serialization(e.to_string()))
+    }
+
     /// Update multiple documents with WAL durability
     ///
     /// Each document update is logged to the WAL for crash recovery.
@@ -986,6 +1113,14 @@ impl DatabaseCore<StorageEngine> {
     ///
     /// Returns deleted_count
     pub fn delete_many(&self, collection_name: &str, query: &Value) -> Result<u64> {
+        let deleted = self.delete_many_durable(collection_name, query)?;
+        if deleted > 0 {
+            self.maybe_auto_compact()?;
+        }
+        Ok(deleted)
+    }
+
+    fn delete_many_durable(&self, collection_name: &str, query: &Value) -> Result<u64> {
         match self.durability_mode {
             DurabilityMode::Safe => {
                 let collection = self.collection(collection_name)?;
@@ -1173,6 +1308,8 @@ impl DatabaseCore<MemoryStorage> {
             durability_mode: DurabilityMode::default(),
             batch_buffer: Arc::new(RwLock::new(Vec::new())),
             unsafe_op_counter: AtomicU64::new(0),
+            auto_compact_ratio: None,
+            query_cache: Arc::new(QueryCache::default()),
         })
     }
 
@@ -1254,7 +1391,11 @@ impl DatabaseCore<MemoryStorage> {
 impl<S: Storage + RawStorage> DatabaseCore<S> {
     /// Get collection (creates if doesn't exist)
     pub fn collection(&self, name: &str) -> Result<CollectionCore<S>> {
-        CollectionCore::new(name.to_string(), Arc::clone(&self.storage))
+        CollectionCore::with_query_cache(
+            name.to_string(),
+            Arc::clone(&self.storage),
+            Arc::clone(&self.query_cache),
+        )
     }
 
     /// Set or clear JSON schema for a collection
@@ -1272,7 +1413,9 @@ impl<S: Storage + RawStorage> DatabaseCore<S> {
     /// Drop collection
     pub fn drop_collection(&self, name: &str) -> Result<()> {
         let mut storage = self.storage.write();
-        storage.drop_collection(name)
+        storage.drop_collection(name)?;
+        self.query_cache.invalidate_collection(name);
+        Ok(())
     }
 
     /// Flush all changes to disk
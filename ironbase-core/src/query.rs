@@ -41,7 +41,7 @@ use crate::error::Result;
 use serde_json::Value;
 
 // Re-export the new operator-based matching function (primary API)
-pub use operators::matches_filter;
+pub use operators::{matches_filter, CompiledFilter};
 
 /// Query - Simplified wrapper around JSON query filters
 ///
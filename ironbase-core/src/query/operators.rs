@@ -1469,6 +1469,130 @@ pub fn matches_filter(document: &Document, filter: &Value) -> Result<bool> {
     Ok(true)
 }
 
+// ============================================================================
+// COMPILED FILTERS
+// ============================================================================
+
+/// One field condition with its operators resolved from the registry
+struct FieldCondition<'f> {
+    key: &'f str,
+    operators: Vec<(&'static dyn OperatorMatcher, &'f Value)>,
+    /// Evaluation rank of the cheapest operator (see `operator_rank()`)
+    rank: u8,
+}
+
+/// Static evaluation order for compiled conditions
+///
+/// The conditions of a filter are ANDed, so any order gives the same result;
+/// checking equality before `$in`, ranges and negations lets the most
+/// selective condition reject a document before the others are evaluated.
+fn operator_rank(op_name: &str) -> u8 {
+    match op_name {
+        "$eq" => 0,
+        "$in" => 1,
+        "$gt" | "$gte" | "$lt" | "$lte" => 2,
+        "$ne" | "$nin" => 3,
+        _ => 4,
+    }
+}
+
+/// A filter resolved once for matching many documents
+///
+/// `matches_filter()` re-walks the filter JSON and looks every operator up in
+/// the registry for each document. Scans that test the same filter against
+/// every document in a collection compile it first: plain field conditions
+/// (`{"city": "NYC"}`, `{"age": {"$lt": 35}}`) are resolved to operator
+/// references up front. Filters with top-level logical operators, `$regex`,
+/// `$**` wildcards or anything else unusual keep using `matches_filter()`,
+/// so results are identical either way.
+pub struct CompiledFilter<'f> {
+    filter: &'f Value,
+    fields: Option<Vec<FieldCondition<'f>>>,
+}
+
+impl<'f> CompiledFilter<'f> {
+    /// Resolve `filter` for repeated matching
+    pub fn new(filter: &'f Value) -> Self {
+        CompiledFilter {
+            filter,
+            fields: Self::compile_fields(filter),
+        }
+    }
+
+    fn compile_fields(filter: &'f Value) -> Option<Vec<FieldCondition<'f>>> {
+        let mut fields = Vec::new();
+        for (key, value) in filter.as_object()? {
+            if key.starts_with('$') {
+                return None;
+            }
+            let (operators, rank) = match value {
+                Value::Object(condition_obj) => {
+                    let mut ranked = Vec::with_capacity(condition_obj.len());
+                    for (op_name, op_value) in condition_obj {
+                        if op_name == "$regex" || op_name == "$options" {
+                            return None;
+                        }
+                        let operator = OPERATOR_REGISTRY.get(op_name.as_str())?;
+                        ranked.push((operator_rank(op_name), &**operator, op_value));
+                    }
+                    // {"$gt": 50, "$lt": 500}: a failed bound skips the other
+                    ranked.sort_by_key(|&(rank, _, _)| rank);
+                    let rank = ranked.first().map_or(0, |&(rank, _, _)| rank);
+                    let operators = ranked
+                        .into_iter()
+                        .map(|(_, operator, op_value)| (operator, op_value))
+                        .collect();
+                    (operators, rank)
+                }
+                _ => (
+                    vec![(&EqOperator as &'static dyn OperatorMatcher, value)],
+                    0,
+                ),
+            };
+            fields.push(FieldCondition {
+                key,
+                operators,
+                rank,
+            });
+        }
+        fields.sort_by_key(|field| field.rank);
+        Some(fields)
+    }
+
+    /// Check a document against the filter (same semantics as `matches_filter()`)
+    pub fn matches(&self, document: &Document) -> Result<bool> {
+        let fields = match &self.fields {
+            Some(fields) => fields,
+            None => return matches_filter(document, self.filter),
+        };
+
+        for field in fields {
+            // Same value resolution as matches_filter(): implicit array
+            // flattening first, plain get() as the fallback
+            let doc_values = document.get_all(field.key);
+            for &(operator, op_value) in &field.operators {
+                let matched = if doc_values.is_empty() {
+                    operator.matches(document.get(field.key), op_value, Some(document))?
+                } else {
+                    let mut any_match = false;
+                    for dv in &doc_values {
+                        if operator.matches(Some(*dv), op_value, Some(document))? {
+                            any_match = true;
+                            break;
+                        }
+                    }
+                    any_match
+                };
+                if !matched {
+                    return Ok(false);
+                }
+            }
+        }
+
+        Ok(true)
+    }
+}
+
 #[cfg(test)]
 mod tests {
     use super::*;
@@ -2525,4 +2649,72 @@ mod tests {
         assert!(matches_filter(&doc2, &filter).unwrap()); // Bob starts with B
         assert!(matches_filter(&doc3, &filter).unwrap()); // Charlie starts with C
     }
+
+    // ========== Compiled filter tests ==========
+
+    #[test]
+    fn test_compiled_filter_matches_interpreter() {
+        let docs = vec![
+            create_test_document(1, vec![("age", json!(30)), ("city", json!("NYC"))]),
+            create_test_document(2, vec![("age", json!(40)), ("city", json!("LA"))]),
+            create_test_document(3, vec![("age", json!([20, 50])), ("tags", json!(["a"]))]),
+            create_test_document(4, vec![("name", json!({"first": "Ann"}))]),
+        ];
+        let filters = vec![
+            json!({}),
+            json!({"city": "NYC"}),
+            json!({"age": {"$lt": 35}}),
+            json!({"age": {"$gte": 30, "$lt": 45}}),
+            json!({"age": {"$in": [40, 50]}}),
+            json!({"city": {"$exists": false}}),
+            json!({"name.first": "Ann"}),
+            json!({"tags": "a"}),
+            json!({"$or": [{"city": "LA"}, {"age": 20}]}),
+            json!({"city": {"$regex": "^n", "$options": "i"}}),
+        ];
+
+        for filter in &filters {
+            let compiled = CompiledFilter::new(filter);
+            for doc in &docs {
+                assert_eq!(
+                    compiled.matches(doc).unwrap(),
+                    matches_filter(doc, filter).unwrap(),
+                    "filter {} on document {:?}",
+                    filter,
+                    doc.id
+                );
+            }
+        }
+    }
+
+    #[test]
+    fn test_compiled_filter_orders_conditions_by_rank() {
+        let filter = json!({
+            "age": {"$ne": 5, "$lt": 50},
+            "city": {"$in": ["NYC", "LA"]},
+            "name": "Ann"
+        });
+        let compiled = CompiledFilter::new(&filter);
+        let fields = compiled.fields.as_ref().unwrap();
+        let keys: Vec<&str> = fields.iter().map(|field| field.key).collect();
+        assert_eq!(keys, vec!["name", "city", "age"]);
+        assert_eq!(fields[2].operators[0].1, &json!(50));
+
+        let doc = create_test_document(
+            1,
+            vec![
+                ("age", json!(30)),
+                ("city", json!("LA")),
+                ("name", json!("Ann")),
+            ],
+        );
+        assert!(compiled.matches(&doc).unwrap());
+    }
+
+    #[test]
+    fn test_compiled_filter_unknown_operator_errors() {
+        let filter = json!({"age": {"$bogus": 1}});
+        let doc = create_test_document(1, vec![("age", json!(1))]);
+        assert!(CompiledFilter::new(&filter).matches(&doc).is_err());
+    }
 }
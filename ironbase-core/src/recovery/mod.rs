@@ -17,7 +17,7 @@ use std::path::Path;
 
 use crate::error::Result;
 use crate::storage::{RawStorage, Storage};
-use crate::wal::{TransactionGrouper, WALEntryIterator, WriteAheadLog};
+use crate::wal::{wal_reader, TransactionGrouper, WALEntryIterator, WriteAheadLog};
 
 /// Combined statistics from WAL recovery
 #[derive(Debug, Default, Clone)]
@@ -73,7 +73,6 @@ impl RecoveryCoordinator {
         storage: &mut S,
     ) -> Result<(RecoveryStats, Vec<RecoveredIndexChange>)> {
         use std::fs::File;
-        use std::io::BufReader;
 
         let mut stats = RecoveryStats::default();
         let mut all_index_changes = Vec::new();
@@ -85,7 +84,7 @@ impl RecoveryCoordinator {
 
         // Open WAL and create streaming iterator
         let file = File::open(wal_path)?;
-        let reader = BufReader::new(file);
+        let reader = wal_reader(file);
         let entry_iter = WALEntryIterator::new(reader)?;
 
         // Create transaction grouper for streaming aggregation
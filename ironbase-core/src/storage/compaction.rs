@@ -2,22 +2,60 @@
 // Storage compaction functionality
 
 use super::StorageEngine;
-use crate::error::Result;
+use crate::error::{MongoLiteError, Result};
 use serde_json::Value;
 use std::collections::HashMap;
-use std::fs::{self, OpenOptions};
-use std::io::{Seek, SeekFrom, Write};
+use std::fs::{self, File, OpenOptions};
+use std::io::{BufReader, Read, Seek, SeekFrom, Write};
 
 /// Compaction configuration
 #[derive(Debug, Clone)]
 pub struct CompactionConfig {
     /// Number of documents to process in memory at once (default: 1000)
     pub chunk_size: usize,
+    /// Read buffer for scanning the old file (default: 1MB)
+    pub read_buffer_size: usize,
+    /// Worker threads that check a chunk for tombstones (default: available cores, 1 = serial)
+    pub scan_threads: usize,
 }
 
 impl Default for CompactionConfig {
     fn default() -> Self {
-        CompactionConfig { chunk_size: 1000 }
+        CompactionConfig {
+            chunk_size: 1000,
+            read_buffer_size: 1024 * 1024,
+            scan_threads: std::thread::available_parallelism()
+                .map(|n| n.get())
+                .unwrap_or(1),
+        }
+    }
+}
+
+/// Minimum records per scan thread; smaller chunks are checked serially
+const MIN_RECORDS_PER_SCAN_THREAD: usize = 256;
+
+/// Outcome of checking one stored record during compaction
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+enum RecordKind {
+    Live,
+    Tombstone,
+    Unparseable,
+}
+
+/// Only the tombstone flag is decoded; every other field is skipped
+#[derive(serde::Deserialize)]
+struct TombstoneProbe {
+    #[serde(default, rename = "_tombstone")]
+    tombstone: Option<Value>,
+}
+
+fn classify_record(doc_bytes: &[u8]) -> RecordKind {
+    match serde_json::from_slice::<TombstoneProbe>(doc_bytes) {
+        Ok(probe) if probe.tombstone.and_then(|v| v.as_bool()).unwrap_or(false) => {
+            RecordKind::Tombstone
+        }
+        Ok(_) => RecordKind::Live,
+        Err(_) => RecordKind::Unparseable,
     }
 }
 
@@ -80,15 +118,15 @@ impl StorageEngine {
         )?;
 
         // 3. Write metadata at end of file
-        Self::write_compacted_metadata(
+        // The temp file was created empty, so its end is exactly the bytes
+        // written: no fstat/ftruncate needed to learn or fix its size
+        stats.size_after = Self::write_compacted_metadata(
             &mut new_file,
             &self.header,
             &new_collections,
             write_offset,
         )?;
 
-        stats.size_after = new_file.metadata()?.len();
-
         // 4. Finalize: close files, rename, reload
         let temp_path = format!("{}.compact", self.file_path);
         self.finalize_compaction(&temp_path, new_file)?;
@@ -155,8 +193,10 @@ impl StorageEngine {
 
     /// Scan documents from catalogs and write to new file with chunk-based flushing
     ///
-    /// Iterates over all collection catalogs (not sequential file scan) and writes
-    /// live documents to the new file. Uses chunked processing to limit memory usage.
+    /// Gathers every catalog entry into one array sorted by file offset, then
+    /// walks it once: the old file is read front-to-back and live documents are
+    /// appended to the new file in the same order. Uses chunked processing to
+    /// limit memory usage.
     ///
     /// Returns the final write offset (where metadata should be written)
     fn scan_and_flush_documents(
@@ -170,114 +210,161 @@ impl StorageEngine {
     ) -> Result<u64> {
         let mut write_offset = super::HEADER_SIZE;
 
-        // Track documents per collection (all collections processed in single pass)
-        let mut collection_docs: HashMap<String, HashMap<crate::document::DocumentId, Value>> =
-            HashMap::new();
-        for coll_name in collections_snapshot.keys() {
-            collection_docs.insert(coll_name.clone(), HashMap::new());
-        }
-
         // CATALOG-BASED ITERATION (instead of sequential file scan)
-        // The catalog is the source of truth for document locations
-        // This avoids sequential scan assumptions and handles gaps correctly
-        let mut chunk_count = 0;
-
-        for (coll_name, coll_meta) in collections_snapshot.iter() {
-            // Iterate catalog instead of scanning file sequentially
-            for (doc_id, &offset) in &coll_meta.document_catalog {
-                // Validate offset is before metadata (sanity check)
-                if offset >= file_len {
+        // The catalog is the source of truth for document locations; sorting
+        // by offset turns the per-document reads into one sequential pass
+        let mut entries: Vec<(u64, &str, &crate::document::DocumentId)> = collections_snapshot
+            .iter()
+            .flat_map(|(coll_name, coll_meta)| {
+                coll_meta
+                    .document_catalog
+                    .iter()
+                    .map(move |(doc_id, &offset)| (offset, coll_name.as_str(), doc_id))
+            })
+            .collect();
+        entries.sort_unstable_by_key(|&(offset, _, _)| offset);
+
+        // Catalog offsets are sorted, so reads go through one large buffer
+        // with forward skips: the kernel sees a few big sequential reads
+        // instead of a seek + read pair per document
+        let data_len = self.file_len()?;
+        let mut reader = BufReader::with_capacity(config.read_buffer_size, self.file.try_clone()?);
+        let mut position = reader.seek(SeekFrom::Start(0))?;
+
+        let chunk_size = config.chunk_size.max(1);
+        let mut chunk: Vec<(&str, &crate::document::DocumentId, Vec<u8>)> =
+            Vec::with_capacity(chunk_size);
+        let mut chunk_bytes: u64 = 0;
+
+        for &(offset, coll_name, doc_id) in &entries {
+            // Validate offset is before metadata (sanity check)
+            if offset >= file_len {
+                crate::log_warn!(
+                    "Skipping document {:?} at invalid offset {} (file_len: {})",
+                    doc_id,
+                    offset,
+                    file_len
+                );
+                stats.tombstones_removed += 1;
+                continue;
+            }
+
+            // Read document at catalog-specified offset
+            match Self::read_compaction_record(&mut reader, &mut position, offset, data_len) {
+                Ok(doc_bytes) => {
+                    stats.documents_scanned += 1;
+                    chunk_bytes += doc_bytes.len() as u64;
+                    chunk.push((coll_name, doc_id, doc_bytes));
+
+                    // If chunk is full, flush it
+                    if chunk.len() >= chunk_size {
+                        stats.peak_memory_mb =
+                            stats.peak_memory_mb.max(chunk_bytes / (1024 * 1024));
+                        write_offset = Self::flush_compaction_chunk(
+                            new_file,
+                            new_collections,
+                            &mut chunk,
+                            write_offset,
+                            config.scan_threads,
+                            stats,
+                        )?;
+                        chunk_bytes = 0;
+                    }
+                }
+                Err(e) => {
+                    // Log corrupt document but continue
                     crate::log_warn!(
-                        "Skipping document {:?} at invalid offset {} (file_len: {})",
+                        "Skipping corrupt document {:?} at offset {}: {}",
                         doc_id,
                         offset,
-                        file_len
+                        e
                     );
                     stats.tombstones_removed += 1;
-                    continue;
-                }
-
-                // Read document at catalog-specified offset
-                match self.read_data(offset) {
-                    Ok(doc_bytes) => {
-                        stats.documents_scanned += 1;
-
-                        if let Ok(doc) = serde_json::from_slice::<Value>(&doc_bytes) {
-                            if let Some(docs_by_id) = collection_docs.get_mut(coll_name.as_str()) {
-                                // Track memory usage
-                                let doc_size_bytes = doc_bytes.len() as u64;
-                                let current_memory_bytes = docs_by_id.len() as u64 * doc_size_bytes;
-                                let current_memory_mb = current_memory_bytes / (1024 * 1024);
-                                if current_memory_mb > stats.peak_memory_mb {
-                                    stats.peak_memory_mb = current_memory_mb;
-                                }
-
-                                docs_by_id.insert(doc_id.clone(), doc);
-                                chunk_count += 1;
-
-                                // If chunk is full, flush all collections
-                                if chunk_count >= config.chunk_size {
-                                    for (flush_coll_name, docs) in collection_docs.iter_mut() {
-                                        if !docs.is_empty() {
-                                            write_offset = self.flush_compaction_chunk(
-                                                new_file,
-                                                new_collections,
-                                                flush_coll_name,
-                                                docs,
-                                                write_offset,
-                                                stats,
-                                            )?;
-                                            docs.clear();
-                                        }
-                                    }
-                                    chunk_count = 0;
-                                }
-                            }
-                        }
-                    }
-                    Err(e) => {
-                        // Log corrupt document but continue
-                        crate::log_warn!(
-                            "Skipping corrupt document {:?} at offset {}: {}",
-                            doc_id,
-                            offset,
-                            e
-                        );
-                        stats.tombstones_removed += 1;
-                    }
                 }
             }
         }
 
-        // Flush remaining documents for all collections
-        for (coll_name, docs) in collection_docs.iter_mut() {
-            if !docs.is_empty() {
-                write_offset = self.flush_compaction_chunk(
-                    new_file,
-                    new_collections,
-                    coll_name,
-                    docs,
-                    write_offset,
-                    stats,
-                )?;
-            }
-        }
+        // Flush remaining documents
+        stats.peak_memory_mb = stats.peak_memory_mb.max(chunk_bytes / (1024 * 1024));
+        write_offset = Self::flush_compaction_chunk(
+            new_file,
+            new_collections,
+            &mut chunk,
+            write_offset,
+            config.scan_threads,
+            stats,
+        )?;
 
         new_file.sync_all()?;
 
         Ok(write_offset)
     }
 
+    /// Read one length-prefixed document during the compaction scan
+    ///
+    /// Same checks as `read_data()`, but reads through the shared scan buffer.
+    /// `position` tracks the reader's offset so forward seeks stay in-buffer.
+    fn read_compaction_record(
+        reader: &mut BufReader<File>,
+        position: &mut u64,
+        offset: u64,
+        data_len: u64,
+    ) -> Result<Vec<u8>> {
+        if offset + 4 > data_len {
+            return Err(MongoLiteError::Corruption(format!(
+                "Insufficient space to read length header at offset {} (file: {} bytes)",
+                offset, data_len
+            )));
+        }
+
+        let mut read = || -> Result<Vec<u8>> {
+            reader.seek_relative(offset as i64 - *position as i64)?;
+            *position = offset;
+
+            let mut len_bytes = [0u8; 4];
+            reader.read_exact(&mut len_bytes)?;
+            *position += 4;
+            let len = u32::from_le_bytes(len_bytes) as u64;
+
+            if len == 0 {
+                return Err(MongoLiteError::Corruption(format!(
+                    "Document at offset {} has zero length (corrupted or truncated)",
+                    offset
+                )));
+            }
+            if offset + 4 + len > data_len {
+                return Err(MongoLiteError::Corruption(format!(
+                    "Document at offset {} claims length {} but would exceed file boundary (file: {} bytes)",
+                    offset, len, data_len
+                )));
+            }
+
+            let mut data = vec![0u8; len as usize];
+            reader.read_exact(&mut data)?;
+            *position += len;
+            Ok(data)
+        };
+
+        let result = read();
+        if result.is_err() {
+            // A failed read leaves the buffer position unknown: resync
+            *position = reader.stream_position()?;
+        }
+        result
+    }
+
     /// Write metadata at end of compacted file and update header
     ///
     /// Serializes collection metadata and writes it at the specified offset,
     /// then updates the header with the new metadata location.
+    ///
+    /// Returns the end offset of the metadata, i.e. the compacted file size.
     fn write_compacted_metadata(
         new_file: &mut std::fs::File,
         header: &super::Header,
         new_collections: &HashMap<String, super::CollectionMeta>,
         metadata_offset: u64,
-    ) -> Result<()> {
+    ) -> Result<u64> {
         // Serialize metadata body
         let mut metadata_buffer = std::io::Cursor::new(Vec::new());
 
@@ -313,7 +400,7 @@ impl StorageEngine {
 
         new_file.sync_all()?;
 
-        Ok(())
+        Ok(metadata_offset + metadata_size)
     }
 
     /// Finalize compaction: close files, rename temp to original, reload metadata
@@ -338,43 +425,88 @@ impl StorageEngine {
         // Reload metadata
         let (header, collections) = Self::load_metadata(&mut file)?;
 
-        // Update self
+        // Update self (map the compacted file for reads)
+        self.mmap = Self::map_file(&file)?;
         self.file = file;
         self.header = header;
         self.collections = collections;
-        self.mmap = None; // Reset mmap
 
         Ok(())
     }
 
+    /// Check which records of a chunk survive compaction
+    ///
+    /// Decoding is the CPU-bound part of compaction, so a large chunk is
+    /// split into contiguous slices checked on scoped threads. Results come
+    /// back in chunk order; writing stays serial.
+    fn classify_compaction_chunk(
+        chunk: &[(&str, &crate::document::DocumentId, Vec<u8>)],
+        scan_threads: usize,
+    ) -> Vec<RecordKind> {
+        let threads = scan_threads
+            .min(chunk.len() / MIN_RECORDS_PER_SCAN_THREAD)
+            .max(1);
+        if threads == 1 {
+            return chunk
+                .iter()
+                .map(|(_, _, bytes)| classify_record(bytes))
+                .collect();
+        }
+
+        let slice_len = chunk.len().div_ceil(threads);
+        std::thread::scope(|scope| {
+            let workers: Vec<_> = chunk
+                .chunks(slice_len)
+                .map(|slice| {
+                    scope.spawn(move || {
+                        slice
+                            .iter()
+                            .map(|(_, _, bytes)| classify_record(bytes))
+                            .collect::<Vec<_>>()
+                    })
+                })
+                .collect();
+            workers
+                .into_iter()
+                .flat_map(|worker| worker.join().expect("compaction scan thread panicked"))
+                .collect()
+        })
+    }
+
     /// Helper function to flush a chunk of documents to the compacted file
+    ///
+    /// Documents are written as stored (length prefix + raw bytes); the chunk
+    /// is drained so the caller can reuse its allocation. Surviving records
+    /// are laid out back-to-back in one buffer and written with a single call.
     fn flush_compaction_chunk(
-        &self,
         new_file: &mut std::fs::File,
         new_collections: &mut HashMap<String, super::CollectionMeta>,
-        coll_name: &str,
-        docs_by_id: &mut HashMap<crate::document::DocumentId, Value>,
+        chunk: &mut Vec<(&str, &crate::document::DocumentId, Vec<u8>)>,
         mut write_offset: u64,
+        scan_threads: usize,
         stats: &mut CompactionStats,
     ) -> Result<u64> {
-        for (doc_id, doc) in docs_by_id.iter() {
-            // Skip tombstones (deleted documents)
-            if doc
-                .get("_tombstone")
-                .and_then(|v| v.as_bool())
-                .unwrap_or(false)
-            {
-                stats.tombstones_removed += 1;
-                continue;
+        let kinds = Self::classify_compaction_chunk(chunk, scan_threads);
+        let capacity = chunk.iter().map(|(_, _, bytes)| 4 + bytes.len()).sum();
+        let mut out = Vec::with_capacity(capacity);
+
+        for ((coll_name, doc_id, doc_bytes), kind) in chunk.drain(..).zip(kinds) {
+            // Skip unparseable documents and tombstones (deleted documents)
+            match kind {
+                RecordKind::Live => {}
+                RecordKind::Tombstone => {
+                    stats.tombstones_removed += 1;
+                    continue;
+                }
+                RecordKind::Unparseable => continue,
             }
 
-            // Write document to new file
+            // Append document to the chunk's write buffer
             let doc_offset = write_offset;
-            let doc_bytes = serde_json::to_vec(&doc)?;
             let len = doc_bytes.len() as u32;
 
-            new_file.write_all(&len.to_le_bytes())?;
-            new_file.write_all(&doc_bytes)?;
+            out.extend_from_slice(&len.to_le_bytes());
+            out.extend_from_slice(&doc_bytes);
 
             write_offset += 4 + doc_bytes.len() as u64;
             stats.documents_kept += 1;
@@ -389,6 +521,8 @@ impl StorageEngine {
             }
         }
 
+        new_file.write_all(&out)?;
+
         Ok(write_offset)
     }
 }
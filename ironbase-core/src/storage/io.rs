@@ -24,6 +24,14 @@ impl StorageEngine {
     pub fn read_data(&mut self, offset: u64) -> Result<Vec<u8>> {
         use crate::error::MongoLiteError;
 
+        // Records that lie inside the memory map are copied straight out of
+        // it (no fstat/seek/read syscalls). Written records are never
+        // rewritten in place and the file only shrinks through compaction,
+        // which unmaps it first, so the mapped bytes are always current.
+        if let Some(data) = self.read_mapped(offset)? {
+            return Ok(data);
+        }
+
         // CRITICAL FIX: Validate offset is within file bounds BEFORE reading
         // Prevents race condition where flush_metadata() truncates file while reading
         let file_len = self.file.metadata()?.len();
@@ -73,6 +81,38 @@ impl StorageEngine {
         Ok(data)
     }
 
+    /// Read a record from the memory map, if it lies entirely inside it
+    fn read_mapped(&self, offset: u64) -> Result<Option<Vec<u8>>> {
+        use crate::error::MongoLiteError;
+
+        let mmap = match &self.mmap {
+            Some(mmap) => mmap,
+            None => return Ok(None),
+        };
+
+        let start = offset as usize;
+        let len_end = match start.checked_add(4) {
+            Some(end) if end <= mmap.len() => end,
+            _ => return Ok(None),
+        };
+        let mut len_bytes = [0u8; 4];
+        len_bytes.copy_from_slice(&mmap[start..len_end]);
+        let len = u32::from_le_bytes(len_bytes) as usize;
+
+        if len == 0 {
+            return Err(MongoLiteError::Corruption(format!(
+                "Document at offset {} has zero length (corrupted or truncated)",
+                offset
+            )));
+        }
+
+        // Records appended after the file was mapped are read from the file
+        match len_end.checked_add(len) {
+            Some(end) if end <= mmap.len() => Ok(Some(mmap[len_end..end].to_vec())),
+            _ => Ok(None),
+        }
+    }
+
     /// Get file length
     pub fn file_len(&self) -> Result<u64> {
         Ok(self.file.metadata()?.len())
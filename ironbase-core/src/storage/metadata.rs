@@ -317,7 +317,7 @@ impl StorageEngine {
     /// 1. Seek to metadata position and write metadata bytes
     /// 2. Update header struct with new metadata location
     /// 3. Rewrite header at file start
-    /// 4. Sync all changes to disk
+    /// 4. Sync data changes to disk
     fn write_metadata_and_header(
         file: &mut File,
         header: &mut Header,
@@ -340,8 +340,8 @@ impl StorageEngine {
             bincode::serialize(header).map_err(|e| MongoLiteError::Serialization(e.to_string()))?;
         file.write_all(&header_bytes)?;
 
-        // 5. Sync all changes to disk
-        file.sync_all()?;
+        // 5. Sync data changes to disk (fdatasync: mtime is not needed for recovery)
+        file.sync_data()?;
 
         Ok(())
     }
@@ -11,7 +11,7 @@ pub mod traits; // NEW: Storage trait definitions
 use crate::document::{Document, DocumentId};
 use crate::error::{MongoLiteError, Result};
 use crate::transaction::Transaction;
-use crate::wal::WriteAheadLog;
+use crate::wal::{WriteAheadLog, WAL_SEGMENT_SIZE};
 use memmap2::{MmapMut, MmapOptions};
 use serde::{Deserialize, Serialize};
 use std::collections::HashMap;
@@ -48,6 +48,13 @@ pub const RESERVED_METADATA_SIZE: u64 = 10 * 1024 * 1024; // 10MB reserved for m
 pub const HEADER_SIZE: u64 = 256; // Fixed header size
 pub const DATA_START_OFFSET: u64 = HEADER_SIZE + RESERVED_METADATA_SIZE; // Documents start here
 
+/// Suggested WAL size for `set_wal_checkpoint_size()`: one preallocated
+/// segment, so a recycled WAL is reused in place instead of extended
+///
+/// Not the default: each automatic flush appends a fresh copy of the
+/// catalog after the documents, and the next documents go after it.
+pub const WAL_CHECKPOINT_SIZE: u64 = WAL_SEGMENT_SIZE;
+
 /// Adatbázis fájl fejléc
 #[derive(Serialize, Deserialize, Debug, Clone)]
 pub struct Header {
@@ -124,6 +131,7 @@ pub struct StorageEngine {
     file_path: String,
     wal: WriteAheadLog,
     metadata_dirty: bool,
+    wal_checkpoint_size: u64,
 }
 
 impl StorageEngine {
@@ -150,13 +158,7 @@ impl StorageEngine {
         };
 
         // Memory-mapped fájl (ha elég kicsi a fájl)
-        let mmap = if file.metadata()?.len() < 1_000_000_000 {
-            // 1GB alatt használjuk az mmap-et
-
-            unsafe { MmapOptions::new().map_mut(&file).ok() }
-        } else {
-            None
-        };
+        let mmap = Self::map_file(&file)?;
 
         // WAL fájl megnyitása
         let wal_path = PathBuf::from(&path_str).with_extension("wal");
@@ -170,6 +172,7 @@ impl StorageEngine {
             file_path: path_str,
             wal,
             metadata_dirty: false,
+            wal_checkpoint_size: 0,
         };
 
         // NOTE: WAL recovery is now handled by DatabaseCore::open() for index atomicity
@@ -178,6 +181,20 @@ impl StorageEngine {
         Ok(storage)
     }
 
+    /// Map the data file for reads (files of 1GB and above are not mapped)
+    ///
+    /// The map covers the file as it is now; `read_data()` serves records
+    /// inside it from memory and reads later appends from the file.
+    fn map_file(file: &File) -> Result<Option<MmapMut>> {
+        if file.metadata()?.len() < 1_000_000_000 {
+            // SAFETY: the file is only shrunk by compaction, which drops the
+            // map before replacing the file
+            Ok(unsafe { MmapOptions::new().map_mut(file).ok() })
+        } else {
+            Ok(None)
+        }
+    }
+
     /// Collection létrehozása
     pub fn create_collection(&mut self, name: &str) -> Result<()> {
         if self.collections.contains_key(name) {
@@ -199,6 +216,7 @@ impl StorageEngine {
 
         self.collections.insert(name.to_string(), meta);
         self.header.collection_count += 1;
+        self.metadata_dirty = true;
 
         // NOTE: We don't flush metadata here for performance!
         // Metadata will be flushed on:
@@ -238,13 +256,18 @@ impl StorageEngine {
     /// Collection metaadatok lekérése (mutable)
     /// Metadata changes are persisted only when flush() is called (typically on database close)
     pub fn get_collection_meta_mut(&mut self, name: &str) -> Option<&mut CollectionMeta> {
+        // Callers may change anything, so the next checkpoint must write metadata
+        self.metadata_dirty = true;
         self.collections.get_mut(name)
     }
 
     /// Flush - változások lemezre írása (beleértve a metadata-t is)
     pub fn flush(&mut self) -> Result<()> {
-        // Flush metadata to disk with proper convergence
-        self.flush_metadata()?;
+        // Flush metadata to disk with proper convergence (skipped when it
+        // has not changed, e.g. the Drop flush right after close())
+        if self.metadata_dirty {
+            self.flush_metadata()?;
+        }
         self.file.sync_all()?;
 
         // CRITICAL: Clear WAL AFTER metadata is safely on disk
@@ -265,6 +288,12 @@ impl StorageEngine {
     /// CRITICAL FIX: Must call flush_metadata() before clearing WAL!
     /// Without this, document_catalog only exists in memory and is lost on restart.
     pub fn checkpoint(&mut self) -> Result<()> {
+        // Nothing written since the last checkpoint: metadata on disk is
+        // current and the WAL is already empty, so skip the syncs
+        if !self.metadata_dirty && self.wal.is_empty() {
+            return Ok(());
+        }
+
         // First flush metadata to ensure document_catalog is persisted
         self.flush_metadata()?;
 
@@ -273,6 +302,19 @@ impl StorageEngine {
         Ok(())
     }
 
+    /// Flush once the WAL holds `size` bytes after a commit (0, the default,
+    /// disables it)
+    ///
+    /// Committed transactions are applied to the data file before commit
+    /// returns, so the log only has to cover the window since the last
+    /// flush; this bounds both the WAL file and recovery time on reopen.
+    /// Opt-in because every flush writes the whole catalog to the end of
+    /// the data file, leaving the previous copy behind as dead space until
+    /// the next compaction.
+    pub fn set_wal_checkpoint_size(&mut self, size: u64) {
+        self.wal_checkpoint_size = size;
+    }
+
     /// Statisztikák
     pub fn stats(&self) -> serde_json::Value {
         serde_json::json!({
@@ -287,6 +329,7 @@ impl StorageEngine {
                     "last_id": meta.last_id,
                 })
             }).collect::<Vec<_>>(),
+            "wal": self.wal.stats(),
         })
     }
 
@@ -307,13 +350,9 @@ impl StorageEngine {
 
         // Step 2: Write all operations to WAL (use JSON instead of bincode for compatibility)
         for operation in transaction.operations() {
-            let op_json = serde_json::to_string(operation)
+            let op_json = serde_json::to_vec(operation)
                 .map_err(|e| MongoLiteError::Serialization(e.to_string()))?;
-            let op_entry = WALEntry::new(
-                transaction.id,
-                WALEntryType::Operation,
-                op_json.as_bytes().to_vec(),
-            );
+            let op_entry = WALEntry::new(transaction.id, WALEntryType::Operation, op_json);
             self.wal.append(&op_entry)?;
         }
 
@@ -341,14 +380,11 @@ impl StorageEngine {
                     "doc_id": change.doc_id,
                 });
 
-                let change_json = serde_json::to_string(&change_data)
+                let change_json = serde_json::to_vec(&change_data)
                     .map_err(|e| MongoLiteError::Serialization(e.to_string()))?;
 
-                let index_entry = WALEntry::new(
-                    transaction.id,
-                    WALEntryType::IndexChange,
-                    change_json.as_bytes().to_vec(),
-                );
+                let index_entry =
+                    WALEntry::new(transaction.id, WALEntryType::IndexChange, change_json);
                 self.wal.append(&index_entry)?;
             }
         }
@@ -417,6 +453,7 @@ impl StorageEngine {
             for metadata_change in transaction.metadata_changes() {
                 if let Some(meta) = self.collections.get_mut(&metadata_change.collection) {
                     meta.last_id = metadata_change.last_id as u64;
+                    self.metadata_dirty = true;
                 }
             }
         }
@@ -427,6 +464,12 @@ impl StorageEngine {
         // Step 9: Mark transaction as committed
         transaction.mark_committed()?;
 
+        // Step 10: Flush once the WAL outgrows its threshold (if one is set),
+        // so long runs of commits do not keep extending the log until close
+        if self.wal_checkpoint_size > 0 && self.wal.entries_len() >= self.wal_checkpoint_size {
+            self.flush()?;
+        }
+
         Ok(())
     }
 
@@ -1355,6 +1398,68 @@ mod tests {
         }
     }
 
+    #[test]
+    fn test_commit_flushes_wal_past_checkpoint_size() {
+        let (_temp_dir, mut storage) = setup_test_db();
+        storage.create_collection("users").unwrap();
+        storage.set_wal_checkpoint_size(64 * 1024);
+
+        let mut peak = 0;
+        for i in 0..200 {
+            let mut tx = crate::transaction::Transaction::new(i + 1);
+            tx.add_operation(crate::transaction::Operation::Insert {
+                collection: "users".to_string(),
+                doc_id: crate::document::DocumentId::Int(i as i64),
+                doc: serde_json::json!({"_id": i, "payload": "x".repeat(1000)}),
+            })
+            .unwrap();
+            storage.commit_transaction(&mut tx).unwrap();
+            peak = peak.max(storage.wal.entries_len());
+        }
+
+        // Never more than one transaction past the threshold (block
+        // padding does not count towards it)
+        assert!(peak < 64 * 1024 + 4096, "WAL grew to {} bytes", peak);
+        assert!(storage.wal.entries_len() < 64 * 1024);
+    }
+
+    #[test]
+    fn test_commits_do_not_append_catalog_copies() {
+        let (_temp_dir, mut storage) = setup_test_db();
+        storage.create_collection("users").unwrap();
+
+        let commit = |storage: &mut StorageEngine, i: u64| {
+            let mut tx = crate::transaction::Transaction::new(i + 1);
+            // Same-width ids, so every document record has the same size
+            let id = 10_000 + i as i64;
+            tx.add_operation(crate::transaction::Operation::Insert {
+                collection: "users".to_string(),
+                doc_id: crate::document::DocumentId::Int(id),
+                doc: serde_json::json!({"_id": id, "payload": "x".repeat(100)}),
+            })
+            .unwrap();
+            storage.commit_transaction(&mut tx).unwrap();
+        };
+
+        commit(&mut storage, 0);
+        let start = storage.file_len().unwrap();
+        commit(&mut storage, 1);
+        let record = storage.file_len().unwrap() - start;
+
+        // Well past WAL_CHECKPOINT_SIZE of (padded) commits: with the
+        // threshold off by default the data file only grows by the records
+        for i in 2..3_000 {
+            commit(&mut storage, i);
+        }
+        let grown = storage.file_len().unwrap() - start;
+        assert!(
+            grown <= 2_999 * record,
+            "data file grew {} bytes for 2999 records of {} bytes",
+            grown,
+            record
+        );
+    }
+
     #[test]
     fn test_transaction_rollback() {
         let temp_dir = TempDir::new().unwrap();
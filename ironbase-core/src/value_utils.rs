@@ -46,6 +46,57 @@ pub fn get_nested_value<'a>(doc: &'a Value, path: &str) -> Option<&'a Value> {
     Some(value)
 }
 
+/// A dot-notation path split once for repeated lookups
+///
+/// Resolves exactly like `get_nested_value()`, but the path is split and
+/// its array indexes parsed when the `FieldPath` is built, so lookups over
+/// many documents only walk the pre-split segments.
+///
+/// # Examples
+///
+/// ```
+/// use serde_json::json;
+/// use ironbase_core::value_utils::FieldPath;
+///
+/// let path = FieldPath::new("items.0.name");
+/// let doc = json!({"items": [{"name": "pen"}]});
+/// assert_eq!(path.get(&doc), Some(&json!("pen")));
+/// ```
+#[derive(Debug, Clone)]
+pub struct FieldPath {
+    segments: Vec<(String, Option<usize>)>,
+}
+
+impl FieldPath {
+    /// Split `path` into its segments
+    pub fn new(path: &str) -> Self {
+        FieldPath {
+            segments: path
+                .split('.')
+                .map(|part| (part.to_string(), part.parse::<usize>().ok()))
+                .collect(),
+        }
+    }
+
+    /// Value at this path in `doc` (same result as `get_nested_value()`)
+    pub fn get<'a>(&self, doc: &'a Value) -> Option<&'a Value> {
+        // Simple field access, like the no-dot fast path of get_nested_value()
+        if let [(key, _)] = self.segments.as_slice() {
+            return doc.get(key.as_str());
+        }
+
+        let mut value = doc;
+        for (key, index) in &self.segments {
+            match value {
+                Value::Object(map) => value = map.get(key)?,
+                Value::Array(arr) => value = arr.get((*index)?)?,
+                _ => return None,
+            }
+        }
+        Some(value)
+    }
+}
+
 /// Set a value at a nested path with dot notation support
 ///
 /// Creates intermediate objects if they don't exist.
@@ -267,6 +318,34 @@ mod tests {
         assert_eq!(get_nested_value(&doc, "a.b.c.d"), Some(&json!(42)));
     }
 
+    #[test]
+    fn test_field_path_matches_get_nested_value() {
+        let doc = json!({
+            "name": "Alice",
+            "address": {"city": "NYC"},
+            "items": [{"name": "item1"}, {"name": "item2"}],
+            "1": "one"
+        });
+        for path in [
+            "name",
+            "missing",
+            "address.city",
+            "address.city.zip",
+            "items.1.name",
+            "items.5.name",
+            "items.x",
+            "1",
+            "",
+        ] {
+            assert_eq!(
+                FieldPath::new(path).get(&doc),
+                get_nested_value(&doc, path),
+                "path {:?}",
+                path
+            );
+        }
+    }
+
     #[test]
     fn test_compare_values_numbers() {
         assert_eq!(
@@ -52,6 +52,12 @@ pub struct WALEntry {
 /// Header size: 8 (tx_id) + 1 (type) + 4 (len) = 13 bytes
 pub const WAL_HEADER_SIZE: usize = 13;
 
+/// WAL block size: the writer zero-pads the log to this boundary on every flush
+///
+/// Each commit then starts on a fresh block, so the device never rewrites the
+/// block holding the previous commit's tail ("sparse" redo logging).
+pub const WAL_BLOCK_SIZE: u64 = 4096;
+
 /// Maximum WAL entry size: 64MB (security limit)
 pub const MAX_WAL_ENTRY_SIZE: usize = 64 * 1024 * 1024;
 
@@ -71,6 +77,16 @@ impl WALEntry {
     /// Serialize entry to bytes
     pub fn serialize(&self) -> Vec<u8> {
         let mut buf = Vec::with_capacity(WAL_HEADER_SIZE + self.data.len() + 4);
+        self.serialize_into(&mut buf);
+        buf
+    }
+
+    /// Serialize entry by appending to an existing buffer
+    ///
+    /// Lets writers reuse one buffer across entries instead of allocating
+    /// a fresh one per entry.
+    pub fn serialize_into(&self, buf: &mut Vec<u8>) {
+        buf.reserve(WAL_HEADER_SIZE + self.data.len() + 4);
 
         // Transaction ID (8 bytes)
         buf.extend_from_slice(&self.transaction_id.to_le_bytes());
@@ -87,8 +103,6 @@ impl WALEntry {
 
         // Checksum (4 bytes)
         buf.extend_from_slice(&self.checksum.to_le_bytes());
-
-        buf
     }
 
     /// Deserialize entry from bytes
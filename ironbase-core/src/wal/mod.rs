@@ -13,7 +13,7 @@ mod reader;
 mod recovery;
 mod writer;
 
-pub use entry::{WALEntry, WALEntryType, MAX_WAL_ENTRY_SIZE, WAL_HEADER_SIZE};
-pub use reader::WALEntryIterator;
+pub use entry::{WALEntry, WALEntryType, MAX_WAL_ENTRY_SIZE, WAL_BLOCK_SIZE, WAL_HEADER_SIZE};
+pub use reader::{wal_reader, WALEntryIterator, WAL_READ_BUFFER_SIZE};
 pub use recovery::{CommittedTransaction, TransactionGrouper};
-pub use writer::WriteAheadLog;
+pub use writer::{WriteAheadLog, WAL_SEGMENT_SIZE, WAL_STAGING_LIMIT};
@@ -1,11 +1,23 @@
 // wal/reader.rs
 // Streaming WAL reader with iterator pattern
 
-use std::io::{Read, Seek, SeekFrom};
+use std::io::{BufReader, Read, Seek, SeekFrom};
 
 use crate::error::{MongoLiteError, Result};
 
-use super::entry::{WALEntry, WALEntryType, MAX_WAL_ENTRY_SIZE, WAL_HEADER_SIZE};
+use super::entry::{WALEntry, WALEntryType, MAX_WAL_ENTRY_SIZE, WAL_BLOCK_SIZE, WAL_HEADER_SIZE};
+
+/// Read buffer used when streaming a WAL file
+///
+/// Recovery reads the log front to back, so a large buffer turns it into a
+/// few big sequential reads while memory stays bounded by the buffer plus
+/// one entry.
+pub const WAL_READ_BUFFER_SIZE: usize = 1 << 20;
+
+/// Open a buffered reader for streaming a WAL file
+pub fn wal_reader(file: std::fs::File) -> BufReader<std::fs::File> {
+    BufReader::with_capacity(WAL_READ_BUFFER_SIZE, file)
+}
 
 /// Streaming iterator for reading WAL entries
 ///
@@ -16,6 +28,10 @@ use super::entry::{WALEntry, WALEntryType, MAX_WAL_ENTRY_SIZE, WAL_HEADER_SIZE};
 pub struct WALEntryIterator<R: Read + Seek> {
     reader: R,
     eof_reached: bool,
+    /// Current read offset
+    position: u64,
+    /// Offset just past the last entry that passed its checksum
+    valid_end: u64,
 }
 
 impl<R: Read + Seek> WALEntryIterator<R> {
@@ -26,20 +42,50 @@ impl<R: Read + Seek> WALEntryIterator<R> {
         Ok(Self {
             reader,
             eof_reached: false,
+            position: 0,
+            valid_end: 0,
         })
     }
 
+    /// Offset just past the last entry read successfully
+    ///
+    /// Once the iterator is exhausted, everything after this offset is
+    /// block padding, so it is where the next entry can be written.
+    pub fn valid_end(&self) -> u64 {
+        self.valid_end
+    }
+
     /// Read the next entry from the WAL
     fn read_next(&mut self) -> Result<Option<WALEntry>> {
         // Read header: 8 (tx_id) + 1 (type) + 4 (len) = 13 bytes
         let mut header = [0u8; WAL_HEADER_SIZE];
-        match self.reader.read_exact(&mut header) {
-            Ok(_) => {}
-            Err(e) if e.kind() == std::io::ErrorKind::UnexpectedEof => {
-                // End of file - no more entries
-                return Ok(None);
+        loop {
+            match self.reader.read_exact(&mut header) {
+                Ok(_) => {}
+                Err(e) if e.kind() == std::io::ErrorKind::UnexpectedEof => {
+                    // End of file - no more entries
+                    return Ok(None);
+                }
+                Err(e) => return Err(MongoLiteError::Io(e)),
+            }
+
+            // An all-zero header is block padding written on flush:
+            // skip to the start of the next block
+            if header.iter().any(|&b| b != 0) {
+                break;
+            }
+            // Read through the padding rather than seeking over it: a seek
+            // would throw away the rest of a buffered reader's buffer
+            let consumed = self.position + WAL_HEADER_SIZE as u64;
+            self.position = (self.position / WAL_BLOCK_SIZE + 1) * WAL_BLOCK_SIZE;
+            if self.position >= consumed {
+                std::io::copy(
+                    &mut self.reader.by_ref().take(self.position - consumed),
+                    &mut std::io::sink(),
+                )?;
+            } else {
+                self.reader.seek(SeekFrom::Start(self.position))?;
             }
-            Err(e) => return Err(MongoLiteError::Io(e)),
         }
 
         let tx_id = u64::from_le_bytes(header[0..8].try_into().unwrap());
@@ -59,6 +105,7 @@ impl<R: Read + Seek> WALEntryIterator<R> {
         let mut checksum_bytes = [0u8; 4];
         self.reader.read_exact(&mut checksum_bytes)?;
         let checksum = u32::from_le_bytes(checksum_bytes);
+        self.position += (WAL_HEADER_SIZE + data_len + 4) as u64;
 
         let entry = WALEntry {
             transaction_id: tx_id,
@@ -71,6 +118,7 @@ impl<R: Read + Seek> WALEntryIterator<R> {
         if entry.compute_checksum() != checksum {
             return Err(MongoLiteError::WALCorruption);
         }
+        self.valid_end = self.position;
 
         Ok(Some(entry))
     }
@@ -158,6 +206,41 @@ mod tests {
         assert!(matches!(result, Some(Err(MongoLiteError::WALCorruption))));
     }
 
+    #[test]
+    fn test_iterator_skips_block_padding() {
+        let entry1 = WALEntry::new(1, WALEntryType::Commit, vec![]);
+        let entry2 = WALEntry::new(2, WALEntryType::Commit, vec![]);
+
+        let mut data = entry1.serialize();
+        data.resize(WAL_BLOCK_SIZE as usize, 0);
+        data.extend_from_slice(&entry2.serialize());
+        data.resize(2 * WAL_BLOCK_SIZE as usize, 0);
+
+        let cursor = Cursor::new(data);
+        let iter = WALEntryIterator::new(cursor).unwrap();
+        let entries: Vec<_> = iter.map(|r| r.unwrap()).collect();
+
+        assert_eq!(entries.len(), 2);
+        assert_eq!(entries[0].transaction_id, 1);
+        assert_eq!(entries[1].transaction_id, 2);
+    }
+
+    #[test]
+    fn test_iterator_tracks_valid_end() {
+        let entry = WALEntry::new(1, WALEntryType::Commit, vec![]);
+        let entry_len = entry.serialize().len() as u64;
+
+        let mut data = entry.serialize();
+        data.resize(WAL_BLOCK_SIZE as usize, 0);
+        data.extend_from_slice(&entry.serialize());
+        data.resize(3 * WAL_BLOCK_SIZE as usize, 0);
+
+        let cursor = Cursor::new(data);
+        let mut iter = WALEntryIterator::new(cursor).unwrap();
+        assert_eq!(iter.by_ref().count(), 2);
+        assert_eq!(iter.valid_end(), WAL_BLOCK_SIZE + entry_len);
+    }
+
     #[test]
     fn test_iterator_handles_interleaved_transactions() {
         // Create interleaved entries from two transactions
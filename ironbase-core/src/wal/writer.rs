@@ -8,15 +8,48 @@ use std::path::{Path, PathBuf};
 use crate::error::Result;
 use crate::transaction::TransactionId;
 
-use super::entry::{WALEntry, WALEntryType};
-use super::reader::WALEntryIterator;
+use super::entry::{WALEntry, WALEntryType, WAL_BLOCK_SIZE, WAL_HEADER_SIZE};
+use super::reader::{wal_reader, WALEntryIterator};
+
+/// Default WAL preallocation step: 4MB of zeroed blocks
+pub const WAL_SEGMENT_SIZE: u64 = 4 * 1024 * 1024;
+
+/// Staged entries are written out early once they reach this size, so a
+/// huge transaction does not hold its whole log image in memory
+pub const WAL_STAGING_LIMIT: usize = 1024 * 1024;
 
 /// Write-Ahead Log file manager
 ///
 /// Handles appending entries and managing the WAL file lifecycle.
+///
+/// The file is grown ahead of the writer in zero-filled segments, so appends
+/// land in already-allocated blocks instead of extending the file each time.
+/// Zeroed space past the last entry reads back as block padding. On clear()
+/// the segment is recycled: its used part is zeroed and the file keeps its
+/// blocks for the next round of appends. Opening an existing log resumes
+/// right after its last valid entry.
+///
+/// Appends are staged in memory and reach the file in one write at the
+/// next flush() (group commit): a transaction costs one write and one
+/// fdatasync however many entries it logs. Staged entries are not durable
+/// and do not survive a crash, same as written but unsynced ones.
 pub struct WriteAheadLog {
     file: File,
     path: PathBuf,
+    /// End of the written part of the log; staged entries follow it
+    len: u64,
+    /// Logical end as of the last fdatasync: everything before it is durable
+    synced: u64,
+    /// Physical file size; appends reuse the space between `len` and here
+    allocated: u64,
+    /// Preallocation step in bytes (0 = grow on every append)
+    segment_size: u64,
+    /// Zero and reuse the segment on clear() instead of truncating
+    recycle: bool,
+    /// Entries appended since the last write, encoded back to back
+    staged: Vec<u8>,
+    /// Block padding included in `len()` since the last clear
+    padding: u64,
 }
 
 impl WriteAheadLog {
@@ -27,10 +60,79 @@ impl WriteAheadLog {
         let file = OpenOptions::new()
             .create(true)
             .read(true)
-            .append(true)
+            .write(true)
             .open(&path)?;
 
-        Ok(WriteAheadLog { file, path })
+        let allocated = file.metadata()?.len();
+        let len = if allocated > 0 {
+            Self::logical_end(&path, allocated)?
+        } else {
+            0
+        };
+
+        Ok(WriteAheadLog {
+            file,
+            path,
+            len,
+            synced: len,
+            allocated,
+            segment_size: WAL_SEGMENT_SIZE,
+            recycle: true,
+            staged: Vec::new(),
+            padding: 0,
+        })
+    }
+
+    /// Find where the next entry goes: just past the last valid entry
+    ///
+    /// A log that does not parse cleanly is kept whole and new entries go
+    /// after it; recovery reports the corruption.
+    fn logical_end(path: &Path, file_len: u64) -> Result<u64> {
+        let reader = wal_reader(File::open(path)?);
+        let mut iter = WALEntryIterator::new(reader)?;
+        for entry_result in iter.by_ref() {
+            if entry_result.is_err() {
+                return Ok(file_len);
+            }
+        }
+        Ok(iter.valid_end())
+    }
+
+    /// Set the preallocation step in bytes
+    ///
+    /// 0 disables preallocation, for copy-on-write filesystems (btrfs, ZFS)
+    /// where writing zeros ahead of the log does not reserve anything.
+    pub fn set_segment_size(&mut self, segment_size: u64) {
+        self.segment_size = segment_size;
+    }
+
+    /// Choose between recycling the WAL segment on clear() (default) and
+    /// truncating it to zero length
+    ///
+    /// Disable on copy-on-write filesystems, where overwriting in place
+    /// allocates new blocks anyway.
+    pub fn set_recycle(&mut self, recycle: bool) {
+        self.recycle = recycle;
+    }
+
+    /// Bytes logged since the last clear, staged entries included
+    pub fn len(&self) -> u64 {
+        self.len + self.staged.len() as u64
+    }
+
+    /// Bytes of entries logged since the last clear, without the block
+    /// padding flush() adds
+    ///
+    /// A small commit pads out to a whole block, so size-based decisions
+    /// such as the post-commit flush threshold use this instead of len().
+    /// Padding inherited from a reopened log is not told apart.
+    pub fn entries_len(&self) -> u64 {
+        self.len() - self.padding
+    }
+
+    /// True if nothing has been logged since the last clear
+    pub fn is_empty(&self) -> bool {
+        self.len == 0 && self.staged.is_empty()
     }
 
     /// Get the path to this WAL file
@@ -38,62 +140,242 @@ impl WriteAheadLog {
         &self.path
     }
 
-    /// Append an entry to the WAL
+    /// Append an entry to the WAL, returning its offset in the log
+    ///
+    /// The entry is staged; it is written by the next flush() (or earlier,
+    /// once `WAL_STAGING_LIMIT` bytes are staged).
     pub fn append(&mut self, entry: &WALEntry) -> Result<u64> {
-        let serialized = entry.serialize();
-        let offset = self.file.seek(SeekFrom::End(0))?;
-        self.file.write_all(&serialized)?;
+        let offset = self.len + self.staged.len() as u64;
+        entry.serialize_into(&mut self.staged);
+        if self.staged.len() >= WAL_STAGING_LIMIT {
+            self.write_staged()?;
+        }
         Ok(offset)
     }
 
-    /// Flush WAL to disk (fsync)
+    /// Flush WAL to disk (fdatasync)
+    ///
+    /// The tail is zero-padded to the next `WAL_BLOCK_SIZE` boundary first, so
+    /// the next commit starts on a new block instead of rewriting this one.
+    /// Staged entries and the padding go out in a single write.
     pub fn flush(&mut self) -> Result<()> {
-        self.file.sync_all()?;
+        self.pad_to_block();
+        self.write_staged()?;
+        // File length is covered by fdatasync; mtime is not needed for recovery
+        self.file.sync_data()?;
+        self.synced = self.len;
+        Ok(())
+    }
+
+    /// Write the staged entries at the end of the log
+    fn write_staged(&mut self) -> Result<()> {
+        if self.staged.is_empty() {
+            return Ok(());
+        }
+        let size = self.staged.len() as u64;
+        if self.segment_size > 0 {
+            self.reserve(size)?;
+        }
+        write_all_at(&mut self.file, &self.staged, self.len)?;
+        self.len += size;
+        self.allocated = self.allocated.max(self.len);
+        self.staged.clear();
+        Ok(())
+    }
+
+    /// Sizes of the log in bytes, for tests and diagnostics
+    ///
+    /// `size` is what has been appended since the last clear, `durable_size`
+    /// the part of it covered by the last flush (a committed transaction is
+    /// durable once it lies below this mark), and `allocated` the physical
+    /// file size including preallocated zero segments - which is why the
+    /// file size on its own says little about what the log holds.
+    pub fn stats(&self) -> serde_json::Value {
+        serde_json::json!({
+            "size": self.len(),
+            "durable_size": self.synced,
+            "allocated": self.allocated,
+        })
+    }
+
+    /// Stage zero padding up to the next block boundary
+    ///
+    /// A padding run is always at least `WAL_HEADER_SIZE` bytes long, so the
+    /// reader sees an all-zero header and can skip to the next block.
+    fn pad_to_block(&mut self) {
+        let end = self.len + self.staged.len() as u64;
+        let mut padding = (WAL_BLOCK_SIZE - end % WAL_BLOCK_SIZE) % WAL_BLOCK_SIZE;
+        if padding > 0 && padding < WAL_HEADER_SIZE as u64 {
+            padding += WAL_BLOCK_SIZE;
+        }
+        // Write the zeros explicitly: after a reopen the current block may
+        // still hold bytes of a torn entry
+        self.staged.resize(self.staged.len() + padding as usize, 0);
+        self.padding += padding;
+    }
+
+    /// Make sure `additional` bytes past the logical end are allocated
+    ///
+    /// Grows the file with zeros in whole segments (or exactly, when
+    /// preallocation is disabled), keeping the tail past `len` zero-filled.
+    fn reserve(&mut self, additional: u64) -> Result<()> {
+        let needed = self.len + additional;
+        if needed <= self.allocated {
+            return Ok(());
+        }
+        let target = if self.segment_size > 0 {
+            needed.div_ceil(self.segment_size) * self.segment_size
+        } else {
+            needed
+        };
+
+        self.write_zeros(self.allocated, target - self.allocated)?;
+        self.allocated = target;
+        Ok(())
+    }
+
+    /// Overwrite `count` bytes starting at `offset` with zeros
+    fn write_zeros(&mut self, offset: u64, count: u64) -> Result<()> {
+        const ZEROS: [u8; 64 * 1024] = [0u8; 64 * 1024];
+
+        let mut offset = offset;
+        let end = offset + count;
+        while offset < end {
+            let n = (end - offset).min(ZEROS.len() as u64) as usize;
+            write_all_at(&mut self.file, &ZEROS[..n], offset)?;
+            offset += n as u64;
+        }
         Ok(())
     }
 
     /// Recover transactions from WAL using streaming iterator
     ///
-    /// Returns grouped transactions (only committed ones).
-    /// This method uses the new streaming approach but returns the same
-    /// format as the old method for backwards compatibility.
+    /// Returns the committed transactions in the order their COMMIT records
+    /// were logged, which is the order they were applied in. Entries of
+    /// transactions that are still open at the end of the log (or were
+    /// aborted) are discarded.
     pub fn recover(&mut self) -> Result<Vec<Vec<WALEntry>>> {
         use std::collections::HashMap;
-        use std::io::BufReader;
+
+        self.write_staged()?;
 
         // Reopen file for reading
         let file = File::open(&self.path)?;
-        let reader = BufReader::new(file);
+        let reader = wal_reader(file);
         let iter = WALEntryIterator::new(reader)?;
 
-        // Group entries by transaction ID
-        let mut txs: HashMap<TransactionId, Vec<WALEntry>> = HashMap::new();
+        // Entries of transactions whose COMMIT has not been seen yet
+        let mut open: HashMap<TransactionId, Vec<WALEntry>> = HashMap::new();
+        let mut committed = Vec::new();
 
         for entry_result in iter {
             let entry = entry_result?;
-            txs.entry(entry.transaction_id).or_default().push(entry);
-        }
-
-        // Filter to committed transactions only
-        let mut committed = Vec::new();
-        for (_tx_id, tx_entries) in txs {
-            // Check if last entry is COMMIT
-            if let Some(last) = tx_entries.last() {
-                if last.entry_type == WALEntryType::Commit {
+            match entry.entry_type {
+                WALEntryType::Commit => {
+                    let mut tx_entries = open.remove(&entry.transaction_id).unwrap_or_default();
+                    tx_entries.push(entry);
                     committed.push(tx_entries);
                 }
+                WALEntryType::Abort => {
+                    open.remove(&entry.transaction_id);
+                }
+                _ => open.entry(entry.transaction_id).or_default().push(entry),
             }
-            // Else: uncommitted or aborted transaction, discard
         }
 
         Ok(committed)
     }
 
     /// Clear WAL file (after successful recovery)
+    ///
+    /// With recycling on, the file keeps (at most) one segment of allocated
+    /// blocks so the next appends do not have to allocate again (see
+    /// `recycle_segment()`). Otherwise it is truncated.
     pub fn clear(&mut self) -> Result<()> {
-        self.file.set_len(0)?;
+        // Already empty: nothing to zero, rename or truncate
+        if self.is_empty() {
+            return Ok(());
+        }
+
+        self.staged.clear();
+        self.padding = 0;
+        if self.recycle && self.segment_size > 0 && self.allocated > 0 {
+            self.recycle_segment()?;
+        } else {
+            self.file.set_len(0)?;
+            self.file.sync_data()?; // Ensure truncation is persisted to disk
+            self.len = 0;
+            self.allocated = 0;
+        }
+        self.synced = 0;
         self.file.seek(SeekFrom::Start(0))?;
-        self.file.sync_all()?; // Ensure truncation is persisted to disk
+        Ok(())
+    }
+
+    /// Empty the log but keep its blocks for the next appends
+    ///
+    /// The file is renamed aside first, which empties the log atomically.
+    /// Its used part is then zeroed out of sight and it is renamed back as a
+    /// clean preallocated segment. A crash in between leaves no WAL (an empty
+    /// log) plus a stale spare that the next recycle overwrites.
+    ///
+    /// Costs two renames, two directory fsyncs and zeroing up to one
+    /// segment, against one truncate and fdatasync without recycling.
+    fn recycle_segment(&mut self) -> Result<()> {
+        let spare_path = self.path.with_extension("wal.recycle");
+        std::fs::rename(&self.path, &spare_path)?;
+
+        // From here on self.file is the renamed spare: if anything fails,
+        // it must not stay the file later commits are written to, since
+        // recovery only reads self.path
+        if let Err(err) = self.zero_spare(&spare_path) {
+            crate::log_warn!(
+                "WAL recycle failed ({}), truncating {} instead",
+                err,
+                self.path.display()
+            );
+            return self.truncate_after_failed_recycle(&spare_path);
+        }
+        Ok(())
+    }
+
+    /// Zero the renamed-aside log and rename it back (see recycle_segment())
+    fn zero_spare(&mut self, spare_path: &Path) -> Result<()> {
+        sync_parent_dir(&self.path)?;
+
+        let keep = self.allocated.min(self.segment_size);
+        if self.allocated > keep {
+            self.file.set_len(keep)?;
+            self.allocated = keep;
+        }
+        self.write_zeros(0, self.len.min(keep))?;
+        self.file.sync_data()?;
+        self.len = 0;
+
+        std::fs::rename(spare_path, &self.path)?;
+        sync_parent_dir(&self.path)?;
+        Ok(())
+    }
+
+    /// Put the log back at its path after a failed recycle and empty it by
+    /// truncation
+    ///
+    /// The spare may be half zeroed, but everything it held has already
+    /// been applied to the data file, so only the path matters. If it
+    /// cannot be renamed back, a fresh file is opened at the real path.
+    fn truncate_after_failed_recycle(&mut self, spare_path: &Path) -> Result<()> {
+        if std::fs::rename(spare_path, &self.path).is_err() {
+            self.file = OpenOptions::new()
+                .create(true)
+                .read(true)
+                .write(true)
+                .open(&self.path)?;
+        }
+        self.file.set_len(0)?;
+        self.file.sync_data()?;
+        sync_parent_dir(&self.path)?;
+        self.len = 0;
+        self.allocated = 0;
         Ok(())
     }
 
@@ -101,11 +383,11 @@ impl WriteAheadLog {
     ///
     /// Rewrites the WAL file keeping only uncommitted transactions.
     pub fn checkpoint(&mut self, committed_tx_ids: &[TransactionId]) -> Result<()> {
-        use std::io::BufReader;
+        self.write_staged()?;
 
         // Read all entries using streaming iterator
         let file = File::open(&self.path)?;
-        let reader = BufReader::new(file);
+        let reader = wal_reader(file);
         let iter = WALEntryIterator::new(reader)?;
 
         let mut all_entries = Vec::new();
@@ -130,22 +412,58 @@ impl WriteAheadLog {
         for entry in active_entries {
             temp_file.write_all(&entry.serialize())?;
         }
-        temp_file.sync_all()?;
+        temp_file.sync_data()?;
         drop(temp_file);
 
-        // Atomic rename
+        // Atomic rename, made durable by syncing the directory entry once
         std::fs::rename(&temp_path, &self.path)?;
+        sync_parent_dir(&self.path)?;
 
         // Reopen file
-        self.file = OpenOptions::new()
-            .read(true)
-            .append(true)
-            .open(&self.path)?;
+        self.file = OpenOptions::new().read(true).write(true).open(&self.path)?;
+        self.len = self.file.metadata()?.len();
+        self.synced = self.len;
+        self.allocated = self.len;
+        self.padding = 0;
 
         Ok(())
     }
 }
 
+/// Write `buf` at `offset` with positional writes (pwrite): no separate
+/// seek syscall, and the file cursor is left alone
+#[cfg(unix)]
+fn write_all_at(file: &mut File, buf: &[u8], offset: u64) -> Result<()> {
+    use std::os::unix::fs::FileExt;
+    file.write_all_at(buf, offset)?;
+    Ok(())
+}
+
+/// No positional write helper on this platform: seek, then write
+#[cfg(not(unix))]
+fn write_all_at(file: &mut File, buf: &[u8], offset: u64) -> Result<()> {
+    file.seek(SeekFrom::Start(offset))?;
+    file.write_all(buf)?;
+    Ok(())
+}
+
+/// Fsync the directory containing `path` so a rename into it survives a crash
+#[cfg(unix)]
+fn sync_parent_dir(path: &Path) -> Result<()> {
+    let dir = match path.parent() {
+        Some(dir) if !dir.as_os_str().is_empty() => dir,
+        _ => Path::new("."),
+    };
+    File::open(dir)?.sync_all()?;
+    Ok(())
+}
+
+/// Directories cannot be opened for fsync on this platform
+#[cfg(not(unix))]
+fn sync_parent_dir(_path: &Path) -> Result<()> {
+    Ok(())
+}
+
 #[cfg(test)]
 mod tests {
     use super::*;
@@ -181,6 +499,32 @@ mod tests {
         }
     }
 
+    #[test]
+    fn test_wal_recover_in_commit_order() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let wal_path = temp_dir.path().join("test.wal");
+
+        {
+            let mut wal = WriteAheadLog::open(&wal_path).unwrap();
+            for tx_id in [5, 3, 9, 1] {
+                wal.append(&WALEntry::new(tx_id, WALEntryType::Begin, vec![]))
+                    .unwrap();
+                wal.append(&WALEntry::new(tx_id, WALEntryType::Commit, vec![]))
+                    .unwrap();
+            }
+            wal.flush().unwrap();
+        }
+
+        let mut wal = WriteAheadLog::open(&wal_path).unwrap();
+        let order: Vec<_> = wal
+            .recover()
+            .unwrap()
+            .iter()
+            .map(|tx| tx[0].transaction_id)
+            .collect();
+        assert_eq!(order, vec![5, 3, 9, 1]);
+    }
+
     #[test]
     fn test_wal_recover_filters_uncommitted() {
         let temp_dir = tempfile::tempdir().unwrap();
@@ -217,6 +561,234 @@ mod tests {
         }
     }
 
+    #[test]
+    fn test_wal_flush_pads_to_block() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let wal_path = temp_dir.path().join("test.wal");
+
+        {
+            let mut wal = WriteAheadLog::open(&wal_path).unwrap();
+
+            // Two transactions, each flushed on its own
+            for tx_id in 1..=2 {
+                wal.append(&WALEntry::new(tx_id, WALEntryType::Begin, vec![]))
+                    .unwrap();
+                wal.append(&WALEntry::new(
+                    tx_id,
+                    WALEntryType::Operation,
+                    b"insert doc".to_vec(),
+                ))
+                .unwrap();
+                wal.append(&WALEntry::new(tx_id, WALEntryType::Commit, vec![]))
+                    .unwrap();
+                wal.flush().unwrap();
+
+                let len = std::fs::metadata(&wal_path).unwrap().len();
+                assert_eq!(len % WAL_BLOCK_SIZE, 0);
+            }
+        }
+
+        // Padding is skipped on recovery
+        {
+            let mut wal = WriteAheadLog::open(&wal_path).unwrap();
+            let recovered = wal.recover().unwrap();
+            assert_eq!(recovered.len(), 2);
+        }
+    }
+
+    #[test]
+    fn test_wal_entries_len_excludes_padding() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let wal_path = temp_dir.path().join("test.wal");
+
+        let mut wal = WriteAheadLog::open(&wal_path).unwrap();
+        let begin = WALEntry::new(1, WALEntryType::Begin, vec![]);
+        let commit = WALEntry::new(1, WALEntryType::Commit, vec![]);
+        let logged = (begin.serialize().len() + commit.serialize().len()) as u64;
+        wal.append(&begin).unwrap();
+        wal.append(&commit).unwrap();
+        wal.flush().unwrap();
+
+        // The padded block counts towards len(), not entries_len()
+        assert_eq!(wal.len(), WAL_BLOCK_SIZE);
+        assert_eq!(wal.entries_len(), logged);
+
+        wal.clear().unwrap();
+        assert_eq!(wal.entries_len(), 0);
+    }
+
+    #[test]
+    fn test_wal_preallocates_segments() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let wal_path = temp_dir.path().join("test.wal");
+
+        let mut wal = WriteAheadLog::open(&wal_path).unwrap();
+        let first = wal
+            .append(&WALEntry::new(1, WALEntryType::Begin, vec![]))
+            .unwrap();
+        let second = wal
+            .append(&WALEntry::new(1, WALEntryType::Commit, vec![]))
+            .unwrap();
+        wal.flush().unwrap();
+
+        // Entries are packed at the front of one preallocated segment
+        assert_eq!(first, 0);
+        assert_eq!(second, (WAL_HEADER_SIZE + 4) as u64);
+        let len = std::fs::metadata(&wal_path).unwrap().len();
+        assert_eq!(len, WAL_SEGMENT_SIZE);
+
+        // The zeroed tail is skipped on recovery
+        let recovered = wal.recover().unwrap();
+        assert_eq!(recovered.len(), 1);
+    }
+
+    #[test]
+    fn test_wal_clear_recycles_segment() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let wal_path = temp_dir.path().join("test.wal");
+
+        {
+            let mut wal = WriteAheadLog::open(&wal_path).unwrap();
+            wal.append(&WALEntry::new(1, WALEntryType::Begin, vec![]))
+                .unwrap();
+            wal.append(&WALEntry::new(1, WALEntryType::Commit, vec![]))
+                .unwrap();
+            wal.flush().unwrap();
+            wal.clear().unwrap();
+
+            // The segment stays allocated but holds no entries
+            let len = std::fs::metadata(&wal_path).unwrap().len();
+            assert_eq!(len, WAL_SEGMENT_SIZE);
+            assert_eq!(wal.recover().unwrap().len(), 0);
+
+            // Next entry is written at the start of the recycled segment
+            let offset = wal
+                .append(&WALEntry::new(2, WALEntryType::Begin, vec![]))
+                .unwrap();
+            assert_eq!(offset, 0);
+            wal.append(&WALEntry::new(2, WALEntryType::Commit, vec![]))
+                .unwrap();
+            wal.flush().unwrap();
+        }
+
+        // Reopening continues after the last entry, not at the file end
+        {
+            let mut wal = WriteAheadLog::open(&wal_path).unwrap();
+            let offset = wal
+                .append(&WALEntry::new(3, WALEntryType::Begin, vec![]))
+                .unwrap();
+            assert_eq!(offset, WAL_BLOCK_SIZE);
+            assert_eq!(wal.recover().unwrap().len(), 1);
+
+            wal.set_recycle(false);
+            wal.clear().unwrap();
+            assert_eq!(std::fs::metadata(&wal_path).unwrap().len(), 0);
+        }
+    }
+
+    #[test]
+    fn test_wal_failed_recycle_restores_path() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let wal_path = temp_dir.path().join("test.wal");
+        let spare_path = wal_path.with_extension("wal.recycle");
+
+        let mut wal = WriteAheadLog::open(&wal_path).unwrap();
+        wal.append(&WALEntry::new(1, WALEntryType::Begin, vec![]))
+            .unwrap();
+        wal.append(&WALEntry::new(1, WALEntryType::Commit, vec![]))
+            .unwrap();
+        wal.flush().unwrap();
+
+        // State of a recycle that failed after renaming the log aside
+        std::fs::rename(&wal_path, &spare_path).unwrap();
+        wal.truncate_after_failed_recycle(&spare_path).unwrap();
+        assert!(!spare_path.exists());
+        assert_eq!(std::fs::metadata(&wal_path).unwrap().len(), 0);
+
+        // Later commits land in the file recovery reads
+        wal.append(&WALEntry::new(2, WALEntryType::Begin, vec![]))
+            .unwrap();
+        wal.append(&WALEntry::new(2, WALEntryType::Commit, vec![]))
+            .unwrap();
+        wal.flush().unwrap();
+        drop(wal);
+
+        let mut wal = WriteAheadLog::open(&wal_path).unwrap();
+        let recovered = wal.recover().unwrap();
+        assert_eq!(recovered.len(), 1);
+        assert_eq!(recovered[0][0].transaction_id, 2);
+    }
+
+    #[test]
+    fn test_wal_appends_are_written_at_flush() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let wal_path = temp_dir.path().join("test.wal");
+        let mut wal = WriteAheadLog::open(&wal_path).unwrap();
+
+        wal.append(&WALEntry::new(1, WALEntryType::Begin, vec![]))
+            .unwrap();
+        wal.append(&WALEntry::new(1, WALEntryType::Operation, b"op".to_vec()))
+            .unwrap();
+        wal.append(&WALEntry::new(1, WALEntryType::Commit, vec![]))
+            .unwrap();
+        assert!(!wal.is_empty());
+
+        // Staged only: nothing has reached the file yet
+        assert_eq!(std::fs::metadata(&wal_path).unwrap().len(), 0);
+
+        wal.flush().unwrap();
+        assert_eq!(
+            std::fs::metadata(&wal_path).unwrap().len(),
+            WAL_SEGMENT_SIZE
+        );
+        let recovered = WriteAheadLog::open(&wal_path).unwrap().recover().unwrap();
+        assert_eq!(recovered.len(), 1);
+        assert_eq!(recovered[0].len(), 3);
+    }
+
+    #[test]
+    fn test_wal_large_transaction_writes_early() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let wal_path = temp_dir.path().join("test.wal");
+        let mut wal = WriteAheadLog::open(&wal_path).unwrap();
+
+        let payload = vec![7u8; 64 * 1024];
+        for _ in 0..(WAL_STAGING_LIMIT / payload.len() + 1) {
+            wal.append(&WALEntry::new(1, WALEntryType::Operation, payload.clone()))
+                .unwrap();
+        }
+
+        // Past the staging limit the entries went to the file before flush()
+        assert!(std::fs::metadata(&wal_path).unwrap().len() >= WAL_STAGING_LIMIT as u64);
+        assert_eq!(wal.stats()["durable_size"], 0);
+    }
+
+    #[test]
+    fn test_wal_stats_track_durable_size() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let wal_path = temp_dir.path().join("test.wal");
+        let mut wal = WriteAheadLog::open(&wal_path).unwrap();
+
+        wal.append(&WALEntry::new(1, WALEntryType::Begin, vec![]))
+            .unwrap();
+        wal.append(&WALEntry::new(1, WALEntryType::Commit, vec![]))
+            .unwrap();
+        let stats = wal.stats();
+        assert!(stats["size"].as_u64().unwrap() > 0);
+        assert_eq!(stats["durable_size"], 0); // Appended, not yet synced
+
+        wal.flush().unwrap();
+        let stats = wal.stats();
+        assert_eq!(stats["durable_size"], stats["size"]);
+        assert_eq!(stats["size"].as_u64().unwrap() % WAL_BLOCK_SIZE, 0);
+        assert!(stats["allocated"].as_u64().unwrap() >= stats["size"].as_u64().unwrap());
+
+        wal.clear().unwrap();
+        let stats = wal.stats();
+        assert_eq!(stats["size"], 0);
+        assert_eq!(stats["durable_size"], 0);
+    }
+
     #[test]
     fn test_wal_clear() {
         let temp_dir = tempfile::tempdir().unwrap();
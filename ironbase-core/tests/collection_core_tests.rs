@@ -76,6 +76,41 @@ fn test_insert_many_batch() {
     assert_eq!(count, 100);
 }
 
+#[test]
+fn test_insert_many_mixed_manual_and_auto_ids() {
+    let (db, coll_name) = create_test_db("mixed_ids");
+    let collection = db.collection(&coll_name).unwrap();
+
+    // The auto _id must come after the manual one earlier in the batch
+    let docs = vec![
+        HashMap::from([("_id".to_string(), json!(1))]),
+        HashMap::from([("v".to_string(), json!(2))]),
+    ];
+    let ids = db.insert_many(&coll_name, docs).unwrap();
+    assert_eq!(
+        ids,
+        vec![
+            ironbase_core::DocumentId::Int(1),
+            ironbase_core::DocumentId::Int(2)
+        ]
+    );
+
+    let doc = collection.find_one(&json!({"_id": 2})).unwrap().unwrap();
+    assert_eq!(doc["v"], json!(2));
+
+    // A duplicate _id fails the whole batch without indexing any of it
+    let docs = vec![
+        HashMap::from([("_id".to_string(), json!(10))]),
+        HashMap::from([("_id".to_string(), json!(1))]),
+    ];
+    assert!(db.insert_many(&coll_name, docs).is_err());
+    assert!(collection.find_one(&json!({"_id": 10})).unwrap().is_none());
+    assert_eq!(collection.count_documents(&json!({})).unwrap(), 2);
+
+    let id = db.insert_one(&coll_name, HashMap::new()).unwrap();
+    assert!(matches!(id, ironbase_core::DocumentId::Int(n) if n > 2));
+}
+
 // ========== FIND TESTS ==========
 
 #[test]
@@ -113,6 +148,24 @@ fn test_find_one_not_found() {
     assert!(found.is_none());
 }
 
+#[test]
+fn test_find_one_id_operator() {
+    let (db, coll_name) = create_test_db("test");
+    let collection = db.collection(&coll_name).unwrap();
+
+    let docs: Vec<HashMap<String, serde_json::Value>> = (1..=3)
+        .map(|i| HashMap::from([("_id".to_string(), json!(i))]))
+        .collect();
+    db.insert_many(&coll_name, docs).unwrap();
+
+    // Operator filters on _id are not catalog probes
+    let found = collection
+        .find_one(&json!({"_id": {"$gt": 2}}))
+        .unwrap()
+        .expect("Document should be found");
+    assert_eq!(found["_id"], 3);
+}
+
 #[test]
 fn test_find_with_query() {
     let (db, coll_name) = create_test_db("test");
@@ -232,6 +285,77 @@ fn test_count_with_query() {
     assert_eq!(count, 5);
 }
 
+#[test]
+fn test_exists_many() {
+    let (db, coll_name) = create_test_db("test");
+    let collection = db.collection(&coll_name).unwrap();
+
+    let docs: Vec<HashMap<String, serde_json::Value>> = (1..=4)
+        .map(|i| {
+            HashMap::from([
+                ("_id".to_string(), json!(i)),
+                (
+                    "city".to_string(),
+                    json!(if i % 2 == 0 { "NYC" } else { "LA" }),
+                ),
+            ])
+        })
+        .collect();
+    db.insert_many(&coll_name, docs).unwrap();
+    db.delete_many(&coll_name, &json!({"city": "NYC"})).unwrap();
+
+    let exists = collection
+        .exists_many(&[
+            json!({"_id": 1}),
+            json!({"_id": 2}),
+            json!({"city": "NYC"}),
+            json!({"city": "LA"}),
+            json!({}),
+        ])
+        .unwrap();
+    assert_eq!(exists, vec![true, false, false, true, true]);
+}
+
+#[test]
+fn test_count_by_field() {
+    let (db, coll_name) = create_test_db("test");
+    let collection = db.collection(&coll_name).unwrap();
+
+    let docs: Vec<HashMap<String, serde_json::Value>> = (1..=6)
+        .map(|i| {
+            HashMap::from([
+                ("_id".to_string(), json!(i)),
+                (
+                    "type".to_string(),
+                    json!(if i <= 4 { "baseline" } else { "transaction" }),
+                ),
+                ("meta".to_string(), json!({"shard": i % 2})),
+            ])
+        })
+        .collect();
+    db.insert_many(&coll_name, docs).unwrap();
+    db.delete_one(&coll_name, &json!({"_id": 1})).unwrap();
+    db.insert_one(
+        &coll_name,
+        HashMap::from([("note".to_string(), json!("no type"))]),
+    )
+    .unwrap();
+
+    let mut counts = collection.count_by("type", &json!({})).unwrap();
+    counts.sort_by_key(|(_, count)| *count);
+    assert_eq!(
+        counts,
+        vec![(json!("transaction"), 2), (json!("baseline"), 3)]
+    );
+
+    let counts = collection
+        .count_by("meta.shard", &json!({"type": "baseline"}))
+        .unwrap();
+    assert_eq!(counts.len(), 2);
+    assert!(counts.contains(&(json!(0), 2)));
+    assert!(counts.contains(&(json!(1), 1)));
+}
+
 #[test]
 fn test_count_by_id() {
     let (db, coll_name) = create_test_db("test");
@@ -294,6 +418,60 @@ fn test_update_one_inc() {
     assert_eq!(updated["counter"], 15);
 }
 
+#[test]
+fn test_update_one_returning() {
+    let (db, coll_name) = create_test_db("test");
+    let collection = db.collection(&coll_name).unwrap();
+
+    for (name, status) in [("Alice", "new"), ("Bob", "done")] {
+        let doc = HashMap::from([
+            ("name".to_string(), json!(name)),
+            ("status".to_string(), json!(status)),
+        ]);
+        db.insert_one(&coll_name, doc).unwrap();
+    }
+
+    // Returns the matched document as it is after the update
+    let updated = db
+        .update_one_returning(
+            &coll_name,
+            &json!({"status": "new"}),
+            &json!({"$set": {"status": "claimed"}}),
+        )
+        .unwrap()
+        .unwrap();
+    assert_eq!(updated["name"], "Alice");
+    assert_eq!(updated["status"], "claimed");
+    assert_eq!(
+        collection
+            .count_documents(&json!({"status": "claimed"}))
+            .unwrap(),
+        1
+    );
+
+    // The claimed document no longer matches the filter
+    let none = db
+        .update_one_returning(
+            &coll_name,
+            &json!({"status": "new"}),
+            &json!({"$set": {"status": "claimed"}}),
+        )
+        .unwrap();
+    assert!(none.is_none());
+
+    // A match the update leaves unchanged is still returned
+    let unchanged = db
+        .update_one_returning(
+            &coll_name,
+            &json!({"name": "Bob"}),
+            &json!({"$set": {"status": "done"}}),
+        )
+        .unwrap()
+        .unwrap();
+    assert_eq!(unchanged["status"], "done");
+    assert_eq!(collection.count_documents(&json!({})).unwrap(), 2);
+}
+
 #[test]
 fn test_update_one_unset() {
     let (db, coll_name) = create_test_db("test");
@@ -199,3 +199,43 @@ fn test_compaction_persistence() {
         assert_eq!(docs.len(), 5);
     }
 }
+
+#[test]
+fn test_auto_compaction_after_deletes() {
+    let temp_dir = TempDir::new().unwrap();
+    let db_path = temp_dir.path().join("compact_auto.mlite");
+
+    let mut db = DatabaseCore::<StorageEngine>::open(&db_path).unwrap();
+    db.set_auto_compact(Some(0.3));
+
+    let docs: Vec<HashMap<String, serde_json::Value>> = (0..1200)
+        .map(|i| {
+            let mut doc = HashMap::new();
+            doc.insert("id".to_string(), json!(i));
+            doc
+        })
+        .collect();
+    db.insert_many("items", docs).unwrap();
+
+    // Below the threshold: a single delete must not trigger compaction
+    db.delete_one("items", &json!({"id": 0})).unwrap();
+    let size_before = std::fs::metadata(&db_path).unwrap().len();
+
+    // Deleting half of the documents pushes the dead ratio over 30%
+    let deleted = db
+        .delete_many("items", &json!({"id": {"$lt": 600}}))
+        .unwrap();
+    assert_eq!(deleted, 599);
+
+    // The file was rewritten without the deleted records
+    let size_after = std::fs::metadata(&db_path).unwrap().len();
+    assert!(size_after < size_before);
+
+    // Nothing is left for an explicit compaction to remove
+    let stats = db.compact().unwrap();
+    assert_eq!(stats.tombstones_removed, 0);
+    assert_eq!(stats.documents_kept, 600);
+
+    let coll = db.collection("items").unwrap();
+    assert_eq!(coll.find(&json!({})).unwrap().len(), 600);
+}
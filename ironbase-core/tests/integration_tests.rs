@@ -958,3 +958,86 @@ fn test_mixed_nested_and_flat_fields() {
         assert_eq!(agg.len(), 2);
     }
 }
+
+#[test]
+fn test_query_cache_shared_across_collection_handles() {
+    let temp_dir = TempDir::new().unwrap();
+    let db_path = temp_dir.path().join("cache.mlite");
+    let db = DatabaseCore::<StorageEngine>::open(&db_path).unwrap();
+
+    // Long-lived handle, as the language bindings keep one per collection
+    let users = db.collection("users").unwrap();
+    db.insert_one(
+        "users",
+        HashMap::from([("name".to_string(), json!("Alice"))]),
+    )
+    .unwrap();
+    assert_eq!(users.find(&json!({"name": "Alice"})).unwrap().len(), 1);
+
+    // Writes through DatabaseCore use fresh handles; the cached result of
+    // `users` must still be invalidated
+    db.insert_one(
+        "users",
+        HashMap::from([("name".to_string(), json!("Alice"))]),
+    )
+    .unwrap();
+    assert_eq!(users.find(&json!({"name": "Alice"})).unwrap().len(), 2);
+
+    db.update_many(
+        "users",
+        &json!({"name": "Alice"}),
+        &json!({"$set": {"name": "Bob"}}),
+    )
+    .unwrap();
+    assert!(users.find(&json!({"name": "Alice"})).unwrap().is_empty());
+}
+
+#[test]
+fn test_find_one_and_update_one_use_field_index() {
+    let temp_dir = TempDir::new().unwrap();
+    let db_path = temp_dir.path().join("find_one_index.mlite");
+    let db = DatabaseCore::<StorageEngine>::open(&db_path).unwrap();
+
+    let posts = db.collection("posts").unwrap();
+    posts.create_index("title".to_string(), false).unwrap();
+
+    for i in 0..50 {
+        db.insert_one(
+            "posts",
+            HashMap::from([
+                ("title".to_string(), json!(format!("Post {}", i % 10))),
+                ("views".to_string(), json!(i)),
+            ]),
+        )
+        .unwrap();
+    }
+
+    let posts = db.collection("posts").unwrap();
+    let doc = posts
+        .find_one(&json!({"title": "Post 7", "views": 27}))
+        .unwrap()
+        .unwrap();
+    assert_eq!(doc["views"], json!(27));
+
+    // Index hits that fail the rest of the filter must not be returned
+    assert!(posts
+        .find_one(&json!({"title": "Post 7", "views": 28}))
+        .unwrap()
+        .is_none());
+
+    let (matched, modified) = db
+        .update_one(
+            "posts",
+            &json!({"title": "Post 3"}),
+            &json!({"$set": {"title": "Renamed"}}),
+        )
+        .unwrap();
+    assert_eq!((matched, modified), (1, 1));
+
+    let posts = db.collection("posts").unwrap();
+    assert_eq!(posts.find(&json!({"title": "Post 3"})).unwrap().len(), 4);
+    assert!(posts
+        .find_one(&json!({"title": "Renamed"}))
+        .unwrap()
+        .is_some());
+}
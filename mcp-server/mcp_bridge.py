@@ -35,6 +35,11 @@ from typing import Dict, Any
 MCP_SERVER_URL = os.environ.get("MCP_SERVER_URL", "http://localhost:8080/mcp")
 DEBUG = os.environ.get("MCP_DEBUG", "0") == "1"
 
+# One keep-alive session for the bridge lifetime: every request reuses the
+# pooled TCP connection instead of reconnecting to the server each time
+SESSION = requests.Session()
+SESSION.headers.update({"Content-Type": "application/json"})
+
 def log_debug(message: str):
     """Log debug message to stderr (won't interfere with stdout)"""
     if DEBUG:
@@ -72,10 +77,9 @@ def process_request(request_line: str) -> Dict[str, Any]:
         log_debug(f"Forwarding request: {method} (id: {request_id})")
 
         # Forward to Rust HTTP server (handles all MCP protocol logic)
-        response = requests.post(
+        response = SESSION.post(
             MCP_SERVER_URL,
             json=request,
-            headers={"Content-Type": "application/json"},
             timeout=30  # 30 second timeout
         )
 
@@ -146,7 +150,7 @@ def main():
     # Test connection to server
     try:
         health_url = MCP_SERVER_URL.rsplit('/mcp', 1)[0] + '/health'
-        response = requests.get(health_url, timeout=5)
+        response = SESSION.get(health_url, timeout=5)
         if response.status_code == 200:
             log_debug("WSL server is reachable")
         else:
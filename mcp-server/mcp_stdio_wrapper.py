@@ -18,6 +18,13 @@ from typing import Dict, Any
 SERVER_URL = "http://127.0.0.1:8080/mcp"
 API_KEY = "dev_key_12345"  # Change this to match your config.toml
 
+# Keep-alive session so consecutive requests reuse one pooled connection
+SESSION = requests.Session()
+SESSION.headers.update({
+    "Content-Type": "application/json",
+    "Authorization": f"Bearer {API_KEY}",
+})
+
 
 def log_error(message: str):
     """Log errors to stderr"""
@@ -27,15 +34,7 @@ def log_error(message: str):
 def forward_request(request: Dict[str, Any]) -> Dict[str, Any]:
     """Forward JSON-RPC request to HTTP server"""
     try:
-        response = requests.post(
-            SERVER_URL,
-            json=request,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {API_KEY}",
-            },
-            timeout=30,
-        )
+        response = SESSION.post(SERVER_URL, json=request, timeout=30)
         response.raise_for_status()
         return response.json()
     except requests.RequestException as e:
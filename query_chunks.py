@@ -2,6 +2,8 @@
 """
 Query chunks_database.mlite - Interactive demo showcasing all query features
 """
+from collections import Counter
+
 from ironbase import IronBase
 
 def main():
@@ -13,18 +15,28 @@ def main():
     db = IronBase("chunks_database.mlite")
     chunks = db.collection("chunks")
 
+    # Chunk count per file in a single collection pass - every statistic
+    # below is derived from this one aggregation result
+    counts = Counter({
+        r["_id"]: r["chunk_count"]
+        for r in chunks.aggregate([
+            {"$group": {"_id": "$files_id", "chunk_count": {"$sum": 1}}}
+        ])
+    })
+    total_chunks = sum(counts.values())
+
+    # Top 5 files by chunk count (heap selection, no full sort)
+    top5 = counts.most_common(5)
+    files_ids = [file_id for file_id, _ in top5]
+
     # Stats
     print(f"\n📊 Database Stats:")
-    print(f"   Total chunks: {chunks.count_documents()}")
-
-    # Get unique files_ids using distinct()
-    files_ids = chunks.distinct("files_id")
-    print(f"   Unique files: {len(files_ids)}")
+    print(f"   Total chunks: {total_chunks}")
+    print(f"   Unique files: {len(counts)}")
 
     # Show files
     print(f"\n📁 Files in database:")
-    for file_id in files_ids[:5]:  # Show first 5
-        chunk_count = chunks.count_documents({"files_id": file_id})
+    for file_id, chunk_count in top5:
         print(f"   - {file_id}: {chunk_count} chunks")
 
     # Query examples
@@ -32,7 +44,7 @@ def main():
 
     # 1. Find first chunk of a file
     print("\n   1. First chunk (n=0) of first file:")
-    first_chunk = chunks.find_one({"files_id": files_ids[0], "n": 0})
+    first_chunk = chunks.find_one({"files_id": files_ids[0], "n": 0}) if files_ids else None
     if first_chunk:
         print(f"      File ID: {first_chunk.get('files_id')}")
         print(f"      Chunk #: {first_chunk.get('n')}")
@@ -41,8 +53,7 @@ def main():
     # 2. Count chunks per file
     print("\n   2. Chunks per file:")
     for file_id in files_ids[:3]:
-        count = chunks.count_documents({"files_id": file_id})
-        print(f"      {file_id}: {count} chunks")
+        print(f"      {file_id}: {counts[file_id]} chunks")
 
     # 3. Find all chunks for a specific file (sorted by n)
     if files_ids:
@@ -57,14 +68,8 @@ def main():
 
     # 4. Aggregate - count by files_id
     print(f"\n   4. Aggregation - chunks grouped by file:")
-    pipeline = [
-        {"$group": {"_id": "$files_id", "chunk_count": {"$sum": 1}}},
-        {"$sort": {"chunk_count": -1}},
-        {"$limit": 5}
-    ]
-    results = chunks.aggregate(pipeline)
-    for result in results:
-        print(f"      {result['_id']}: {result['chunk_count']} chunks")
+    for file_id, chunk_count in top5:
+        print(f"      {file_id}: {chunk_count} chunks")
 
     # 5. Projection - select specific fields only
     print(f"\n   5. Projection - first 3 chunks with only _id and n fields:")
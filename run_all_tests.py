@@ -3,9 +3,20 @@
 IronBase Comprehensive Test Runner
 Runs all test suites and generates a summary report
 """
+import argparse
+import collections
+import io
+import multiprocessing
+import re
+import runpy
+import signal
 import subprocess
 import sys
 import os
+import tempfile
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, as_completed
 from pathlib import Path
 
 # Define test suites in execution order
@@ -33,58 +44,341 @@ TEST_SUITES = [
     ("test_find_50k.py", "Find 50k performance"),
 ]
 
-def run_test(test_file, description):
-    """Run a single test file and return results"""
-    print(f"\n{'=' * 70}")
-    print(f"Running: {description}")
-    print(f"File: {test_file}")
-    print('=' * 70)
+# Tests that simulate crashes by dropping handles without close() need a
+# fresh interpreter so the abandoned database state cannot leak into
+# the runner or the tests that follow. So do tests that crash a child
+# process: it is spawned from their __main__, which must be a real script.
+ISOLATION_MARKERS = ("power_failure", "crash")
+ISOLATION_SOURCE_MARKERS = ("del db", "simulate_power_failure")
 
+# In-process runs need a fresh pool worker per suite (max_tasks_per_child,
+# Python 3.11+) and SIGALRM for their time limit. Without either, every
+# suite gets its own interpreter.
+INPROC_SUPPORTED = sys.version_info >= (3, 11) and hasattr(signal, "SIGALRM")
+
+# Wall-clock limit per suite in seconds, unless SERIAL_SUITES says otherwise
+SUITE_TIMEOUT = 60
+
+
+def needs_process_isolation(test_file):
+    """Check whether a test file must run in its own interpreter"""
+    if not INPROC_SUPPORTED:
+        return True
+    # Long suites print a lot: run_subprocess() streams and caps it
+    if test_file in SERIAL_SUITES:
+        return True
+    if any(marker in test_file for marker in ISOLATION_MARKERS):
+        return True
+    with open(test_file, encoding="utf-8") as f:
+        source = f.read()
+    return any(marker in source for marker in ISOLATION_SOURCE_MARKERS)
+
+
+# Failing suites report at most this much of their output
+OUTPUT_CAP = 1024 * 1024
+
+
+def run_subprocess(test_file, timeout=SUITE_TIMEOUT, env=None):
+    """Run a test file in a child interpreter, return (returncode, stdout, stderr)
+
+    Output is streamed through read_output() instead of buffered whole:
+    only the last five lines are kept for a passing run, and a failing run
+    reports at most OUTPUT_CAP characters. stderr is merged into stdout.
+    """
+    proc = subprocess.Popen(
+        [sys.executable, test_file],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+        env=env
+    )
+
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+
+    try:
+        tail, output = read_output(proc.stdout)
+        returncode = proc.wait()
+    finally:
+        timer.cancel()
+        proc.stdout.close()
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(proc.args, timeout)
+
+    return returncode, tail if returncode == 0 else output, ""
+
+
+def read_output(lines):
+    """Consume output line by line, return (last five lines, capped output)
+
+    The capped output holds at most OUTPUT_CAP characters, so memory use
+    does not grow with a suite's output.
+    """
+    tail = collections.deque(maxlen=5)
+    output = io.StringIO()
+    for line in lines:
+        tail.append(line)
+        if output.tell() < OUTPUT_CAP:
+            output.write(line)
+    return "".join(tail), output.getvalue()
+
+
+class SuiteTimeout(BaseException):
+    """Raised inside an in-process suite that ran past its time limit
+
+    A BaseException, so test code catching Exception cannot swallow it.
+    """
+
+
+def _expire(signum, frame):
+    raise SuiteTimeout()
+
+
+def run_inproc(test_file, timeout=SUITE_TIMEOUT, env=None):
+    """Run a test file as __main__ inside this pool worker
+
+    Saves the interpreter start-up and ironbase import cost of a
+    subprocess.run() per suite. Each worker serves a single suite
+    (max_tasks_per_child=1), so module state such as the engine log level
+    cannot leak into the next one, and env can be applied in place.
+    Output is captured at the file descriptor level to include what the
+    engine prints itself, and the time limit is enforced with SIGALRM.
+    Returns (returncode, stdout, stderr) like run_subprocess().
+    """
+    returncode = 0
+    timed_out = False
+
+    if env is not None:
+        os.environ.update(env)
+
+    with tempfile.TemporaryFile() as capture:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved = [os.dup(1), os.dup(2)]
+        os.dup2(capture.fileno(), 1)
+        os.dup2(capture.fileno(), 2)
+        previous = signal.signal(signal.SIGALRM, _expire)
+        signal.alarm(timeout)
+        try:
+            runpy.run_path(test_file, run_name="__main__")
+        except SystemExit as e:
+            if e.code not in (0, None):
+                returncode = e.code if isinstance(e.code, int) else 1
+        except SuiteTimeout:
+            timed_out = True
+        except BaseException:
+            traceback.print_exc()
+            returncode = 1
+        finally:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, previous)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for fd, copy in zip((1, 2), saved):
+                os.dup2(copy, fd)
+                os.close(copy)
+
+        if timed_out:
+            raise subprocess.TimeoutExpired(test_file, timeout)
+
+        capture.seek(0)
+        lines = io.TextIOWrapper(capture, encoding="utf-8", errors="replace")
+        tail, output = read_output(lines)
+
+    return returncode, tail if returncode == 0 else output, ""
+
+
+def suite_timeout(test_file):
+    """Time limit for a suite in seconds"""
+    return SERIAL_SUITES.get(test_file, SUITE_TIMEOUT)
+
+
+def suite_env(workers):
+    """Environment for a suite whose share of the CPUs is workers
+
+    Suites that start worker processes of their own (E2E_WORKERS) get
+    their share of the CPUs instead of one worker per CPU each, unless
+    the caller set E2E_WORKERS.
+    """
+    env = dict(os.environ)
+    env.setdefault("E2E_WORKERS", str(workers))
+    return env
+
+
+def suite_header(test_file, description):
+    """Heading that starts a suite's report"""
+    return (
+        f"\n{'=' * 70}\n"
+        f"Running: {description}\n"
+        f"File: {test_file}\n"
+        f"{'=' * 70}\n"
+    )
+
+
+def run_test(test_file, description, workers=None):
+    """Run a single test file and return (success, report text)
+
+    The report is returned rather than printed so suites running in
+    parallel workers do not interleave their output. workers is the
+    suite's share of the CPUs, see suite_env().
+    """
+    report = suite_header(test_file, description)
+
+    timeout = suite_timeout(test_file)
+    env = suite_env(workers or os.cpu_count() or 1)
     try:
-        result = subprocess.run(
-            [sys.executable, test_file],
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
-
-        if result.returncode == 0:
-            print(f"✅ PASSED")
+        if needs_process_isolation(test_file):
+            returncode, stdout, stderr = run_subprocess(test_file, timeout, env)
+        else:
+            returncode, stdout, stderr = run_inproc(test_file, timeout, env)
+
+        if returncode == 0:
             # Show last few lines of output
-            lines = result.stdout.strip().split('\n')
-            for line in lines[-5:]:
-                print(f"   {line}")
-            return True
+            lines = stdout.strip().split('\n')
+            tail = "".join(f"   {line}\n" for line in lines[-5:])
+            return True, report + f"✅ PASSED\n{tail}"
         else:
-            print(f"❌ FAILED")
-            print(f"\nSTDOUT:")
-            print(result.stdout)
-            print(f"\nSTDERR:")
-            print(result.stderr)
-            return False
+            return False, report + (
+                f"❌ FAILED\n\nSTDOUT:\n{stdout}\n\nSTDERR:\n{stderr}\n"
+            )
 
     except subprocess.TimeoutExpired:
-        print(f"⏱️ TIMEOUT (> 60s)")
-        return False
+        return False, report + f"⏱️ TIMEOUT (> {timeout}s)\n"
     except Exception as e:
-        print(f"💥 ERROR: {e}")
-        return False
+        return False, report + f"💥 ERROR: {e}\n"
+
+
+# Suites that saturate the disk on their own - never run next to others.
+# They also run far longer than the rest: the value is their time limit.
+SERIAL_SUITES = {
+    "test_e2e_extreme_650k.py": 900,
+    "test_e2e_large_scale_100mb.py": 900,
+}
+
+# Extra time before the runner gives up on a group whose worker does not
+# respond, e.g. one stuck in native code where SIGALRM cannot interrupt it
+GROUP_GRACE = 30
+
+DB_FILE_PATTERN = re.compile(r"""["']([\w.-]+\.mlite)["']""")
+
+
+def db_files(test_file):
+    """Statically collect the .mlite file names a test file refers to"""
+    with open(test_file, encoding="utf-8") as f:
+        return set(DB_FILE_PATTERN.findall(f.read()))
+
+
+def schedule_groups(suites):
+    """Partition suites into groups whose database files are pairwise disjoint
+
+    Groups run one after another; the suites inside a group run in
+    parallel. Order inside TEST_SUITES is kept as far as possible.
+    """
+    groups = []  # list of (suites, db files used by the group)
+
+    for suite in suites:
+        test_file = suite[0]
+        if test_file in SERIAL_SUITES:
+            groups.append(([suite], None))
+            continue
+
+        files = db_files(test_file)
+        for members, used in groups:
+            if used is not None and not (used & files):
+                members.append(suite)
+                used |= files
+                break
+        else:
+            groups.append(([suite], set(files)))
+
+    return [members for members, _ in groups]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run all IronBase Python test suites")
+    parser.add_argument("-x", "--fail-fast", action="store_true",
+                        help="Stop scheduling suites after the first failure")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
 
-def main():
     print("=" * 70)
     print("IronBase Comprehensive Test Suite")
     print("=" * 70)
 
-    results = []
-    passed = 0
-    failed = 0
+    # One directory read instead of a stat per suite
+    present = {entry.name for entry in os.scandir(".") if entry.is_file()}
 
+    suites = []
     for test_file, description in TEST_SUITES:
-        if not os.path.exists(test_file):
+        if test_file not in present:
             print(f"\n⚠️ SKIPPED: {test_file} (file not found)")
             continue
+        suites.append((test_file, description))
+
+    # Spawned workers: forking a process that already loaded the Rust
+    # extension is not safe. One suite per worker, see run_inproc().
+    outcomes = {}
+    stopped = False
+    context = multiprocessing.get_context("spawn")
+    pool_options = {"max_tasks_per_child": 1} if INPROC_SUPPORTED else {}
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=context,
+                             **pool_options) as executor:
+        for group in schedule_groups(suites):
+            # The group's suites run side by side and split the CPUs
+            workers = max(1, (os.cpu_count() or 1) // len(group))
+            futures = {executor.submit(run_test, *suite, workers): suite for suite in group}
+            # Upper bound even if the group's suites ran one after another
+            deadline = sum(suite_timeout(test_file) for test_file, _ in group) + GROUP_GRACE
+            try:
+                for future in as_completed(futures, timeout=deadline):
+                    if future.cancelled():
+                        continue
+                    success, report = future.result()
+                    outcomes[futures[future]] = (success, report)
+
+                    if not success and args.fail_fast:
+                        # Suites already running still finish and are reported
+                        for pending in futures:
+                            pending.cancel()
+                        stopped = True
+            except TimeoutError:
+                # A worker ignored its time limit: report what is left as
+                # timed out and kill the pool, which cannot be reused
+                for future, (test_file, description) in futures.items():
+                    if not future.done():
+                        outcomes[(test_file, description)] = (False, (
+                            suite_header(test_file, description)
+                            + f"⏱️ TIMEOUT (no result after {deadline}s)\n"
+                        ))
+                executor.shutdown(wait=False, cancel_futures=True)
+                for child in multiprocessing.active_children():
+                    child.kill()
+                stopped = True
 
-        success = run_test(test_file, description)
+            if stopped:
+                break
+
+    results = []
+    passed = 0
+    failed = 0
+
+    # Report in TEST_SUITES order regardless of completion order
+    for test_file, description in suites:
+        if (test_file, description) not in outcomes:
+            continue
+        success, report = outcomes[(test_file, description)]
+        sys.stdout.write(report)
         results.append((test_file, description, success))
 
         if success:
@@ -92,28 +386,38 @@ def main():
         else:
             failed += 1
 
-    # Summary report
-    print("\n" + "=" * 70)
-    print("TEST SUMMARY")
-    print("=" * 70)
+    # Summary report - built in one buffer and written once
+    lines = [
+        "",
+        "=" * 70,
+        "TEST SUMMARY",
+        "=" * 70,
+    ]
 
     for test_file, description, success in results:
         status = "✅ PASS" if success else "❌ FAIL"
-        print(f"{status} - {description}")
+        lines.append(f"{status} - {description}")
 
-    print("\n" + "=" * 70)
-    print(f"Total: {passed + failed} tests")
-    print(f"Passed: {passed} ✅")
-    print(f"Failed: {failed} ❌")
+    lines += [
+        "",
+        "=" * 70,
+        f"Total: {passed + failed} tests",
+        f"Passed: {passed} ✅",
+        f"Failed: {failed} ❌",
+    ]
+
+    if stopped and len(outcomes) < len(suites):
+        lines.append(f"Not run: {len(suites) - len(outcomes)} (stopped early)")
 
     if failed == 0:
-        print("\n🎉 ALL TESTS PASSED!")
-        print("=" * 70)
-        return 0
+        lines += ["", "🎉 ALL TESTS PASSED!", "=" * 70]
+        exit_code = 0
     else:
-        print(f"\n⚠️ {failed} test(s) failed")
-        print("=" * 70)
-        return 1
+        lines += ["", f"⚠️ {failed} test(s) failed", "=" * 70]
+        exit_code = 1
+
+    sys.stdout.write("\n".join(lines) + "\n")
+    return exit_code
 
 if __name__ == "__main__":
     sys.exit(main())
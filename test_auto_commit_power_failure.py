@@ -3,25 +3,37 @@
 Auto-Commit Power Failure Recovery Tests
 
 Tests that verify data durability guarantees for each durability mode.
-Simulates power failure by NOT calling close() or checkpoint().
+Simulates power failure by killing a child process that never calls
+close() or checkpoint().
 """
 
-import os
 import sys
 from ironbase import IronBase
+from test_support import cleanup, simulate_power_failure, wal_stats
 
+# Batch mode test: 2 full batches + 5 uncommitted
+BATCH_SIZE = 10
+BATCH_TOTAL_DOCS = 25
 
-def simulate_power_failure():
-    """
-    Simulate power failure by deleting database object WITHOUT calling close().
-    This leaves the DB in whatever state it was mid-operation.
-    """
-    # In real power failure:
-    # - No flush() called
-    # - No close() called
-    # - File buffers may be partially written (OS dependent)
-    # - WAL file is in whatever state it was
-    pass
+
+def safe_mode_phase1(db_path):
+    """test_safe_mode_zero_data_loss phase 1: insert, then crash"""
+    # Phase 1: Insert data in Safe mode
+    print("Phase 1: Insert 100 documents in Safe mode")
+    db = IronBase(db_path, durability="safe")
+    col = db.collection("test")
+
+    col.insert_many([{"value": i, "mode": "safe"} for i in range(100)])
+
+    count_before = col.count_documents({})
+    print(f"  Documents before crash: {count_before}")
+
+    # Check WAL (should have entries from last operation, all synced)
+    wal = wal_stats(db)
+    print(f"  WAL: {wal['size']} bytes logged, {wal['durable_size']} synced")
+
+    # ⚡ POWER FAILURE - no close(), no flush()
+    print("\n  ⚡ POWER FAILURE (simulated crash)")
 
 
 def test_safe_mode_zero_data_loss():
@@ -35,32 +47,11 @@ def test_safe_mode_zero_data_loss():
     wal_path = "test_safe_pf.wal"
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print("=== Test 1: Safe Mode - ZERO Data Loss ===\n")
 
-    # Phase 1: Insert data in Safe mode
-    print("Phase 1: Insert 100 documents in Safe mode")
-    db = IronBase(db_path, durability="safe")
-    col = db.collection("test")
-
-    for i in range(100):
-        col.insert_one({"value": i, "mode": "safe"})
-
-    count_before = col.count_documents({})
-    print(f"  Documents before crash: {count_before}")
-
-    # Check WAL (should have entries from last operation)
-    wal_exists = os.path.exists(wal_path)
-    wal_size = os.path.getsize(wal_path) if wal_exists else 0
-    print(f"  WAL file: {'exists' if wal_exists else 'missing'}, {wal_size} bytes")
-
-    # ⚡ POWER FAILURE - no close(), no flush()
-    print("\n  ⚡ POWER FAILURE (simulated crash)")
-    del col
-    del db
+    simulate_power_failure(safe_mode_phase1, db_path)
 
     # Phase 2: Recovery
     print("\nPhase 2: Reopen database and check recovery")
@@ -82,14 +73,29 @@ def test_safe_mode_zero_data_loss():
     db2.close()
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print()
     return True
 
 
+def batch_mode_phase1(db_path):
+    """test_batch_mode_bounded_loss phase 1: insert, then crash mid-batch"""
+    print(f"Phase 1: Insert {BATCH_TOTAL_DOCS} documents (batch_size={BATCH_SIZE})")
+    db = IronBase(db_path, durability="batch", batch_size=BATCH_SIZE)
+    col = db.collection("test")
+
+    # insert_many still counts every document against batch_size
+    col.insert_many([{"value": i, "mode": "batch"} for i in range(BATCH_TOTAL_DOCS)])
+
+    count_before = col.count_documents({})
+    print(f"  Documents before crash: {count_before}")
+    print(f"  Expected after crash: ≥ {BATCH_TOTAL_DOCS - BATCH_SIZE} (2 committed batches)")
+
+    # ⚡ POWER FAILURE - no close(), no flush()
+    print("\n  ⚡ POWER FAILURE (last 5 operations uncommitted)")
+
+
 def test_batch_mode_bounded_loss():
     """
     Batch Mode: Bounded data loss (max batch_size operations)
@@ -101,46 +107,26 @@ def test_batch_mode_bounded_loss():
     wal_path = "test_batch_pf.wal"
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print("=== Test 2: Batch Mode - Bounded Data Loss ===\n")
 
-    # Phase 1: Insert data in Batch mode
-    batch_size = 10
-    total_docs = 25  # 2 full batches + 5 uncommitted
-
-    print(f"Phase 1: Insert {total_docs} documents (batch_size={batch_size})")
-    db = IronBase(db_path, durability="batch", batch_size=batch_size)
-    col = db.collection("test")
-
-    for i in range(total_docs):
-        col.insert_one({"value": i, "mode": "batch"})
-
-    count_before = col.count_documents({})
-    print(f"  Documents before crash: {count_before}")
-    print(f"  Expected after crash: ≥ {total_docs - batch_size} (2 committed batches)")
-
-    # ⚡ POWER FAILURE - no close(), no flush()
-    print("\n  ⚡ POWER FAILURE (last 5 operations uncommitted)")
-    del col
-    del db
+    simulate_power_failure(batch_mode_phase1, db_path)
 
     # Phase 2: Recovery
     print("\nPhase 2: Reopen database and check recovery")
-    db2 = IronBase(db_path, durability="batch", batch_size=batch_size)
+    db2 = IronBase(db_path, durability="batch", batch_size=BATCH_SIZE)
     col2 = db2.collection("test")
 
     count_after = col2.count_documents({})
     print(f"  Documents after recovery: {count_after}")
 
     # Verify bounded loss (at least 2 full batches = 20 docs)
-    min_expected = total_docs - batch_size  # 25 - 10 = 15
+    min_expected = BATCH_TOTAL_DOCS - BATCH_SIZE  # 25 - 10 = 15
     if count_after >= min_expected:
-        lost = total_docs - count_after
+        lost = BATCH_TOTAL_DOCS - count_after
         print(f"  ✓ SUCCESS: Recovered {count_after} documents")
-        print(f"  ✓ Data loss bounded: {lost} documents lost (< batch_size={batch_size})")
+        print(f"  ✓ Data loss bounded: {lost} documents lost (< batch_size={BATCH_SIZE})")
     else:
         print(f"  ✗ FAILED: Expected ≥ {min_expected}, got {count_after}")
         return False
@@ -148,14 +134,28 @@ def test_batch_mode_bounded_loss():
     db2.close()
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print()
     return True
 
 
+def unsafe_mode_phase1(db_path):
+    """test_unsafe_mode_high_risk phase 1: insert without checkpoint, then crash"""
+    # Phase 1: Insert data in Unsafe mode
+    print("Phase 1: Insert 100 documents in Unsafe mode (no checkpoint)")
+    db = IronBase(db_path, durability="unsafe")
+    col = db.collection("test")
+
+    col.insert_many([{"value": i, "mode": "unsafe"} for i in range(100)])
+
+    count_before = col.count_documents({})
+    print(f"  Documents before crash: {count_before}")
+
+    # ⚡ POWER FAILURE - no close(), no flush(), no checkpoint()
+    print("\n  ⚡ POWER FAILURE (NO checkpoint called)")
+
+
 def test_unsafe_mode_high_risk():
     """
     Unsafe Mode: High data loss risk
@@ -166,27 +166,11 @@ def test_unsafe_mode_high_risk():
     wal_path = "test_unsafe_pf.wal"
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print("=== Test 3: Unsafe Mode - High Data Loss Risk ===\n")
 
-    # Phase 1: Insert data in Unsafe mode
-    print("Phase 1: Insert 100 documents in Unsafe mode (no checkpoint)")
-    db = IronBase(db_path, durability="unsafe")
-    col = db.collection("test")
-
-    for i in range(100):
-        col.insert_one({"value": i, "mode": "unsafe"})
-
-    count_before = col.count_documents({})
-    print(f"  Documents before crash: {count_before}")
-
-    # ⚡ POWER FAILURE - no close(), no flush(), no checkpoint()
-    print("\n  ⚡ POWER FAILURE (NO checkpoint called)")
-    del col
-    del db
+    simulate_power_failure(unsafe_mode_phase1, db_path)
 
     # Phase 2: Recovery
     print("\nPhase 2: Reopen database and check recovery")
@@ -207,14 +191,26 @@ def test_unsafe_mode_high_risk():
     db2.close()
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print()
     return True  # Unsafe mode is "working as designed" even with data loss
 
 
+def wal_replay_phase1(db_path):
+    """test_safe_mode_wal_replay phase 1: second batch after a clean close, then crash"""
+    # Second batch (will crash)
+    db2 = IronBase(db_path, durability="safe")
+    col2 = db2.collection("test")
+
+    col2.insert_many([{"value": i, "batch": 2} for i in range(50, 100)])
+
+    print(f"  Documents before crash: {col2.count_documents({})}")
+
+    # ⚡ POWER FAILURE
+    print("\n  ⚡ POWER FAILURE (after second batch)")
+
+
 def test_safe_mode_wal_replay():
     """
     Safe Mode: WAL Replay verification
@@ -225,9 +221,7 @@ def test_safe_mode_wal_replay():
     wal_path = "test_wal_replay.wal"
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print("=== Test 4: Safe Mode - WAL Replay Verification ===\n")
 
@@ -238,25 +232,12 @@ def test_safe_mode_wal_replay():
     db = IronBase(db_path, durability="safe")
     col = db.collection("test")
 
-    for i in range(50):
-        col.insert_one({"value": i, "batch": 1})
+    col.insert_many([{"value": i, "batch": 1} for i in range(50)])
 
     db.close()  # Clean close
     print("  ✓ First 50 documents committed")
 
-    # Second batch (will crash)
-    db2 = IronBase(db_path, durability="safe")
-    col2 = db2.collection("test")
-
-    for i in range(50, 100):
-        col2.insert_one({"value": i, "batch": 2})
-
-    print(f"  Documents before crash: {col2.count_documents({})}")
-
-    # ⚡ POWER FAILURE
-    print("\n  ⚡ POWER FAILURE (after second batch)")
-    del col2
-    del db2
+    simulate_power_failure(wal_replay_phase1, db_path)
 
     # Phase 2: Recovery and verification
     print("\nPhase 2: Verify WAL replay")
@@ -280,9 +261,7 @@ def test_safe_mode_wal_replay():
     db3.close()
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print()
     return True
@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
 """Test WAL checkpoint functionality"""
 
-import os
 from ironbase import IronBase
+from test_support import cleanup, wal_stats
 
 def test_checkpoint():
     """Test that checkpoint prevents WAL growth"""
@@ -10,9 +10,7 @@ def test_checkpoint():
     wal_path = "test_checkpoint.wal"
 
     # Clean up
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print("=== WAL Checkpoint Test ===\n")
 
@@ -21,57 +19,72 @@ def test_checkpoint():
     col = db.collection("test")
 
     print("Phase 1: Insert 1000 documents WITHOUT checkpoint")
-    for i in range(1000):
-        col.insert_one({"value": i})
+    col.insert_many({"value": i} for i in range(1000))
 
-    # Check WAL size before checkpoint
-    wal_size_before = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    # Check WAL size before checkpoint (the engine's count: the file itself
+    # is preallocated and says nothing about what has been logged)
+    wal = wal_stats(db)
+    wal_size_before = wal["size"]
     print(f"  WAL size before checkpoint: {wal_size_before} bytes")
 
+    # Every commit is padded out to a 4KB block and fsynced
+    assert wal_size_before > 0 and wal_size_before % 4096 == 0, (
+        f"WAL not block-aligned ({wal_size_before} bytes)"
+    )
+    print("  ✓ WAL is block-aligned")
+
+    assert wal["durable_size"] == wal_size_before, (
+        f"Only {wal['durable_size']} of {wal_size_before} bytes synced"
+    )
+    print("  ✓ WAL fully synced")
+
     # Checkpoint should clear WAL
     print("\nPhase 2: Call checkpoint()")
     db.checkpoint()
 
-    # Check WAL size after checkpoint
-    wal_size_after = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    wal = wal_stats(db)
+    wal_size_after = wal["size"]
+    allocated_after = wal["allocated"]
     print(f"  WAL size after checkpoint: {wal_size_after} bytes")
 
-    if wal_size_after == 0:
-        print("  ✓ WAL cleared successfully!")
-    else:
-        print(f"  ✗ WAL not cleared (still {wal_size_after} bytes)")
+    assert wal_size_after == 0, f"WAL not cleared (still holds {wal_size_after} bytes)"
+    print("  ✓ WAL cleared successfully!")
 
     # Insert more documents
     print("\nPhase 3: Insert 1000 more documents")
-    for i in range(1000, 2000):
-        col.insert_one({"value": i})
+    col.insert_many({"value": i} for i in range(1000, 2000))
 
-    wal_size_after_insert = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
-    print(f"  WAL size after 1000 more inserts: {wal_size_after_insert} bytes")
+    wal = wal_stats(db)
+    print(f"  WAL size after 1000 more inserts: {wal['size']} bytes")
+
+    # The segment is recycled, not truncated: new entries reuse its blocks
+    if wal["size"] > 0 and wal["allocated"] == allocated_after:
+        print("  ✓ Recycled WAL segment reused (no growth)")
+    else:
+        print(f"  ⚠ WAL file grew from {allocated_after} to {wal['allocated']} bytes")
 
     # Checkpoint again
     print("\nPhase 4: Call checkpoint() again")
     db.checkpoint()
 
-    wal_size_final = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    wal_size_final = wal_stats(db)["size"]
     print(f"  WAL size after second checkpoint: {wal_size_final} bytes")
 
+    assert wal_size_final == 0, "WAL not cleared by second checkpoint"
+    print("  ✓ WAL cleared again!")
+
     # Verify data integrity
     print("\nPhase 5: Verify data integrity")
     count = col.count_documents({})
     print(f"  Total documents: {count}")
 
-    if count == 2000:
-        print("  ✓ All documents preserved!")
-    else:
-        print(f"  ✗ Expected 2000 documents, got {count}")
+    assert count == 2000, f"Expected 2000 documents, got {count}"
+    print("  ✓ All documents preserved!")
 
     db.close()
 
     # Clean up
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print("\n=== Test Complete ===")
 
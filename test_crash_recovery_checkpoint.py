@@ -1,38 +1,41 @@
 #!/usr/bin/env python3
-"""Test crash recovery with WAL checkpoint"""
+"""Test crash recovery with WAL checkpoint
+
+Crashes are simulated by killing a child process that never calls close().
+"""
 
-import os
 import sys
 from ironbase import IronBase
+from test_support import cleanup, simulate_power_failure, wal_stats
 
-def test_crash_before_checkpoint():
-    """Test crash BEFORE checkpoint - WAL should recover data"""
-    db_path = "test_crash1.mlite"
-    wal_path = "test_crash1.wal"
-
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
-
-    print("=== Scenario 1: Crash BEFORE Checkpoint ===\n")
-
+def before_checkpoint_phase1(db_path):
+    """test_crash_before_checkpoint phase 1: insert without checkpoint, then crash"""
     # Phase 1: Write data but DON'T checkpoint
     print("Phase 1: Insert 100 documents WITHOUT checkpoint")
     db = IronBase(db_path)
     col = db.collection("test")
 
-    for i in range(100):
-        col.insert_one({"value": i, "data": f"Entry {i}"})
+    col.insert_many({"value": i, "data": f"Entry {i}"} for i in range(100))
 
-    wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
-    print(f"  WAL size: {wal_size} bytes")
+    wal = wal_stats(db)
+    print(f"  WAL size: {wal['size']} bytes ({wal['durable_size']} synced)")
     print(f"  Document count: {col.count_documents({})}")
 
     # Simulate crash - DON'T call close()
     print("\n  💥 SIMULATED CRASH (no close, no checkpoint)")
-    del col
-    del db
+
+
+def test_crash_before_checkpoint():
+    """Test crash BEFORE checkpoint - WAL should recover data"""
+    db_path = "test_crash1.mlite"
+    wal_path = "test_crash1.wal"
+
+    # Cleanup
+    cleanup(db_path, wal_path)
+
+    print("=== Scenario 1: Crash BEFORE Checkpoint ===\n")
+
+    simulate_power_failure(before_checkpoint_phase1, db_path)
 
     # Phase 2: Reopen and check recovery
     print("\nPhase 2: Reopen database (WAL recovery should happen)")
@@ -49,7 +52,7 @@ def test_crash_before_checkpoint():
         return False
 
     # Check WAL cleared after recovery
-    wal_size_after = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    wal_size_after = wal_stats(db2)["size"]
     print(f"  WAL size after recovery: {wal_size_after} bytes")
 
     if wal_size_after == 0:
@@ -60,40 +63,27 @@ def test_crash_before_checkpoint():
     db2.close()
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print("  ✓ Scenario 1 PASSED\n")
     return True
 
 
-def test_crash_after_checkpoint():
-    """Test crash AFTER checkpoint - data in DB, WAL empty"""
-    db_path = "test_crash2.mlite"
-    wal_path = "test_crash2.wal"
-
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
-
-    print("=== Scenario 2: Crash AFTER Checkpoint ===\n")
-
+def after_checkpoint_phase1(db_path):
+    """test_crash_after_checkpoint phase 1: insert and checkpoint, then crash"""
     # Phase 1: Write data and checkpoint
     print("Phase 1: Insert 100 documents WITH checkpoint")
     db = IronBase(db_path)
     col = db.collection("test")
 
-    for i in range(100):
-        col.insert_one({"value": i, "data": f"Entry {i}"})
+    col.insert_many({"value": i, "data": f"Entry {i}"} for i in range(100))
 
     print(f"  Document count before checkpoint: {col.count_documents({})}")
 
     # Checkpoint - this should flush to DB and clear WAL
     db.checkpoint()
 
-    wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    wal_size = wal_stats(db)["size"]
     print(f"  WAL size after checkpoint: {wal_size} bytes")
 
     if wal_size == 0:
@@ -103,8 +93,19 @@ def test_crash_after_checkpoint():
 
     # Simulate crash AFTER checkpoint
     print("\n  💥 SIMULATED CRASH (after checkpoint)")
-    del col
-    del db
+
+
+def test_crash_after_checkpoint():
+    """Test crash AFTER checkpoint - data in DB, WAL empty"""
+    db_path = "test_crash2.mlite"
+    wal_path = "test_crash2.wal"
+
+    # Cleanup
+    cleanup(db_path, wal_path)
+
+    print("=== Scenario 2: Crash AFTER Checkpoint ===\n")
+
+    simulate_power_failure(after_checkpoint_phase1, db_path)
 
     # Phase 2: Reopen and verify data
     print("\nPhase 2: Reopen database (should load from DB, not WAL)")
@@ -123,34 +124,21 @@ def test_crash_after_checkpoint():
     db2.close()
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print("  ✓ Scenario 2 PASSED\n")
     return True
 
 
-def test_crash_between_writes():
-    """Test crash in middle of write cycle"""
-    db_path = "test_crash3.mlite"
-    wal_path = "test_crash3.wal"
-
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
-
-    print("=== Scenario 3: Crash Between Write Cycles ===\n")
-
+def between_writes_phase1(db_path):
+    """test_crash_between_writes phase 1: checkpoint between two batches, then crash"""
     # Phase 1: Write batch 1, checkpoint, write batch 2, crash
     print("Phase 1: Write 50 docs → checkpoint → write 50 more → crash")
     db = IronBase(db_path)
     col = db.collection("test")
 
     # Batch 1
-    for i in range(50):
-        col.insert_one({"batch": 1, "value": i})
+    col.insert_many({"batch": 1, "value": i} for i in range(50))
 
     print(f"  After batch 1: {col.count_documents({})} documents")
 
@@ -159,18 +147,28 @@ def test_crash_between_writes():
     print("  ✓ Checkpoint done")
 
     # Batch 2 (in WAL, not checkpointed)
-    for i in range(50, 100):
-        col.insert_one({"batch": 2, "value": i})
+    col.insert_many({"batch": 2, "value": i} for i in range(50, 100))
 
     print(f"  After batch 2: {col.count_documents({})} documents")
 
-    wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
-    print(f"  WAL size before crash: {wal_size} bytes")
+    wal = wal_stats(db)
+    print(f"  WAL size before crash: {wal['size']} bytes ({wal['durable_size']} synced)")
 
     # Crash without checkpoint
     print("\n  💥 SIMULATED CRASH (batch 2 only in WAL)")
-    del col
-    del db
+
+
+def test_crash_between_writes():
+    """Test crash in middle of write cycle"""
+    db_path = "test_crash3.mlite"
+    wal_path = "test_crash3.wal"
+
+    # Cleanup
+    cleanup(db_path, wal_path)
+
+    print("=== Scenario 3: Crash Between Write Cycles ===\n")
+
+    simulate_power_failure(between_writes_phase1, db_path)
 
     # Phase 2: Recovery
     print("\nPhase 2: Reopen (should recover batch 1 from DB + batch 2 from WAL)")
@@ -194,9 +192,7 @@ def test_crash_between_writes():
     db2.close()
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print("  ✓ Scenario 3 PASSED\n")
     return True
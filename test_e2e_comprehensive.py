@@ -5,28 +5,23 @@ Tests all major features in realistic scenarios
 """
 
 from ironbase import IronBase
+from test_support import e2e_workers, importable, spawn_pool
+import contextlib
+import io
 import os
+import tempfile
 import time
 
 # Disable verbose logging for cleaner test output
 IronBase.set_log_level("WARN")
 
-def cleanup(path):
-    """Clean up test database files"""
-    for ext in [".mlite", ".wal"]:
-        try:
-            os.remove(path.replace(".mlite", ext))
-        except FileNotFoundError:
-            pass
-
-def test_basic_crud_operations():
+def test_basic_crud_operations(tmp):
     """E2E Test 1: Basic CRUD operations"""
     print("=" * 70)
     print("E2E TEST 1: Basic CRUD Operations")
     print("=" * 70)
 
-    db_path = "test_e2e_crud.mlite"
-    cleanup(db_path)
+    db_path = os.path.join(tmp, "test_e2e_crud.mlite")
 
     db = IronBase(db_path)
     users = db.collection("users")
@@ -56,7 +51,7 @@ def test_basic_crud_operations():
     # READ - Find one
     alice = users.find_one({"name": "Alice"})
     assert alice is not None
-    assert alice["age"] == 30
+    assert {"_id": alice_id, "age": 30, "email": "alice@example.com"}.items() <= alice.items(), alice
     print(f"✓ Find one: {alice['name']} (age {alice['age']})")
 
     # READ - Count documents
@@ -66,14 +61,12 @@ def test_basic_crud_operations():
 
     # UPDATE - Update one
     result = users.update_one({"name": "Alice"}, {"$set": {"age": 31, "updated": True}})
-    assert result["matched_count"] == 1
-    assert result["modified_count"] == 1
+    assert {"matched_count": 1, "modified_count": 1}.items() <= result.items(), result
     print(f"✓ Update one: matched={result['matched_count']}, modified={result['modified_count']}")
 
     # Verify update
     alice = users.find_one({"name": "Alice"})
-    assert alice["age"] == 31
-    assert alice["updated"] == True
+    assert {"_id": alice_id, "age": 31, "updated": True}.items() <= alice.items(), alice
     print(f"✓ Verified update: age={alice['age']}, updated={alice['updated']}")
 
     # UPDATE - Update many
@@ -97,17 +90,15 @@ def test_basic_crud_operations():
     print(f"✓ Final count: {final_count} documents")
 
     db.close()
-    cleanup(db_path)
     print("✅ PASSED: Basic CRUD Operations\n")
 
-def test_complex_queries():
+def test_complex_queries(tmp):
     """E2E Test 2: Complex query operations"""
     print("=" * 70)
     print("E2E TEST 2: Complex Query Operations")
     print("=" * 70)
 
-    db_path = "test_e2e_queries.mlite"
-    cleanup(db_path)
+    db_path = os.path.join(tmp, "test_e2e_queries.mlite")
 
     db = IronBase(db_path)
     products = db.collection("products")
@@ -164,29 +155,40 @@ def test_complex_queries():
     print(f"✓ Distinct categories (len={len(categories)}): {sorted(categories)}")
 
     db.close()
-    cleanup(db_path)
     print("✅ PASSED: Complex Query Operations\n")
 
-def test_indexing_and_performance():
+def test_indexing_and_performance(tmp):
     """E2E Test 3: Index creation and query optimization"""
     print("=" * 70)
     print("E2E TEST 3: Indexing and Query Optimization")
     print("=" * 70)
 
-    db_path = "test_e2e_indexes.mlite"
-    cleanup(db_path)
+    db_path = os.path.join(tmp, "test_e2e_indexes.mlite")
 
     db = IronBase(db_path)
     orders = db.collection("orders")
 
     # Insert test data
     print("Inserting 100 orders...")
-    orders.insert_many([
-        {"order_id": i, "customer": f"Customer_{i % 10}", "amount": (i * 17) % 500, "status": "pending" if i % 2 == 0 else "completed"}
-        for i in range(100)
-    ])
+    ids = range(100)
+    orders.insert_many_columns({
+        "order_id": ids,
+        "customer": [f"Customer_{i % 10}" for i in ids],
+        "amount": [(i * 17) % 500 for i in ids],
+        "status": ["pending" if i % 2 == 0 else "completed" for i in ids],
+    })
     print("✓ Inserted 100 orders")
 
+    # Strings/bytes are not split into rows; an empty mapping inserts nothing
+    for bad in ({"customer": "Customer_1"}, {"payload": b"abc"}, {}):
+        try:
+            orders.insert_many_columns(bad)
+        except ValueError as e:
+            print(f"✓ insert_many_columns({bad!r}) rejected: {e}")
+        else:
+            raise AssertionError(f"insert_many_columns({bad!r}) should raise ValueError")
+    assert orders.count_documents() == 100
+
     # Create index on customer field
     idx_name = orders.create_index("customer", unique=False)
     print(f"✓ Created index on 'customer' field: {idx_name}")
@@ -197,11 +199,11 @@ def test_indexing_and_performance():
     print(f"✓ Total indexes: {len(indexes)}")
 
     # Query with index hint (should use index)
-    start = time.time()
+    start = time.perf_counter_ns()
     results = orders.find_with_hint({"customer": "Customer_5"}, idx_name)
-    elapsed = time.time() - start
+    elapsed_ns = time.perf_counter_ns() - start
     assert len(results) == 10  # Customer_5, Customer_15, ..., Customer_95
-    print(f"✓ Index query: {len(results)} results in {elapsed*1000:.2f}ms")
+    print(f"✓ Index query: {len(results)} results in {elapsed_ns / 1e6:.3f}ms")
 
     # Explain query
     explanation = orders.explain({"customer": "Customer_3"})
@@ -215,17 +217,15 @@ def test_indexing_and_performance():
     print(f"✓ Dropped index: {len(indexes_after)} indexes remain")
 
     db.close()
-    cleanup(db_path)
     print("✅ PASSED: Indexing and Query Optimization\n")
 
-def test_aggregation_pipeline():
+def test_aggregation_pipeline(tmp):
     """E2E Test 4: Aggregation pipeline operations"""
     print("=" * 70)
     print("E2E TEST 4: Aggregation Pipeline")
     print("=" * 70)
 
-    db_path = "test_e2e_aggregation.mlite"
-    cleanup(db_path)
+    db_path = os.path.join(tmp, "test_e2e_aggregation.mlite")
 
     db = IronBase(db_path)
     sales = db.collection("sales")
@@ -268,17 +268,15 @@ def test_aggregation_pipeline():
     print(f"✓ Laptop total quantity: {laptop_sales[0]['total_quantity']}")
 
     db.close()
-    cleanup(db_path)
     print("✅ PASSED: Aggregation Pipeline\n")
 
-def test_transactions():
+def test_transactions(tmp):
     """E2E Test 5: Transaction operations (ACD - no Isolation)"""
     print("=" * 70)
     print("E2E TEST 5: Transactions (ACD)")
     print("=" * 70)
 
-    db_path = "test_e2e_transactions.mlite"
-    cleanup(db_path)
+    db_path = os.path.join(tmp, "test_e2e_transactions.mlite")
 
     db = IronBase(db_path)
 
@@ -312,17 +310,15 @@ def test_transactions():
     print("✓ Rolled back all operations")
 
     db.close()
-    cleanup(db_path)
     print("✅ PASSED: Transactions (API validated)\n")
 
-def test_array_update_operators():
+def test_array_update_operators(tmp):
     """E2E Test 6: Array update operators"""
     print("=" * 70)
     print("E2E TEST 6: Array Update Operators")
     print("=" * 70)
 
-    db_path = "test_e2e_arrays.mlite"
-    cleanup(db_path)
+    db_path = os.path.join(tmp, "test_e2e_arrays.mlite")
 
     db = IronBase(db_path)
     posts = db.collection("posts")
@@ -336,50 +332,46 @@ def test_array_update_operators():
     })
     print("✓ Inserted post with arrays")
 
+    # Each update_one_returning call applies the update and returns the
+    # updated post in the same call, so no find_one is needed to verify it
+
     # $push - Add new tag
-    posts.update_one({"title": "My First Post"}, {"$push": {"tags": "database"}})
-    post = posts.find_one({"title": "My First Post"})
+    post = posts.update_one_returning({"title": "My First Post"}, {"$push": {"tags": "database"}})
     assert "database" in post["tags"]
     assert len(post["tags"]) == 3
     print(f"✓ $push: tags = {post['tags']}")
 
     # $addToSet - Add unique comment
     posts.update_one({"title": "My First Post"}, {"$addToSet": {"comments": "Awesome!"}})
-    posts.update_one({"title": "My First Post"}, {"$addToSet": {"comments": "Awesome!"}})  # Duplicate
-    post = posts.find_one({"title": "My First Post"})
+    post = posts.update_one_returning({"title": "My First Post"}, {"$addToSet": {"comments": "Awesome!"}})  # Duplicate
     assert post["comments"].count("Awesome!") == 1  # Should appear only once
     print(f"✓ $addToSet: comments = {post['comments']}")
 
     # $pull - Remove a tag
-    posts.update_one({"title": "My First Post"}, {"$pull": {"tags": "rust"}})
-    post = posts.find_one({"title": "My First Post"})
+    post = posts.update_one_returning({"title": "My First Post"}, {"$pull": {"tags": "rust"}})
     assert "rust" not in post["tags"]
     print(f"✓ $pull: tags = {post['tags']}")
 
     # $pop - Remove last comment
-    posts.update_one({"title": "My First Post"}, {"$pop": {"comments": 1}})
-    post = posts.find_one({"title": "My First Post"})
+    post = posts.update_one_returning({"title": "My First Post"}, {"$pop": {"comments": 1}})
     assert len(post["comments"]) == 2  # Was 3, now 2
     print(f"✓ $pop: comments = {post['comments']}")
 
     # $inc - Increment likes
-    posts.update_one({"title": "My First Post"}, {"$inc": {"likes": 5}})
-    post = posts.find_one({"title": "My First Post"})
+    post = posts.update_one_returning({"title": "My First Post"}, {"$inc": {"likes": 5}})
     assert post["likes"] == 15  # Was 10, now 15
     print(f"✓ $inc: likes = {post['likes']}")
 
     db.close()
-    cleanup(db_path)
     print("✅ PASSED: Array Update Operators\n")
 
-def test_compaction():
+def test_compaction(tmp):
     """E2E Test 7: Storage compaction"""
     print("=" * 70)
     print("E2E TEST 7: Storage Compaction")
     print("=" * 70)
 
-    db_path = "test_e2e_compaction.mlite"
-    cleanup(db_path)
+    db_path = os.path.join(tmp, "test_e2e_compaction.mlite")
 
     db = IronBase(db_path)
     data = db.collection("data")
@@ -388,9 +380,9 @@ def test_compaction():
     data.insert_many([{"index": i, "value": f"Data_{i}"} for i in range(100)])
     print("✓ Inserted 100 documents")
 
-    # Delete 50 documents (create tombstones)
-    for i in range(0, 100, 2):
-        data.delete_one({"index": i})
+    # Delete 50 documents (create tombstones) in one transaction / WAL fsync
+    result = data.delete_many({"index": {"$in": list(range(0, 100, 2))}})
+    assert result["deleted_count"] == 50
     print("✓ Deleted 50 documents (tombstones created)")
 
     # Verify count before compaction
@@ -416,17 +408,15 @@ def test_compaction():
     print(f"✓ Count after compaction: {count_after}")
 
     db.close()
-    cleanup(db_path)
     print("✅ PASSED: Storage Compaction\n")
 
-def test_edge_cases_and_errors():
+def test_edge_cases_and_errors(tmp):
     """E2E Test 8: Edge cases and error handling"""
     print("=" * 70)
     print("E2E TEST 8: Edge Cases and Error Handling")
     print("=" * 70)
 
-    db_path = "test_e2e_errors.mlite"
-    cleanup(db_path)
+    db_path = os.path.join(tmp, "test_e2e_errors.mlite")
 
     db = IronBase(db_path)
     test_coll = db.collection("test")
@@ -444,8 +434,7 @@ def test_edge_cases_and_errors():
 
     # Test 3: Update non-existent document
     result = test_coll.update_one({"nonexistent": True}, {"field": "value"})
-    assert result["matched_count"] == 0
-    assert result["modified_count"] == 0
+    assert {"matched_count": 0, "modified_count": 0}.items() <= result.items(), result
     print("✓ Update non-existent document returns 0")
 
     # Test 4: Delete non-existent document
@@ -477,17 +466,15 @@ def test_edge_cases_and_errors():
     print("✓ Drop collection works")
 
     db.close()
-    cleanup(db_path)
     print("✅ PASSED: Edge Cases and Error Handling\n")
 
-def test_persistence_and_reopen():
+def test_persistence_and_reopen(tmp):
     """E2E Test 9: Data persistence across database close/reopen"""
     print("=" * 70)
     print("E2E TEST 9: Data Persistence")
     print("=" * 70)
 
-    db_path = "test_e2e_persistence.mlite"
-    cleanup(db_path)
+    db_path = os.path.join(tmp, "test_e2e_persistence.mlite")
 
     # Phase 1: Create data
     db = IronBase(db_path)
@@ -534,9 +521,43 @@ def test_persistence_and_reopen():
     print("✓ Index functionality verified")
 
     db2.close()
-    cleanup(db_path)
     print("✅ PASSED: Data Persistence\n")
 
+# Every test uses its own database file, so they can run side by side
+E2E_TESTS = [
+    ("Basic CRUD Operations", test_basic_crud_operations),
+    ("Complex Query Operations", test_complex_queries),
+    ("Indexing and Performance", test_indexing_and_performance),
+    ("Aggregation Pipeline", test_aggregation_pipeline),
+    ("Transactions (ACD)", test_transactions),
+    ("Array Update Operators", test_array_update_operators),
+    ("Storage Compaction", test_compaction),
+    ("Edge Cases and Errors", test_edge_cases_and_errors),
+    ("Data Persistence", test_persistence_and_reopen)
+]
+
+def run_captured(index, tmp):
+    """Run E2E_TESTS[index] in a worker process, with its files under tmp
+
+    Returns (passed, output); output is captured so parallel tests do not
+    interleave their prints.
+    """
+    name, test_func = E2E_TESTS[index]
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            test_func(tmp)
+            passed = True
+        except AssertionError as e:
+            print(f"❌ FAILED: {name}")
+            print(f"   Error: {e}\n")
+            passed = False
+        except Exception as e:
+            print(f"❌ ERROR: {name}")
+            print(f"   Exception: {e}\n")
+            passed = False
+    return passed, output.getvalue()
+
 def run_all_e2e_tests():
     """Run all E2E tests"""
     print("\n" + "🧪" * 35)
@@ -544,44 +565,44 @@ def run_all_e2e_tests():
     print("Testing all major IronBase features")
     print("🧪" * 35 + "\n")
 
-    start_time = time.time()
-
-    tests = [
-        ("Basic CRUD Operations", test_basic_crud_operations),
-        ("Complex Query Operations", test_complex_queries),
-        ("Indexing and Performance", test_indexing_and_performance),
-        ("Aggregation Pipeline", test_aggregation_pipeline),
-        ("Transactions (ACD)", test_transactions),
-        ("Array Update Operators", test_array_update_operators),
-        ("Storage Compaction", test_compaction),
-        ("Edge Cases and Errors", test_edge_cases_and_errors),
-        ("Data Persistence", test_persistence_and_reopen)
-    ]
+    start_ns = time.perf_counter_ns()
+
+    tests = E2E_TESTS
 
     passed = 0
     failed = 0
 
-    for name, test_func in tests:
-        try:
-            test_func()
+    # The tests are dominated by fsync and compaction I/O on separate
+    # files, so running them in parallel overlaps that latency.
+    # Output is printed in suite order once each test has finished.
+    # E2E_WORKERS=1 runs them one by one in this process.
+    # All database, WAL and index files go into one temporary directory
+    # that is removed in a single pass when the suite finishes.
+    workers = e2e_workers()
+    with tempfile.TemporaryDirectory(prefix="ironbase_e2e_") as tmp:
+        if workers > 1:
+            worker = importable(run_captured)
+            with spawn_pool(workers) as pool:
+                futures = [pool.submit(worker, i, tmp) for i in range(len(tests))]
+                results = [future.result() for future in futures]
+        else:
+            results = [run_captured(i, tmp) for i in range(len(tests))]
+
+    for ok, output in results:
+        print(output, end="")
+        if ok:
             passed += 1
-        except AssertionError as e:
-            print(f"❌ FAILED: {name}")
-            print(f"   Error: {e}\n")
-            failed += 1
-        except Exception as e:
-            print(f"❌ ERROR: {name}")
-            print(f"   Exception: {e}\n")
+        else:
             failed += 1
 
-    elapsed = time.time() - start_time
+    elapsed_ns = time.perf_counter_ns() - start_ns
 
     print("=" * 70)
     print("E2E TEST SUITE SUMMARY")
     print("=" * 70)
     print(f"✅ Passed: {passed}/{len(tests)}")
     print(f"❌ Failed: {failed}/{len(tests)}")
-    print(f"⏱️  Total time: {elapsed:.2f}s")
+    print(f"⏱️  Total time: {elapsed_ns / 1e9:.2f}s")
     print("=" * 70)
 
     if failed == 0:
@@ -2,112 +2,121 @@
 """Large-scale nested document E2E test for IronBase."""
 
 import argparse
+import base64
+import itertools
+import json
 import os
+import pickle
 import random
-import string
+import tempfile
 import time
 from datetime import datetime, timedelta
 
 from ironbase import IronBase
+from test_support import (
+    e2e_workers, file_size, format_size, importable, random_bytes,
+    remove_database_files, spawn_pool,
+)
 
 IronBase.set_log_level("WARN")
 
 
-def cleanup(path: str):
-    for ext in (".mlite", ".wal"):
-        target = path.replace(".mlite", ext)
-        if os.path.exists(target):
-            os.remove(target)
+def get_written_size(path: str) -> int:
+    """Database plus WAL size - what ingest has written so far"""
+    return file_size(path) + file_size(path.replace(".mlite", ".wal"))
 
 
-def format_size(num_bytes: int) -> str:
-    units = ["B", "KB", "MB", "GB"]
-    value = float(num_bytes)
-    for unit in units:
-        if value < 1024.0:
-            return f"{value:.2f} {unit}"
-        value /= 1024.0
-    return f"{value:.2f} TB"
+def rand_string(rng: random.Random, length: int) -> str:
+    # base32 (A-Z, 2-7) over seeded random bytes: one C call, stays reproducible
+    return base64.b32encode(random_bytes(rng, (length * 5 + 7) // 8))[:length].decode("ascii")
 
 
-def get_db_size(path: str) -> int:
-    return os.path.getsize(path) if os.path.exists(path) else 0
+# Same span as the old "random 2025 date minus up to 10,000 minutes":
+# one offset draw and one timedelta instead of five randint() calls
+_DATETIME_START = datetime(2025, 1, 1) - timedelta(minutes=10_000)
+_DATETIME_SPAN_MINUTES = int((datetime(2025, 12, 28, 23, 59) - _DATETIME_START).total_seconds() // 60)
 
 
-def rand_string(length: int) -> str:
-    return "".join(random.choices(string.ascii_letters + string.digits, k=length))
+def rand_datetime(rng: random.Random) -> str:
+    return (_DATETIME_START + timedelta(minutes=rng.randint(0, _DATETIME_SPAN_MINUTES))).isoformat()
 
 
-def rand_datetime() -> str:
-    base = datetime(2025, random.randint(1, 12), random.randint(1, 28), random.randint(0, 23), random.randint(0, 59))
-    delta = timedelta(minutes=random.randint(0, 10_000))
-    return (base - delta).isoformat()
+_CITIES = [
+    ("Budapest", "Hungary"),
+    ("Debrecen", "Hungary"),
+    ("Prague", "Czech Republic"),
+    ("Vienna", "Austria"),
+    ("Warsaw", "Poland"),
+    ("Berlin", "Germany"),
+]
+_BOOLS = (True, False)
+_THEME_MODES = ("light", "dark", "amoled")
+_THEME_COLORS = ("blue", "green", "purple", "orange")
+_DEVICES = ("ios", "android", "web", "desktop")
+_BROWSERS = ("chrome", "firefox", "safari", "edge")
+# Every (city, email, sms, mode, color) combination: one draw per user
+# picks all five uniformly instead of five separate rng.choice() calls
+_USER_CHOICES = list(itertools.product(_CITIES, _BOOLS, _BOOLS, _THEME_MODES, _THEME_COLORS))
 
 
-def generate_user(doc_id: int) -> dict:
-    cities = [
-        ("Budapest", "Hungary"),
-        ("Debrecen", "Hungary"),
-        ("Prague", "Czech Republic"),
-        ("Vienna", "Austria"),
-        ("Warsaw", "Poland"),
-        ("Berlin", "Germany"),
-    ]
-    city, country = random.choice(cities)
+def generate_user(doc_id: int, rng: random.Random) -> dict:
+    (city, country), email_opt_in, sms_opt_in, theme_mode, theme_color = rng.choice(_USER_CHOICES)
     profile = {
-        "name": f"User {rand_string(8)}",
-        "age": random.randint(18, 75),
+        "name": f"User {rand_string(rng, 8)}",
+        "age": rng.randint(18, 75),
         "location": {
             "city": city,
             "country": country,
             "geo": {
-                "lat": round(random.uniform(-90, 90), 5),
-                "lng": round(random.uniform(-180, 180), 5),
+                "lat": round(rng.uniform(-90, 90), 5),
+                "lng": round(rng.uniform(-180, 180), 5),
             },
             "address": {
-                "street": f"{random.randint(1, 200)} {rand_string(6)} St",
-                "zip": random.randint(1000, 99999),
+                "street": f"{rng.randint(1, 200)} {rand_string(rng, 6)} St",
+                "zip": rng.randint(1000, 99999),
             },
         },
         "contacts": {
             "email": f"user{doc_id}@example.com",
-            "phones": [f"+36{random.randint(100000000, 999999999)}" for _ in range(random.randint(1, 2))],
+            "phones": [f"+36{rng.randrange(100000000, 1000000000)}" for _ in range(1 + rng.getrandbits(1))],
         },
     }
     preferences = {
         "notifications": {
-            "email": random.choice([True, False]),
-            "sms": random.choice([True, False]),
+            "email": email_opt_in,
+            "sms": sms_opt_in,
             "in_app": True,
         },
         "themes": {
-            "mode": random.choice(["light", "dark", "amoled"]),
-            "color": random.choice(["blue", "green", "purple", "orange"]),
+            "mode": theme_mode,
+            "color": theme_color,
         },
     }
     metrics = {
         "login": {
-            "count": random.randint(0, 5000),
-            "last_login": rand_datetime(),
+            "count": rng.randint(0, 5000),
+            "last_login": rand_datetime(rng),
         },
         "orders": {
-            "total_value": round(random.uniform(0, 20000), 2),
-            "last_order_value": round(random.uniform(5, 1000), 2),
+            "total_value": rng.uniform(0, 20000),
+            "last_order_value": rng.uniform(5, 1000),
         },
     }
+    # One draw covers the 16-bit host part of all three session IPs
+    ip_bits = rng.getrandbits(48)
     sessions = [
         {
-            "device": random.choice(["ios", "android", "web", "desktop"]),
+            "device": rng.choice(_DEVICES),
             "location": {
                 "city": city,
-                "ip": f"192.168.{random.randint(0, 255)}.{random.randint(0, 255)}",
+                "ip": f"192.168.{(ip_bits >> (16 * i + 8)) & 0xFF}.{(ip_bits >> (16 * i)) & 0xFF}",
             },
             "traits": {
-                "browser": random.choice(["chrome", "firefox", "safari", "edge"]),
-                "version": f"{random.randint(70, 120)}.0",
+                "browser": rng.choice(_BROWSERS),
+                "version": f"{rng.randint(70, 120)}.0",
             },
         }
-        for _ in range(3)
+        for i in range(3)
     ]
     return {
         "user_id": doc_id,
@@ -115,44 +124,130 @@ def generate_user(doc_id: int) -> dict:
         "preferences": preferences,
         "metrics": metrics,
         "sessions": sessions,
-        "tags": [rand_string(6) for _ in range(random.randint(3, 7))],
+        "tags": [rand_string(rng, 6) for _ in range(rng.randint(3, 7))],
     }
 
 
-def stage_insert(db_path: str, target_docs: int, batch_size: int):
+# Fixed so the corpus for a seed does not depend on the number of workers
+CORPUS_CHUNK_SIZE = 4_096
+
+# Part of the corpus cache key: bump it whenever generate_user() or the
+# helpers it draws from change what a seed produces, so stale pickles
+# are not loaded
+CORPUS_VERSION = 1
+
+
+def build_corpus_chunk(args) -> list:
+    """Worker entry point: generate users [start, start + count) from their own seed"""
+    start, count, seed = args
+    # Private generator per chunk: same stream as seeding the global one,
+    # without sharing module-level state between callers
+    rng = random.Random(f"{seed}:{start}")
+    return [generate_user(doc_id, rng) for doc_id in range(start, start + count)]
+
+
+def build_corpus(target_docs: int, seed: int, fixture_dir: str) -> list:
+    """Generate the user corpus, cached on disk per (target_docs, seed, version)
+
+    Generating the documents costs far more than inserting them, so warm
+    runs load the pickled corpus instead of rebuilding it.
+    """
+    path = os.path.join(fixture_dir, f"users_v{CORPUS_VERSION}_{target_docs}_{seed}.pkl")
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    chunks = [
+        (start, min(CORPUS_CHUNK_SIZE, target_docs - start), seed)
+        for start in range(0, target_docs, CORPUS_CHUNK_SIZE)
+    ]
+    with spawn_pool(e2e_workers()) as executor:
+        chunks = executor.map(importable(build_corpus_chunk), chunks)
+        corpus = [user for chunk in chunks for user in chunk]
+
+    os.makedirs(fixture_dir, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(corpus, f, protocol=5)
+    os.replace(tmp_path, path)
+    return corpus
+
+
+# Indexed paths used by the query stage, keyed by short name
+INDEX_FIELDS = {
+    "city": "profile.location.city",
+    "login": "metrics.login.count",
+    "pref": "preferences.notifications.email",
+}
+
+
+def create_indexes(users) -> dict:
+    # A reused database already carries some or all of them
+    existing = users.list_indexes()
+    indexes = {}
+    for name, field in INDEX_FIELDS.items():
+        found = [index for index in existing if index.endswith(f"_{field}")]
+        indexes[name] = found[0] if found else users.create_index(field)
+    return indexes
+
+
+# Default insert batches carry about this much serialized JSON
+TARGET_BATCH_BYTES = 32 * 1024 * 1024
+
+
+def auto_batch_size(corpus: list) -> int:
+    """Batch size that keeps each insert_many call near TARGET_BATCH_BYTES"""
+    if not corpus:
+        return 1
+    doc_bytes = len(json.dumps(corpus[0]))
+    return max(100, min(50_000, TARGET_BATCH_BYTES // doc_bytes))
+
+
+def stage_insert(db_path: str, corpus: list, batch_size: int, prebuild_indexes: bool = False):
     print("=" * 80)
     print("NESTED TEST 1: Massive nested insert")
     print("=" * 80)
 
-    cleanup(db_path)
+    remove_database_files(db_path)
     db = IronBase(db_path)
     users = db.collection("users")
 
+    indexes = None
+    if prebuild_indexes:
+        # Indexes are maintained incrementally by insert_many
+        indexes = create_indexes(users)
+        print(f"Indexes created before insert: {', '.join(indexes.values())}")
+
+    target_docs = len(corpus)
+    if not batch_size:
+        batch_size = auto_batch_size(corpus)
+        print(f"Auto batch size: {batch_size:,} docs (~{format_size(TARGET_BATCH_BYTES)} per batch)")
     total = 0
     start = time.time()
     last_report = start
 
     print(f"Target documents: {target_docs:,}")
     while total < target_docs:
-        batch = [generate_user(total + i) for i in range(min(batch_size, target_docs - total))]
-        result = users.insert_many(batch)
+        result = users.insert_many(corpus[total:total + batch_size])
         total += result["inserted_count"]
         now = time.time()
         if now - last_report >= 5:
-            db_size = get_db_size(db_path)
+            db_size = get_written_size(db_path)
             elapsed = now - start
             speed = total / elapsed if elapsed > 0 else 0
             print(f"  Progress: {total:,}/{target_docs:,} docs | Size: {format_size(db_size)} | Speed: {speed:.0f} docs/sec")
             last_report = now
 
     elapsed = time.time() - start
-    size = get_db_size(db_path)
-    print(f"✓ Insert complete: {total:,} docs in {elapsed:.2f}s ({format_size(size)})")
+    size = get_written_size(db_path)
+    print(f"✓ Insert complete: {total:,} docs in {elapsed:.2f}s ({format_size(size)} incl. WAL)")
 
-    return db, users, total
+    return db, users, total, indexes
 
 
-def stage_queries(users, total_docs):
+def stage_queries(users, total_docs, indexes=None, verbose=False):
     print()
     print("=" * 80)
     print("NESTED TEST 2: Query + analytics")
@@ -166,15 +261,17 @@ def stage_queries(users, total_docs):
     count_budapest = users.count_documents({"profile.location.city": "Budapest"})
     elapsed = (time.time() - start) * 1000
     print(f"✓ Budapest residents: {count_budapest:,} docs in {elapsed:.2f} ms")
-    samples = users.find({"profile.location.city": "Budapest"}, limit=3)
-    print(f"  Sample names: {[doc['profile']['name'] for doc in samples]}")
+    if verbose:
+        samples = users.find({"profile.location.city": "Budapest"}, limit=3)
+        print(f"  Sample names: {[doc['profile']['name'] for doc in samples]}")
 
     start = time.time()
     count_heavy = users.count_documents({"metrics.login.count": {"$gte": 1000}})
     elapsed = (time.time() - start) * 1000
     print(f"✓ Heavy login users (>=1000): {count_heavy:,} docs in {elapsed:.2f} ms")
-    heavy_sample = users.find({"metrics.login.count": {"$gte": 1000}}, limit=3)
-    print(f"  Sample login counts: {[doc['metrics']['login']['count'] for doc in heavy_sample]}")
+    if verbose:
+        heavy_sample = users.find({"metrics.login.count": {"$gte": 1000}}, limit=3)
+        print(f"  Sample login counts: {[doc['metrics']['login']['count'] for doc in heavy_sample]}")
 
     start = time.time()
     engaged = users.find({
@@ -185,19 +282,16 @@ def stage_queries(users, total_docs):
     }, limit=10)
     print(f"✓ Email opt-in & >1k orders: showing {len(engaged)} of many in {(time.time() - start)*1000:.2f} ms")
 
-    print("\nCreating nested indexes for plan analysis...")
-    idx_city = users.create_index("profile.location.city")
-    idx_login = users.create_index("metrics.login.count")
-    idx_pref = users.create_index("preferences.notifications.email")
-    print(f"  ✓ Indexes: {idx_city}, {idx_login}, {idx_pref}")
+    if indexes is None:
+        print("\nCreating nested indexes for plan analysis...")
+        start = time.time()
+        indexes = create_indexes(users)
+        print(f"  ✓ Indexes: {', '.join(indexes.values())} in {time.time() - start:.2f}s")
 
-    explain = users.explain({"profile.location.city": "Budapest"})
-    print(f"✓ Query planner for city lookup: {explain}")
-    return {
-        "city": idx_city,
-        "login": idx_login,
-        "pref": idx_pref,
-    }
+    if verbose:
+        explain = users.explain({"profile.location.city": "Budapest"})
+        print(f"✓ Query planner for city lookup: {explain}")
+    return indexes
 
 
 def stage_updates(users):
@@ -224,11 +318,11 @@ def stage_compaction(db, db_path: str):
     print("NESTED TEST 4: Compaction & closing")
     print("=" * 80)
 
-    before = get_db_size(db_path)
+    before = file_size(db_path)
     start = time.time()
     stats = db.compact()
     elapsed = time.time() - start
-    after = get_db_size(db_path)
+    after = file_size(db_path)
 
     print(f"✓ Compaction finished in {elapsed:.2f}s | {format_size(before)} -> {format_size(after)}")
     print(f"  Tombstones removed: {stats['tombstones_removed']}, documents scanned: {stats['documents_scanned']}")
@@ -236,10 +330,25 @@ def stage_compaction(db, db_path: str):
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Nested large-scale E2E test")
-    parser.add_argument("--db", default="test_nested_large.mlite", help="Database path")
+    parser.add_argument("--db", default=None,
+                        help="Database path (default: inside a temporary directory removed on exit)")
     parser.add_argument("--target-docs", type=int, default=52_428, help="Number of documents to insert")
-    parser.add_argument("--batch-size", type=int, default=1_500, help="Insert batch size")
-    return parser.parse_args()
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Insert batch size (default: sized for ~32 MB of JSON per batch)")
+    parser.add_argument("--prebuild-indexes", action="store_true",
+                        help="Create the nested indexes before inserting instead of after")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Print sample documents and the query plan")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated corpus")
+    parser.add_argument("--fixture-dir", default="fixtures", help="Directory for the cached corpus")
+    parser.add_argument("--only", choices=["insert", "query", "update", "compact", "all"], default="all",
+                        help="Run just this stage after the insert (default: all stages)")
+    parser.add_argument("--reuse-db", action="store_true",
+                        help="Keep the --db file on exit and, if it already exists, skip the insert stage")
+    args = parser.parse_args()
+    if args.reuse_db and not args.db:
+        parser.error("--reuse-db requires --db")
+    return args
 
 
 def main():
@@ -248,19 +357,40 @@ def main():
     print(" NESTED LARGE-SCALE E2E TEST ")
     print("#" * 90)
 
-    db, users, total_docs = stage_insert(args.db, args.target_docs, args.batch_size)
-    try:
-        indexes = stage_queries(users, total_docs)
-        stage_updates(users)
-        stage_compaction(db, args.db)
-        print("\nSUMMARY:")
-        print(f"  Documents inserted: {total_docs:,}")
-        remaining = users.count_documents({})
-        print(f"  Remaining docs after cleanup: {remaining:,}")
-    finally:
-        db.close()
-        cleanup(args.db)
-        print("\n✓ Database closed and files cleaned up")
+    # The insert always runs (it is what the other stages read) unless
+    # --reuse-db points at a database left behind by an earlier run
+    stages = {"query", "update", "compact"} if args.only == "all" else {args.only}
+    with tempfile.TemporaryDirectory(prefix="ironbase_nested_") as tmp:
+        db_path = args.db or os.path.join(tmp, "test_nested_large.mlite")
+        if args.reuse_db and os.path.exists(db_path):
+            db = IronBase(db_path)
+            users = db.collection("users")
+            total_docs = users.count_documents({})
+            indexes = None
+            print(f"Reusing {db_path}: {total_docs:,} docs, insert stage skipped")
+        else:
+            corpus = build_corpus(args.target_docs, args.seed, args.fixture_dir)
+            db, users, total_docs, indexes = stage_insert(db_path, corpus, args.batch_size, args.prebuild_indexes)
+            del corpus
+        try:
+            if "query" in stages:
+                indexes = stage_queries(users, total_docs, indexes, args.verbose)
+            if "update" in stages:
+                stage_updates(users)
+            if "compact" in stages:
+                stage_compaction(db, db_path)
+            print("\nSUMMARY:")
+            print(f"  Documents inserted: {total_docs:,}")
+            remaining = users.count_documents({})
+            print(f"  Remaining docs after cleanup: {remaining:,}")
+        finally:
+            db.close()
+            if args.reuse_db:
+                print(f"\n✓ Database closed and kept at {db_path}")
+            else:
+                if args.db:
+                    remove_database_files(args.db)
+                print("\n✓ Database closed and files cleaned up")
 
 
 if __name__ == "__main__":
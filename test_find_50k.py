@@ -3,33 +3,27 @@
 
 from ironbase import IronBase
 import os
+import tempfile
 import time
 
-# Clean up
-for f in ["test_50k.mlite", "test_50k.wal"]:
-    if os.path.exists(f):
-        os.remove(f)
+# Removed together with the database and WAL at the end (or at exit on failure)
+work_dir = tempfile.TemporaryDirectory(prefix="ironbase_find_50k_")
+db_path = os.path.join(work_dir.name, "test_50k.mlite")
 
 print("=" * 60)
 print("Inserting 50K documents...")
-db = IronBase("test_50k.mlite")
+db = IronBase(db_path)
 products = db.collection("products")
 
-# Insert 50K documents in batches
-batch_size = 5000
+# Insert 50K documents in a single insert_many call
 total = 50000
-
-for i in range(0, total, batch_size):
-    docs = [
-        {"name": f"Product {j}", "category": "Electronics" if j % 7 == 0 else "Books", "price": j}
-        for j in range(i, min(i + batch_size, total))
-    ]
-    products.insert_many(docs)
-    if (i + batch_size) % 10000 == 0:
-        print(f"  Progress: {i + batch_size}/{total}")
+products.insert_many(
+    {"name": f"Product {j}", "category": "Electronics" if j % 7 == 0 else "Books", "price": j}
+    for j in range(total)
+)
 
 print(f"✓ Inserted {total:,} documents")
-file_size = os.path.getsize("test_50k.mlite")
+file_size = os.path.getsize(db_path)
 print(f"✓ File size: {file_size / 1024 / 1024:.2f} MB")
 
 # Test count
@@ -43,12 +37,16 @@ print("\n" + "=" * 60)
 print("Testing find()...")
 try:
     start = time.time()
-    electronics = list(products.find({"category": "Electronics"}))
+    electronics = products.count_documents({"category": "Electronics"})
     elapsed = time.time() - start
-    print(f"✓ Found {len(electronics):,} electronics in {elapsed:.2f}s")
+    print(f"✓ Found {electronics:,} electronics in {elapsed:.2f}s")
 
-    # Print first 3
-    for doc in electronics[:3]:
+    # Only the printed samples are materialized
+    start = time.time()
+    samples = products.find({"category": "Electronics"}, limit=3)
+    elapsed = time.time() - start
+    print(f"✓ Fetched {len(samples)} samples in {elapsed*1000:.2f}ms")
+    for doc in samples:
         print(f"  - {doc.get('name')}: ${doc.get('price')}")
 except Exception as e:
     print(f"❌ Error: {e}")
@@ -68,6 +66,5 @@ except Exception as e:
 
 # Cleanup
 db.close()
-os.remove("test_50k.mlite")
-os.remove("test_50k.wal")
+work_dir.cleanup()
 print("\n✓ Test completed")
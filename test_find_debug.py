@@ -3,15 +3,15 @@
 
 from ironbase import IronBase
 import os
+import tempfile
 
-# Clean up
-for f in ["test_find.mlite", "test_find.wal"]:
-    if os.path.exists(f):
-        os.remove(f)
+# Removed together with the database and WAL at the end (or at exit on failure)
+work_dir = tempfile.TemporaryDirectory(prefix="ironbase_find_debug_")
+db_path = os.path.join(work_dir.name, "test_find.mlite")
 
 print("=" * 60)
 print("Creating database and inserting documents")
-db = IronBase("test_find.mlite")
+db = IronBase(db_path)
 products = db.collection("products")
 
 # Insert 5 documents
@@ -69,6 +69,5 @@ except Exception as e:
 
 # Cleanup
 db.close()
-os.remove("test_find.mlite")
-os.remove("test_find.wal")
+work_dir.cleanup()
 print("\n✓ Test completed")
@@ -6,17 +6,13 @@ Test insert_many() performance - before/after comparison
 from ironbase import IronBase
 import time
 import os
+import tempfile
 
 def test_insert_many_batch():
     """Test new batched insert_many implementation"""
-    db_path = "test_insert_many.mlite"
-
-    # Clean up
-    for ext in [".mlite", ".wal"]:
-        try:
-            os.remove(db_path.replace(".mlite", ext))
-        except FileNotFoundError:
-            pass
+    # Removed together with the database and WAL at the end (or at exit on failure)
+    work_dir = tempfile.TemporaryDirectory(prefix="ironbase_insert_many_")
+    db_path = os.path.join(work_dir.name, "test_insert_many.mlite")
 
     db = IronBase(db_path)
     coll = db.collection("test")
@@ -64,13 +60,7 @@ def test_insert_many_batch():
     print(f"   Results: {len(results)} documents")
 
     db.close()
-
-    # Cleanup
-    for ext in [".mlite", ".wal"]:
-        try:
-            os.remove(db_path.replace(".mlite", ext))
-        except FileNotFoundError:
-            pass
+    work_dir.cleanup()
 
     print("\n" + "=" * 60)
     print("✅ Test passed!")
@@ -2,36 +2,14 @@
 """Simulate power failure scenarios and analyze data loss"""
 
 import os
+import tempfile
 import sys
 import shutil
 from ironbase import IronBase
+from test_support import file_size, simulate_power_failure, wal_stats
 
-def simulate_power_failure(db_path, wal_path):
-    """
-    Simulate power failure by killing process WITHOUT calling close()
-    This leaves the DB in whatever state it was mid-operation
-    """
-    # In real power failure:
-    # - No flush() called
-    # - No close() called
-    # - File buffers may be partially written (OS dependent)
-    # - WAL file is in whatever state it was
-
-    # We simulate this by just NOT calling close()
-    pass
-
-def test_scenario_1_normal_insert():
-    """Scenario 1: Power failure during normal insert_one (NO transaction)"""
-    db_path = "test_pf1.mlite"
-    wal_path = "test_pf1.wal"
-
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
-
-    print("=== SCENARIO 1: Power Failure During insert_one() ===\n")
-
+def crash_scenario_1(db_path):
+    """Scenario 1 phase 1: plain inserts, then crash"""
     # Phase 1: Insert some data
     print("Phase 1: Insert 5 documents (no transaction)")
     db = IronBase(db_path)
@@ -44,68 +22,62 @@ def test_scenario_1_normal_insert():
     print(f"  Documents before crash: {count_before}")
 
     # Check file sizes
-    mlite_size = os.path.getsize(db_path) if os.path.exists(db_path) else 0
-    wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    mlite_size = file_size(db_path)
+    wal_size = wal_stats(db)["size"]
     print(f"  .mlite file size: {mlite_size} bytes")
-    print(f"  .wal file size: {wal_size} bytes")
+    print(f"  WAL logged: {wal_size} bytes")
 
     # POWER FAILURE - no close(), no flush()
     print("\n  ⚡ POWER FAILURE (no close, no flush)")
-    del col
-    del db
 
-    # Phase 2: Recovery
-    print("\nPhase 2: Restart and recover")
-    db2 = IronBase(db_path)
-    col2 = db2.collection("test")
+    return wal_size
 
-    count_after = col2.count_documents({})
-    print(f"  Documents after recovery: {count_after}")
 
-    if count_after == 5:
-        print("  ✓ All data recovered (metadata was flushed)")
-    elif count_after < 5:
-        print(f"  ⚠ DATA LOSS: {5 - count_after} documents lost")
-    else:
-        print(f"  ✗ Corruption: more documents than expected")
+def test_scenario_1_normal_insert():
+    """Scenario 1: Power failure during normal insert_one (NO transaction)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test_pf1.mlite")
 
-    # Check if WAL helped
-    wal_after = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
-    print(f"  WAL after recovery: {wal_after} bytes")
+        print("=== SCENARIO 1: Power Failure During insert_one() ===\n")
 
-    if wal_size == 0 and wal_after == 0:
-        print("  ℹ WAL was empty (normal insert doesn't use WAL)")
+        wal_size = simulate_power_failure(crash_scenario_1, db_path)
 
-    db2.close()
+        # Phase 2: Recovery
+        print("\nPhase 2: Restart and recover")
+        db2 = IronBase(db_path)
+        col2 = db2.collection("test")
 
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+        count_after = col2.count_documents({})
+        print(f"  Documents after recovery: {count_after}")
 
-    return count_after == 5
+        if count_after == 5:
+            print("  ✓ All data recovered (metadata was flushed)")
+        elif count_after < 5:
+            print(f"  ⚠ DATA LOSS: {5 - count_after} documents lost")
+        else:
+            print(f"  ✗ Corruption: more documents than expected")
 
+        # Check if WAL helped
+        wal_after = wal_stats(db2)["size"]
+        print(f"  WAL after recovery: {wal_after} bytes")
 
-def test_scenario_2_transaction_uncommitted():
-    """Scenario 2: Power failure during transaction BEFORE commit"""
-    db_path = "test_pf2.mlite"
-    wal_path = "test_pf2.wal"
+        if wal_size == 0 and wal_after == 0:
+            print("  ℹ WAL was empty (normal insert doesn't use WAL)")
 
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+        db2.close()
 
-    print("\n\n=== SCENARIO 2: Power Failure During Transaction (BEFORE commit) ===\n")
+        return count_after == 5
 
+
+def crash_scenario_2(db_path):
+    """Scenario 2 phase 1: open transaction, then crash"""
     # Phase 1: Start transaction, add data, DON'T commit
     print("Phase 1: Begin transaction, insert data, NO COMMIT")
     db = IronBase(db_path)
     col = db.collection("test")
 
-    # Baseline data (committed)
-    col.insert_one({"value": 1, "type": "baseline"})
-    col.insert_one({"value": 2, "type": "baseline"})
+    # Baseline data (committed) - setup only, one auto-commit for both
+    col.insert_many([{"value": 1, "type": "baseline"}, {"value": 2, "type": "baseline"}])
 
     # Start transaction
     tx_id = db.begin_transaction()
@@ -115,61 +87,55 @@ def test_scenario_2_transaction_uncommitted():
     col.insert_one({"value": 100, "type": "transaction"})
     col.insert_one({"value": 200, "type": "transaction"})
 
-    count_before = col.count_documents({})
-    print(f"  Documents before crash: {count_before}")
-    print(f"    Baseline: {col.count_documents({'type': 'baseline'})}")
-    print(f"    Transaction: {col.count_documents({'type': 'transaction'})}")
+    counts = dict(col.count_by("type"))
+    print(f"  Documents before crash: {sum(counts.values())}")
+    print(f"    Baseline: {counts.get('baseline', 0)}")
+    print(f"    Transaction: {counts.get('transaction', 0)}")
 
     # Check WAL
-    wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
-    print(f"  WAL size: {wal_size} bytes")
+    wal = wal_stats(db)
+    print(f"  WAL logged: {wal['size']} bytes ({wal['durable_size']} durable)")
 
     # POWER FAILURE before commit
     print("\n  ⚡ POWER FAILURE (transaction NOT committed)")
-    del col
-    del db
 
-    # Phase 2: Recovery
-    print("\nPhase 2: Restart and check what survived")
-    db2 = IronBase(db_path)
-    col2 = db2.collection("test")
 
-    count_baseline = col2.count_documents({"type": "baseline"})
-    count_tx = col2.count_documents({"type": "transaction"})
+def test_scenario_2_transaction_uncommitted():
+    """Scenario 2: Power failure during transaction BEFORE commit"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test_pf2.mlite")
 
-    print(f"  Baseline documents: {count_baseline}")
-    print(f"  Transaction documents: {count_tx}")
+        print("\n\n=== SCENARIO 2: Power Failure During Transaction (BEFORE commit) ===\n")
 
-    if count_baseline == 2 and count_tx == 0:
-        print("  ✓ CORRECT: Uncommitted transaction rolled back")
-    elif count_baseline == 2 and count_tx == 2:
-        print("  ⚠ NO ISOLATION: Uncommitted data visible (ACD design)")
-    else:
-        print(f"  ✗ Unexpected state: {count_baseline} baseline + {count_tx} transaction")
+        simulate_power_failure(crash_scenario_2, db_path)
 
-    db2.close()
+        # Phase 2: Recovery
+        print("\nPhase 2: Restart and check what survived")
+        db2 = IronBase(db_path)
+        col2 = db2.collection("test")
 
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+        counts = dict(col2.count_by("type"))
+        count_baseline = counts.get("baseline", 0)
+        count_tx = counts.get("transaction", 0)
 
-    # In ACD design, uncommitted data MAY survive (no isolation)
-    return True
+        print(f"  Baseline documents: {count_baseline}")
+        print(f"  Transaction documents: {count_tx}")
 
+        if count_baseline == 2 and count_tx == 0:
+            print("  ✓ CORRECT: Uncommitted transaction rolled back")
+        elif count_baseline == 2 and count_tx == 2:
+            print("  ⚠ NO ISOLATION: Uncommitted data visible (ACD design)")
+        else:
+            print(f"  ✗ Unexpected state: {count_baseline} baseline + {count_tx} transaction")
 
-def test_scenario_3_transaction_after_commit():
-    """Scenario 3: Power failure AFTER commit but before full flush"""
-    db_path = "test_pf3.mlite"
-    wal_path = "test_pf3.wal"
+        db2.close()
 
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+        # In ACD design, uncommitted data MAY survive (no isolation)
+        return True
 
-    print("\n\n=== SCENARIO 3: Power Failure AFTER Transaction Commit ===\n")
 
+def crash_scenario_3(db_path):
+    """Scenario 3 phase 1: committed transaction, then crash"""
     # Phase 1: Commit transaction
     print("Phase 1: Commit transaction, then crash")
     db = IronBase(db_path)
@@ -187,98 +153,93 @@ def test_scenario_3_transaction_after_commit():
     print(f"  Documents before crash: {count_before}")
 
     # Check WAL
-    wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
-    print(f"  WAL size after commit: {wal_size} bytes")
+    wal = wal_stats(db)
+    print(f"  WAL after commit: {wal['size']} bytes logged, {wal['durable_size']} durable")
 
-    if wal_size > 0:
-        print("  ✓ WAL contains commit marker")
+    if wal["durable_size"] > 0 and wal["durable_size"] == wal["size"]:
+        print("  ✓ WAL commit marker is fsynced")
 
     # POWER FAILURE after commit
     print("\n  ⚡ POWER FAILURE (after commit)")
-    del col
-    del db
 
-    # Phase 2: Recovery
-    print("\nPhase 2: Restart - WAL should replay committed transaction")
-    db2 = IronBase(db_path)
-    col2 = db2.collection("test")
 
-    count_after = col2.count_documents({"type": "committed"})
-    print(f"  Documents after recovery: {count_after}")
+def test_scenario_3_transaction_after_commit():
+    """Scenario 3: Power failure AFTER commit but before full flush"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test_pf3.mlite")
 
-    if count_after == 2:
-        print("  ✓ DURABILITY: Committed data survived power failure")
-    else:
-        print(f"  ✗ DATA LOSS: Expected 2, got {count_after}")
+        print("\n\n=== SCENARIO 3: Power Failure AFTER Transaction Commit ===\n")
 
-    # Check WAL cleared
-    wal_after = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
-    print(f"  WAL after recovery: {wal_after} bytes")
+        simulate_power_failure(crash_scenario_3, db_path)
 
-    db2.close()
+        # Phase 2: Recovery
+        print("\nPhase 2: Restart - WAL should replay committed transaction")
+        db2 = IronBase(db_path)
+        col2 = db2.collection("test")
 
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+        count_after = col2.count_documents({"type": "committed"})
+        print(f"  Documents after recovery: {count_after}")
 
-    return count_after == 2
+        if count_after == 2:
+            print("  ✓ DURABILITY: Committed data survived power failure")
+        else:
+            print(f"  ✗ DATA LOSS: Expected 2, got {count_after}")
 
+        # Check WAL cleared
+        wal_after = wal_stats(db2)["size"]
+        print(f"  WAL after recovery: {wal_after} bytes")
 
-def test_scenario_4_metadata_not_flushed():
-    """Scenario 4: Insert many docs, crash before metadata flush"""
-    db_path = "test_pf4.mlite"
-    wal_path = "test_pf4.wal"
+        db2.close()
 
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+        return count_after == 2
 
-    print("\n\n=== SCENARIO 4: Metadata Not Flushed (Worst Case) ===\n")
 
+def crash_scenario_4(db_path):
+    """Scenario 4 phase 1: bulk insert, then crash"""
     # Phase 1: Insert WITHOUT explicit flush
     print("Phase 1: Insert 100 documents rapidly")
     db = IronBase(db_path)
     col = db.collection("test")
 
-    for i in range(100):
-        col.insert_one({"value": i})
+    col.insert_many([{"value": i} for i in range(100)])
 
     count_before = col.count_documents({})
     print(f"  Documents in memory: {count_before}")
 
-    mlite_size = os.path.getsize(db_path) if os.path.exists(db_path) else 0
+    mlite_size = file_size(db_path)
     print(f"  .mlite file size: {mlite_size} bytes")
 
     # POWER FAILURE - metadata may not be flushed!
     print("\n  ⚡ POWER FAILURE (metadata might not be on disk)")
-    del col
-    del db
 
-    # Phase 2: Recovery
-    print("\nPhase 2: Restart - check what metadata says")
-    db2 = IronBase(db_path)
-    col2 = db2.collection("test")
 
-    count_after = col2.count_documents({})
-    print(f"  Documents after recovery: {count_after}")
+def test_scenario_4_metadata_not_flushed():
+    """Scenario 4: Insert many docs, crash before metadata flush"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test_pf4.mlite")
+
+        print("\n\n=== SCENARIO 4: Metadata Not Flushed (Worst Case) ===\n")
+
+        simulate_power_failure(crash_scenario_4, db_path)
+
+        # Phase 2: Recovery
+        print("\nPhase 2: Restart - check what metadata says")
+        db2 = IronBase(db_path)
+        col2 = db2.collection("test")
 
-    if count_after < 100:
-        print(f"  ⚠ PARTIAL DATA LOSS: {100 - count_after} documents lost")
-        print(f"  Reason: Metadata not flushed to disk")
-    elif count_after == 100:
-        print("  ✓ All data recovered (lucky - metadata was flushed)")
+        count_after = col2.count_documents({})
+        print(f"  Documents after recovery: {count_after}")
 
-    db2.close()
+        if count_after < 100:
+            print(f"  ⚠ PARTIAL DATA LOSS: {100 - count_after} documents lost")
+            print(f"  Reason: Metadata not flushed to disk")
+        elif count_after == 100:
+            print("  ✓ All data recovered (lucky - metadata was flushed)")
 
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+        db2.close()
 
-    # This is expected behavior - metadata flush timing determines what survives
-    return True
+        # This is expected behavior - metadata flush timing determines what survives
+        return True
 
 
 if __name__ == "__main__":
@@ -2,128 +2,57 @@
 """Test Python API for auto-commit modes"""
 
 import os
+import tempfile
 from ironbase import IronBase
 
-def test_safe_mode_default():
-    """Test that Safe mode is the default"""
-    db_path = "test_py_safe.mlite"
-    wal_path = "test_py_safe.wal"
+# (title, IronBase keyword arguments, documents to insert one by one)
+MODE_CASES = [
+    ("Safe Mode (Default)", {}, 1),
+    ("Batch Mode", {"durability": "batch", "batch_size": 5}, 10),  # 2 batch flushes
+    ("Unsafe Mode", {"durability": "unsafe"}, 100),  # fast path, no WAL
+]
 
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
 
-    print("=== Test 1: Safe Mode (Default) ===")
+def test_auto_commit_mode(tmp, number, title, kwargs, n_docs):
+    """Insert n_docs in one durability mode and check they are all visible
 
-    # Open database (default = safe mode)
-    db = IronBase(db_path)
-    col = db.collection("users")
+    Every insert_one() must report the inserted_id in every mode.
+    """
+    print(f"=== Test {number}: {title} ===")
 
-    # Insert document
-    result = col.insert_one({"name": "Alice", "age": 30})
-    print(f"  Inserted ID: {result['inserted_id']}")
+    db_path = os.path.join(tmp, f"test_py_mode{number}.mlite")
+    with IronBase(db_path, **kwargs) as db:
+        col = db.collection("test")
 
-    # Count documents
-    count = col.count_documents({})
-    print(f"  Document count: {count}")
-    assert count == 1, f"Expected 1 document, got {count}"
+        for i in range(n_docs):
+            result = col.insert_one({"value": i})
+            inserted_id = result.get("inserted_id")
+            assert inserted_id is not None, f"insert_one returned no inserted_id: {result}"
+            if i == 0:
+                print(f"  Inserted ID: {inserted_id}")
 
-    db.close()
-    print("  ✓ Safe mode test passed\n")
+        count = col.count_documents({})
+        print(f"  Inserted {count} documents")
+        assert count == n_docs, f"Expected {n_docs} documents, got {count}"
 
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+        if kwargs.get("durability") == "unsafe":
+            # Manual checkpoint
+            db.checkpoint()
 
+    print(f"  ✓ {title} test passed\n")
 
-def test_batch_mode():
-    """Test Batch mode"""
-    db_path = "test_py_batch.mlite"
-    wal_path = "test_py_batch.wal"
 
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
-
-    print("=== Test 2: Batch Mode ===")
-
-    # Open database in batch mode
-    db = IronBase(db_path, durability="batch", batch_size=5)
-    col = db.collection("test")
-
-    # Insert 10 documents (should trigger 2 flushes)
-    for i in range(10):
-        col.insert_one({"value": i})
-
-    count = col.count_documents({})
-    print(f"  Inserted {count} documents")
-    assert count == 10, f"Expected 10 documents, got {count}"
-
-    db.close()
-    print("  ✓ Batch mode test passed\n")
-
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
-
-
-def test_unsafe_mode():
-    """Test Unsafe mode"""
-    db_path = "test_py_unsafe.mlite"
-    wal_path = "test_py_unsafe.wal"
-
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
-
-    print("=== Test 3: Unsafe Mode ===")
-
-    # Open database in unsafe mode
-    db = IronBase(db_path, durability="unsafe")
-    col = db.collection("test")
-
-    # Insert documents (fast path, no WAL)
-    for i in range(100):
-        col.insert_one({"value": i})
-
-    count = col.count_documents({})
-    print(f"  Inserted {count} documents (fast path)")
-    assert count == 100, f"Expected 100 documents, got {count}"
-
-    # Manual checkpoint
-    db.checkpoint()
-
-    db.close()
-    print("  ✓ Unsafe mode test passed\n")
-
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
-
-
-def test_invalid_durability():
+def test_invalid_durability(tmp, number):
     """Test invalid durability mode"""
-    db_path = "test_py_invalid.mlite"
-
-    print("=== Test 4: Invalid Durability Mode ===")
+    print(f"=== Test {number}: Invalid Durability Mode ===")
 
     try:
-        db = IronBase(db_path, durability="invalid")
+        IronBase(os.path.join(tmp, "test_py_invalid.mlite"), durability="invalid")
         print("  ✗ Should have raised ValueError")
         assert False
     except ValueError as e:
         print(f"  ✓ Correctly raised ValueError: {e}\n")
 
-    # Cleanup
-    if os.path.exists(db_path):
-        os.remove(f)
-
 
 if __name__ == "__main__":
     print("=" * 60)
@@ -131,10 +60,10 @@ if __name__ == "__main__":
     print("=" * 60)
     print()
 
-    test_safe_mode_default()
-    test_batch_mode()
-    test_unsafe_mode()
-    test_invalid_durability()
+    with tempfile.TemporaryDirectory() as tmp:
+        for number, (title, kwargs, n_docs) in enumerate(MODE_CASES, 1):
+            test_auto_commit_mode(tmp, number, title, kwargs, n_docs)
+        test_invalid_durability(tmp, len(MODE_CASES) + 1)
 
     print("=" * 60)
     print("🎉 ALL PYTHON AUTO-COMMIT TESTS PASSED!")
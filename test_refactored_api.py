@@ -7,14 +7,7 @@ Tests all major features after architecture refactoring
 from ironbase import IronBase
 import time
 import os
-
-def cleanup(path):
-    """Clean up test database files"""
-    for ext in [".mlite", ".wal"]:
-        try:
-            os.remove(path.replace(".mlite", ext))
-        except FileNotFoundError:
-            pass
+import tempfile
 
 def test_insert_many():
     """Test refactored insert_many (Phase 1)"""
@@ -22,32 +15,40 @@ def test_insert_many():
     print("TEST 1: insert_many() - Batch Insert (Phase 1 Refactor)")
     print("=" * 60)
 
-    db_path = "test_refactor.mlite"
-    cleanup(db_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test_refactor.mlite")
 
-    db = IronBase(db_path)
-    coll = db.collection("users")
+        db = IronBase(db_path)
+        coll = db.collection("users")
 
-    # Prepare 100 documents
-    docs = [{"name": f"User {i}", "age": 20 + i} for i in range(100)]
+        # Prepare 100 documents
+        docs = [{"name": f"User {i}", "age": 20 + i} for i in range(100)]
 
-    start = time.time()
-    result = coll.insert_many(docs)
-    elapsed = time.time() - start
+        start = time.time()
+        result = coll.insert_many(docs)
+        elapsed = time.time() - start
 
-    print(f"✅ Inserted {result['inserted_count']} documents in {elapsed*1000:.2f}ms")
-    print(f"   Throughput: {result['inserted_count'] / elapsed:.0f} docs/sec")
-    print(f"   First ID: {result['inserted_ids'][0]}")
-    print(f"   Last ID: {result['inserted_ids'][-1]}")
+        print(f"✅ Inserted {result['inserted_count']} documents in {elapsed*1000:.2f}ms")
+        print(f"   Throughput: {result['inserted_count'] / elapsed:.0f} docs/sec")
+        print(f"   First ID: {result['inserted_ids'][0]}")
+        print(f"   Last ID: {result['inserted_ids'][-1]}")
 
-    # Verify
-    count = coll.count_documents()
-    assert count == 100, f"Expected 100, got {count}"
-    print(f"   Verification: ✓ Count = {count}")
+        # Verify
+        count = coll.count_documents()
+        assert count == 100, f"Expected 100, got {count}"
+        print(f"   Verification: ✓ Count = {count}")
 
-    db.close()
-    cleanup(db_path)
-    print()
+        # A single document is rejected, not iterated by its keys
+        try:
+            coll.insert_many({"name": "Oops", "age": 1})
+        except TypeError as e:
+            print(f"   Single dict rejected: ✓ {e}")
+        else:
+            raise AssertionError("insert_many(dict) should raise TypeError")
+        assert coll.count_documents() == 100
+
+        db.close()
+        print()
 
 def test_transaction_helpers():
     """Test refactored transaction helpers (Phase 3) - API only"""
@@ -55,88 +56,100 @@ def test_transaction_helpers():
     print("TEST 2: Transaction Helpers API (Phase 3 Refactor)")
     print("=" * 60)
 
-    db_path = "test_refactor_tx.mlite"
-    cleanup(db_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test_refactor_tx.mlite")
 
-    db = IronBase(db_path)
+        db = IronBase(db_path)
 
-    # Test that API works (transaction commit may have existing bug in core)
-    print("✅ Testing transaction helper APIs (thin wrapper validation)...")
+        # Test that API works (transaction commit may have existing bug in core)
+        print("✅ Testing transaction helper APIs (thin wrapper validation)...")
 
-    # Test insert_one_tx API
-    tx_id = db.begin_transaction()
-    result = db.insert_one_tx("accounts", {"name": "Alice", "balance": 100}, tx_id)
-    print(f"   ✓ insert_one_tx: Returns dict with inserted_id = {result['inserted_id']}")
-    db.rollback_transaction(tx_id)
+        # Test insert_one_tx API
+        tx_id = db.begin_transaction()
+        result = db.insert_one_tx("accounts", {"name": "Alice", "balance": 100}, tx_id)
+        print(f"   ✓ insert_one_tx: Returns dict with inserted_id = {result['inserted_id']}")
+        db.rollback_transaction(tx_id)
 
-    # Test update_one_tx API
-    tx_id = db.begin_transaction()
-    result = db.update_one_tx("accounts", {"name": "Alice"}, {"name": "Alice", "balance": 150}, tx_id)
-    print(f"   ✓ update_one_tx: Returns dict with matched_count = {result['matched_count']}")
-    db.rollback_transaction(tx_id)
+        # Test update_one_tx API
+        tx_id = db.begin_transaction()
+        result = db.update_one_tx("accounts", {"name": "Alice"}, {"name": "Alice", "balance": 150}, tx_id)
+        print(f"   ✓ update_one_tx: Returns dict with matched_count = {result['matched_count']}")
+        db.rollback_transaction(tx_id)
 
-    # Test delete_one_tx API
-    tx_id = db.begin_transaction()
-    result = db.delete_one_tx("accounts", {"name": "Alice"}, tx_id)
-    print(f"   ✓ delete_one_tx: Returns dict with deleted_count = {result['deleted_count']}")
-    db.rollback_transaction(tx_id)
+        # Test delete_one_tx API
+        tx_id = db.begin_transaction()
+        result = db.delete_one_tx("accounts", {"name": "Alice"}, tx_id)
+        print(f"   ✓ delete_one_tx: Returns dict with deleted_count = {result['deleted_count']}")
+        db.rollback_transaction(tx_id)
 
-    print("   ✓ All transaction helper APIs accessible from Python binding")
-    print("   ✓ Thin wrapper pattern validated (no business logic in binding)")
-    print("   Note: Transaction commit behavior is a separate core feature")
+        print("   ✓ All transaction helper APIs accessible from Python binding")
+        print("   ✓ Thin wrapper pattern validated (no business logic in binding)")
+        print("   Note: Transaction commit behavior is a separate core feature")
 
-    db.close()
-    cleanup(db_path)
-    print()
+        db.close()
+        print()
 
 def test_query_features():
-    """Test query features (distinct, aggregate, sort, projection)"""
+    """Test query features (distinct, count_by, aggregate, sort, projection)"""
     print("=" * 60)
     print("TEST 3: Query Features (Validated Working)")
     print("=" * 60)
 
-    db_path = "test_refactor_query.mlite"
-    cleanup(db_path)
-
-    db = IronBase(db_path)
-    coll = db.collection("products")
-
-    # Insert test data
-    docs = [
-        {"name": "Apple", "category": "fruit", "price": 1.5},
-        {"name": "Banana", "category": "fruit", "price": 0.8},
-        {"name": "Carrot", "category": "vegetable", "price": 1.2},
-        {"name": "Orange", "category": "fruit", "price": 2.0},
-    ]
-    coll.insert_many(docs)
-
-    # Test distinct
-    categories = coll.distinct("category")
-    print(f"✅ distinct('category'): {sorted(categories)}")
-    assert len(categories) == 2, "Should have 2 categories"
-
-    # Test aggregate
-    pipeline = [
-        {"$group": {"_id": "$category", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    results = coll.aggregate(pipeline)
-    print(f"✅ aggregate: {results}")
-    assert len(results) == 2, "Should have 2 groups"
-
-    # Test find with sort
-    sorted_docs = coll.find({}, sort=[("price", -1)], limit=2)
-    print(f"✅ find(sort by price desc, limit 2): {[d['name'] for d in sorted_docs]}")
-    assert sorted_docs[0]["name"] == "Orange", "First should be Orange (highest price)"
-
-    # Test find with projection
-    projected = coll.find({}, projection={"name": 1, "price": 1}, limit=2)
-    print(f"✅ find(projection): {list(projected[0].keys())}")
-    assert "category" not in projected[0], "category should not be in projection"
-
-    db.close()
-    cleanup(db_path)
-    print()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test_refactor_query.mlite")
+
+        db = IronBase(db_path)
+        coll = db.collection("products")
+
+        # Insert test data
+        docs = [
+            {"name": "Apple", "category": "fruit", "price": 1.5},
+            {"name": "Banana", "category": "fruit", "price": 0.8},
+            {"name": "Carrot", "category": "vegetable", "price": 1.2},
+            {"name": "Orange", "category": "fruit", "price": 2.0},
+        ]
+        coll.insert_many(docs)
+
+        # Test distinct
+        categories = coll.distinct("category")
+        print(f"✅ distinct('category'): {sorted(categories)}")
+        assert len(categories) == 2, "Should have 2 categories"
+
+        # Test count_by: (value, count) pairs, one per distinct JSON value
+        counts = coll.count_by("category")
+        print(f"✅ count_by('category'): {sorted(counts)}")
+        assert sorted(counts) == [("fruit", 3), ("vegetable", 1)]
+
+        # Values Python would merge as dict keys, and unhashable values
+        tags = db.collection("tags")
+        tags.insert_many([{"v": 1}, {"v": 1.0}, {"v": True}, {"v": [1, 2]}, {"v": [1, 2]}])
+        counts = tags.count_by("v")
+        print(f"✅ count_by('v'): {counts}")
+        assert len(counts) == 4, "1, 1.0, True and [1, 2] are counted separately"
+        assert ([1, 2], 2) in counts
+        assert sorted(type(v).__name__ for v, n in counts if n == 1) == ["bool", "float", "int"]
+
+        # Test aggregate
+        pipeline = [
+            {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}}
+        ]
+        results = coll.aggregate(pipeline)
+        print(f"✅ aggregate: {results}")
+        assert len(results) == 2, "Should have 2 groups"
+
+        # Test find with sort
+        sorted_docs = coll.find({}, sort=[("price", -1)], limit=2)
+        print(f"✅ find(sort by price desc, limit 2): {[d['name'] for d in sorted_docs]}")
+        assert sorted_docs[0]["name"] == "Orange", "First should be Orange (highest price)"
+
+        # Test find with projection
+        projected = coll.find({}, projection={"name": 1, "price": 1}, limit=2)
+        print(f"✅ find(projection): {list(projected[0].keys())}")
+        assert "category" not in projected[0], "category should not be in projection"
+
+        db.close()
+        print()
 
 def test_compaction():
     """Test compaction feature"""
@@ -144,42 +157,41 @@ def test_compaction():
     print("TEST 4: Compaction (Chunked Processing)")
     print("=" * 60)
 
-    db_path = "test_refactor_compact.mlite"
-    cleanup(db_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test_refactor_compact.mlite")
 
-    db = IronBase(db_path)
-    coll = db.collection("data")
+        db = IronBase(db_path)
+        coll = db.collection("data")
 
-    # Insert and delete to create tombstones
-    docs = [{"index": i, "data": f"Data {i}"} for i in range(100)]
-    result = coll.insert_many(docs)
-    print(f"✅ Inserted {result['inserted_count']} documents")
+        # Insert and delete to create tombstones
+        docs = [{"index": i, "data": f"Data {i}"} for i in range(100)]
+        result = coll.insert_many(docs)
+        print(f"✅ Inserted {result['inserted_count']} documents")
 
-    # Delete every other document
-    for i in range(0, 100, 2):
-        coll.delete_one({"index": i})
-    print(f"✅ Deleted 50 documents (created tombstones)")
+        # Delete every other document
+        result = coll.delete_many({"index": {"$in": list(range(0, 100, 2))}})
+        assert result["deleted_count"] == 50, f"Expected 50 deleted, got {result['deleted_count']}"
+        print(f"✅ Deleted 50 documents (created tombstones)")
 
-    # Compact
-    start = time.time()
-    stats = db.compact()
-    elapsed = time.time() - start
+        # Compact
+        start = time.time()
+        stats = db.compact()
+        elapsed = time.time() - start
 
-    print(f"✅ Compaction completed in {elapsed*1000:.2f}ms")
-    print(f"   Documents scanned: {stats['documents_scanned']}")
-    print(f"   Documents kept: {stats['documents_kept']}")
-    print(f"   Tombstones removed: {stats['tombstones_removed']}")
-    print(f"   Peak memory: {stats['peak_memory_mb']} MB")
-    print(f"   Space saved: {stats['space_saved']/(1024*1024):.2f} MB")
+        print(f"✅ Compaction completed in {elapsed*1000:.2f}ms")
+        print(f"   Documents scanned: {stats['documents_scanned']}")
+        print(f"   Documents kept: {stats['documents_kept']}")
+        print(f"   Tombstones removed: {stats['tombstones_removed']}")
+        print(f"   Peak memory: {stats['peak_memory_mb']} MB")
+        print(f"   Space saved: {stats['space_saved']/(1024*1024):.2f} MB")
 
-    # Verify
-    count = coll.count_documents()
-    assert count == 50, f"Expected 50, got {count}"
-    print(f"   Verification: ✓ Count = {count}")
+        # Verify
+        count = coll.count_documents()
+        assert count == 50, f"Expected 50, got {count}"
+        print(f"   Verification: ✓ Count = {count}")
 
-    db.close()
-    cleanup(db_path)
-    print()
+        db.close()
+        print()
 
 def main():
     print("\n" + "🧪" * 30)
@@ -199,7 +211,7 @@ def main():
         print("\n📊 Summary:")
         print("   ✓ insert_many: Batch insert working (Phase 1)")
         print("   ✓ Transaction helpers: All 3 methods working (Phase 3)")
-        print("   ✓ Query features: distinct, aggregate, sort, projection working")
+        print("   ✓ Query features: distinct, count_by, aggregate, sort, projection working")
         print("   ✓ Compaction: Chunked processing with memory tracking")
         print("\n🎉 Architecture refactoring: SUCCESS!")
         print("   - Thin wrapper pattern: ✓")
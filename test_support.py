@@ -0,0 +1,205 @@
+"""Helpers shared by the standalone test scripts
+
+Not a test suite itself: the scripts import it from the repository root.
+"""
+
+import importlib
+import json
+import multiprocessing
+import os
+import random
+import string
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.connection import wait
+
+# Generated data is a pure function of E2E_SEED, so runs are comparable
+SEED = int(os.environ.get("E2E_SEED", "0"))
+
+# Characters of random_string()
+CHARSET = string.ascii_letters + string.digits
+
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+# Files the engine keeps next to <stem>.mlite: <stem><suffix>
+DB_FILE_SUFFIXES = (".mlite", ".wal", ".wal.recycle", ".wal.tmp")
+
+# Persisted index files: <stem>.<index><suffix> and <stem>_<index>_<hash><suffix>
+INDEX_FILE_SUFFIXES = (".idx", ".idx.tmp")
+
+# Exit code of a simulate_power_failure() child whose phase 1 returned
+_POWER_FAILURE_EXIT = 9
+
+
+def cleanup(*paths):
+    """Remove test files, ignoring ones that do not exist"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def remove_database_files(db_path):
+    """Remove a database and its companion files in one directory pass
+
+    Only names the engine writes are matched: the database and WAL files
+    in DB_FILE_SUFFIXES and the index files in INDEX_FILE_SUFFIXES.
+    Anything else that shares the stem is left alone.
+    """
+    directory, name = os.path.split(db_path)
+    stem = os.path.splitext(name)[0]
+    owned = {stem + suffix for suffix in DB_FILE_SUFFIXES}
+    try:
+        with os.scandir(directory or ".") as entries:
+            for entry in entries:
+                if entry.name in owned or (
+                    entry.name.startswith((f"{stem}.", f"{stem}_"))
+                    and entry.name.endswith(INDEX_FILE_SUFFIXES)
+                ):
+                    os.remove(entry.path)
+    except FileNotFoundError:
+        pass
+
+
+def file_size(path):
+    """Size of path in bytes, 0 if it does not exist (one stat call)"""
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+
+def wal_stats(db):
+    """WAL sizes as tracked by the engine: logged bytes and the fsynced part
+
+    The .wal file is preallocated in zeroed segments, so its size on disk
+    does not tell how much has been logged. "size" is what has been logged
+    since the last clear, "durable_size" the fsynced part of it and
+    "allocated" the file size.
+    """
+    return json.loads(db.stats())["wal"]
+
+
+def wal_is_empty(path):
+    """True if the WAL file holds no entries (missing, truncated or recycled)
+
+    For when no open handle is left to ask wal_stats().
+    """
+    try:
+        with open(path, "rb") as f:
+            return not f.read().strip(b"\0")
+    except FileNotFoundError:
+        return True
+
+
+def simulate_power_failure(phase1, db_path, timeout=60):
+    """Run phase1(db_path) in a child process that then dies on the spot
+
+    The child leaves with os._exit(): no close(), no flush-on-drop and no
+    atexit handler runs, as in a power failure. Only the OS page cache
+    survives, which a real power cut would not guarantee. phase1's return
+    value is handed back to the caller; if phase1 raises, or the child
+    dies or hangs before it returns, RuntimeError carries the reason.
+    """
+    # Spawned, not forked: forking after the Rust extension is loaded is unsafe
+    context = multiprocessing.get_context("spawn")
+    sys.stdout.flush()  # keep our output ahead of the child's
+    reader, writer = context.Pipe(duplex=False)
+    child = context.Process(
+        target=_run_and_die, args=(importable(phase1), db_path, writer)
+    )
+    child.start()
+    writer.close()
+    try:
+        if not wait([reader, child.sentinel], timeout):
+            raise RuntimeError(f"{phase1.__name__} did not finish within {timeout}s")
+        try:
+            failed, result = reader.recv()
+        except EOFError:
+            child.join()
+            raise RuntimeError(
+                f"{phase1.__name__}: child died with exit code "
+                f"{child.exitcode} before reporting"
+            ) from None
+        child.join(timeout)
+    finally:
+        if child.is_alive():
+            child.kill()
+            child.join()
+        reader.close()
+
+    if failed:
+        raise RuntimeError(f"{phase1.__name__} failed in the child process:\n{result}")
+    if child.exitcode != _POWER_FAILURE_EXIT:
+        raise RuntimeError(
+            f"{phase1.__name__}: child exited with code {child.exitcode}, "
+            f"expected {_POWER_FAILURE_EXIT}"
+        )
+    return result
+
+
+def _run_and_die(phase1, db_path, writer):
+    """Child side of simulate_power_failure()"""
+    try:
+        failed, result = False, phase1(db_path)
+    except BaseException:
+        failed, result = True, traceback.format_exc()
+    writer.send((failed, result))
+    writer.close()
+    sys.stdout.flush()
+    os._exit(1 if failed else _POWER_FAILURE_EXIT)
+
+
+def e2e_workers():
+    """Most worker processes a suite may start to generate data in parallel
+
+    E2E_WORKERS sets it, one CPU each by default. run_all_tests.py sets it
+    to each suite's share of the CPUs, as it runs suites side by side.
+    """
+    return max(1, int(os.environ.get("E2E_WORKERS", os.cpu_count() or 1)))
+
+
+def spawn_pool(max_workers):
+    """ProcessPoolExecutor with spawned workers
+
+    Forking a process that has already loaded the Rust extension is not
+    safe. Submit functions through importable().
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def importable(func):
+    """func as imported by its module name, so spawned workers can load it
+
+    A function defined in a script run as __main__ pickles as
+    __main__.<name>, which a spawned worker resolves against its own
+    __main__ - not the script when run_all_tests.py runs it in-process.
+    """
+    if func.__module__ != "__main__":
+        return func
+    name = os.path.splitext(os.path.basename(func.__code__.co_filename))[0]
+    return getattr(importlib.import_module(name), func.__name__)
+
+
+def format_size(num_bytes):
+    """Format a byte count as a human readable size"""
+    # bit_length() gives log2 in one call; every 10 bits is one unit step
+    unit = min((int(num_bytes).bit_length() - 1) // 10, 4) if num_bytes >= 1 else 0
+    return f"{num_bytes / (1 << (unit * 10)):.2f} {_SIZE_UNITS[unit]}"
+
+
+def random_bytes(rng, n):
+    """n random bytes from rng (a random.Random or the random module)
+
+    Same stream as rng.randbytes(n), which needs Python 3.9.
+    """
+    return rng.getrandbits(n * 8).to_bytes(n, "little") if n else b""
+
+
+def random_string(length):
+    """Random string of CHARSET characters from the global generator"""
+    return "".join(random.choices(CHARSET, k=length))
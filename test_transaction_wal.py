@@ -1,15 +1,9 @@
 #!/usr/bin/env python3
 """Test WAL with ACTUAL transactions (not just insert_one)"""
 
-import os
 import sys
 from ironbase import IronBase
-
-def check_wal_size(wal_path):
-    """Get WAL file size"""
-    if os.path.exists(wal_path):
-        return os.path.getsize(wal_path)
-    return 0
+from test_support import cleanup, simulate_power_failure, wal_stats
 
 def test_transaction_wal_growth():
     """Test that WAL grows during transaction"""
@@ -17,9 +11,7 @@ def test_transaction_wal_growth():
     wal_path = "test_tx_wal.wal"
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print("=== Transaction WAL Growth Test ===\n")
 
@@ -31,7 +23,7 @@ def test_transaction_wal_growth():
     for i in range(10):
         col.insert_one({"value": i, "type": "baseline"})
 
-    wal_baseline = check_wal_size(wal_path)
+    wal_baseline = wal_stats(db)["size"]
     print(f"  WAL size after baseline inserts: {wal_baseline} bytes")
     print(f"  (Auto-commit uses WAL for durability, so non-zero is ok)")
 
@@ -40,7 +32,7 @@ def test_transaction_wal_growth():
     tx_id = db.begin_transaction()
     print(f"  Transaction ID: {tx_id}")
 
-    wal_after_begin = check_wal_size(wal_path)
+    wal_after_begin = wal_stats(db)["size"]
     print(f"  WAL size after BEGIN: {wal_after_begin} bytes")
 
     if wal_after_begin > 0:
@@ -53,17 +45,17 @@ def test_transaction_wal_growth():
 
     # Insert operation
     doc_id1 = col.insert_one({"value": 100, "type": "transaction"})
-    wal_after_op1 = check_wal_size(wal_path)
+    wal_after_op1 = wal_stats(db)["size"]
     print(f"  WAL after insert op: {wal_after_op1} bytes")
 
     # Update operation
     col.update_one({"_id": doc_id1}, {"$set": {"updated": True}})
-    wal_after_op2 = check_wal_size(wal_path)
+    wal_after_op2 = wal_stats(db)["size"]
     print(f"  WAL after update op: {wal_after_op2} bytes")
 
     # Delete operation
     col.delete_one({"value": 0})
-    wal_after_op3 = check_wal_size(wal_path)
+    wal_after_op3 = wal_stats(db)["size"]
     print(f"  WAL after delete op: {wal_after_op3} bytes")
 
     if wal_after_op3 >= wal_after_op2 >= wal_after_op1 >= wal_after_begin:
@@ -79,7 +71,7 @@ def test_transaction_wal_growth():
     print("\nStep 4: Commit transaction")
     db.commit_transaction(tx_id)
 
-    wal_after_commit = check_wal_size(wal_path)
+    wal_after_commit = wal_stats(db)["size"]
     print(f"  WAL size after COMMIT: {wal_after_commit} bytes")
 
     # WAL is cleared on explicit flush/checkpoint, not on commit
@@ -107,25 +99,13 @@ def test_transaction_wal_growth():
     db.close()
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     return True
 
 
-def test_transaction_crash_recovery():
-    """Test crash recovery with uncommitted transaction"""
-    db_path = "test_tx_crash.mlite"
-    wal_path = "test_tx_crash.wal"
-
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
-
-    print("\n\n=== Transaction Crash Recovery Test ===\n")
-
+def crash_recovery_phase1(db_path):
+    """test_transaction_crash_recovery phase 1: open transaction, then crash"""
     # Phase 1: Start transaction but DON'T commit
     print("Phase 1: Start transaction WITHOUT commit")
     db = IronBase(db_path)
@@ -143,25 +123,38 @@ def test_transaction_crash_recovery():
     col.insert_one({"value": 100, "committed": False})
     col.insert_one({"value": 200, "committed": False})
 
-    wal_size = check_wal_size(wal_path)
-    print(f"  WAL size with uncommitted tx: {wal_size} bytes")
+    wal = wal_stats(db)
+    print(f"  WAL size with uncommitted tx: {wal['size']} bytes")
 
-    if wal_size > 0:
+    # Inserts auto-commit, so the WAL already holds them synced
+    if wal["durable_size"] > 0:
         print("  ✓ WAL contains uncommitted transaction")
     else:
         print("  ✗ WAL empty (transaction not in WAL?)")
 
     # Simulate crash - DON'T commit, DON'T close
     print("\n  💥 SIMULATED CRASH (uncommitted transaction)")
-    del col
-    del db
+
+
+def test_transaction_crash_recovery():
+    """Test crash recovery with uncommitted transaction"""
+    db_path = "test_tx_crash.mlite"
+    wal_path = "test_tx_crash.wal"
+
+    # Cleanup
+    cleanup(db_path, wal_path)
+
+    print("\n\n=== Transaction Crash Recovery Test ===\n")
+
+    # Phase 1 runs in a child process that dies without close() or Drop
+    simulate_power_failure(crash_recovery_phase1, db_path)
 
     # Phase 2: Reopen and check recovery
     print("\nPhase 2: Reopen database")
     db2 = IronBase(db_path)
     col2 = db2.collection("test")
 
-    wal_after_reopen = check_wal_size(wal_path)
+    wal_after_reopen = wal_stats(db2)["size"]
     print(f"  WAL size after reopen: {wal_after_reopen} bytes")
 
     count_committed = col2.count_documents({"committed": True})
@@ -184,25 +177,13 @@ def test_transaction_crash_recovery():
     db2.close()
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     return True
 
 
-def test_transaction_commit_recovery():
-    """Test recovery of COMMITTED transaction"""
-    db_path = "test_tx_commit.mlite"
-    wal_path = "test_tx_commit.wal"
-
-    # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
-
-    print("\n\n=== Committed Transaction Recovery Test ===\n")
-
+def commit_recovery_phase1(db_path):
+    """test_transaction_commit_recovery phase 1: commit, then crash"""
     # Phase 1: Commit transaction, crash before flush
     print("Phase 1: Commit transaction, crash before final flush")
     db = IronBase(db_path)
@@ -216,13 +197,25 @@ def test_transaction_commit_recovery():
 
     print(f"  Transaction committed (ID: {tx_id})")
 
-    wal_after_commit = check_wal_size(wal_path)
-    print(f"  WAL size after commit: {wal_after_commit} bytes")
+    wal = wal_stats(db)
+    print(f"  WAL size after commit: {wal['size']} bytes ({wal['durable_size']} synced)")
 
     # Don't close - simulate crash
     print("\n  💥 SIMULATED CRASH (after commit, before full flush)")
-    del col
-    del db
+
+
+def test_transaction_commit_recovery():
+    """Test recovery of COMMITTED transaction"""
+    db_path = "test_tx_commit.mlite"
+    wal_path = "test_tx_commit.wal"
+
+    # Cleanup
+    cleanup(db_path, wal_path)
+
+    print("\n\n=== Committed Transaction Recovery Test ===\n")
+
+    # Phase 1 runs in a child process that dies without close() or Drop
+    simulate_power_failure(commit_recovery_phase1, db_path)
 
     # Phase 2: Recovery
     print("\nPhase 2: Reopen and verify committed data")
@@ -241,9 +234,7 @@ def test_transaction_commit_recovery():
     db2.close()
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     return True
 
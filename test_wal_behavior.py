@@ -1,16 +1,20 @@
 #!/usr/bin/env python3
 """Detailed WAL behavior analysis"""
 
-import os
 import time
 from ironbase import IronBase
+from test_support import cleanup, file_size, wal_is_empty, wal_stats
 
-def check_wal_size(wal_path):
-    """Get WAL file size"""
-    if os.path.exists(wal_path):
-        size = os.path.getsize(wal_path)
-        return size
-    return 0
+def check_wal_size(wal_path, db=None):
+    """Get WAL size: logged bytes while db is open, else the file size
+
+    The .wal file is preallocated in zeroed segments, so its size on disk
+    only shows the allocation; the engine's own count comes from stats().
+    Without a db, a file that holds no entries counts as 0.
+    """
+    if db is not None:
+        return wal_stats(db)["size"]
+    return 0 if wal_is_empty(wal_path) else file_size(wal_path)
 
 def test_wal_timing():
     """Test EXACTLY when WAL is written and cleared"""
@@ -18,9 +22,7 @@ def test_wal_timing():
     wal_path = "test_wal_timing.wal"
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print("=== DETAILED WAL TIMING TEST ===\n")
 
@@ -28,12 +30,12 @@ def test_wal_timing():
     print("Step 1: Open database")
     db = IronBase(db_path)
     col = db.collection("test")
-    print(f"  WAL size after open: {check_wal_size(wal_path)} bytes\n")
+    print(f"  WAL size after open: {check_wal_size(wal_path, db)} bytes\n")
 
     # Insert ONE document
     print("Step 2: Insert ONE document")
     col.insert_one({"value": 1})
-    wal_after_insert = check_wal_size(wal_path)
+    wal_after_insert = check_wal_size(wal_path, db)
     print(f"  WAL size IMMEDIATELY after insert: {wal_after_insert} bytes")
 
     if wal_after_insert > 0:
@@ -43,12 +45,12 @@ def test_wal_timing():
 
     # Wait a bit
     time.sleep(0.1)
-    print(f"  WAL size after 100ms: {check_wal_size(wal_path)} bytes\n")
+    print(f"  WAL size after 100ms: {check_wal_size(wal_path, db)} bytes\n")
 
     # Insert another document WITHOUT any explicit flush
     print("Step 3: Insert SECOND document (no explicit flush)")
     col.insert_one({"value": 2})
-    wal_after_insert2 = check_wal_size(wal_path)
+    wal_after_insert2 = check_wal_size(wal_path, db)
     print(f"  WAL size after 2nd insert: {wal_after_insert2} bytes")
 
     if wal_after_insert2 > wal_after_insert:
@@ -61,12 +63,12 @@ def test_wal_timing():
     print("Step 4: Count documents (read operation)")
     count = col.count_documents({})
     print(f"  Document count: {count}")
-    print(f"  WAL size after count: {check_wal_size(wal_path)} bytes\n")
+    print(f"  WAL size after count: {check_wal_size(wal_path, db)} bytes\n")
 
     # Don't close, don't checkpoint - just delete collection reference
     print("Step 5: Delete collection reference (no explicit close)")
     del col
-    wal_after_del_col = check_wal_size(wal_path)
+    wal_after_del_col = check_wal_size(wal_path, db)
     print(f"  WAL size after 'del col': {wal_after_del_col} bytes")
 
     if wal_after_del_col == 0:
@@ -95,14 +97,12 @@ def test_wal_timing():
     else:
         print(f"  ✗ Expected 2, got {count2}")
 
-    print(f"  WAL size after reopen: {check_wal_size(wal_path)} bytes")
+    print(f"  WAL size after reopen: {check_wal_size(wal_path, db2)} bytes")
 
     db2.close()
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print("\n=== Test Complete ===")
 
@@ -113,9 +113,7 @@ def test_without_del():
     wal_path = "test_wal_nodelete.wal"
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
     print("\n\n=== TEST WITHOUT DELETING REFERENCES ===\n")
 
@@ -124,22 +122,20 @@ def test_without_del():
     col = db.collection("test")
 
     col.insert_one({"value": 1})
-    print(f"  WAL after insert 1: {check_wal_size(wal_path)} bytes")
+    print(f"  WAL after insert 1: {check_wal_size(wal_path, db)} bytes")
 
     col.insert_one({"value": 2})
-    print(f"  WAL after insert 2: {check_wal_size(wal_path)} bytes")
+    print(f"  WAL after insert 2: {check_wal_size(wal_path, db)} bytes")
 
     col.insert_one({"value": 3})
-    print(f"  WAL after insert 3: {check_wal_size(wal_path)} bytes")
+    print(f"  WAL after insert 3: {check_wal_size(wal_path, db)} bytes")
 
     print("\nStep 2: Explicit close()")
     db.close()
-    print(f"  WAL after close(): {check_wal_size(wal_path)} bytes")
+    print(f"  WAL after close(): {check_wal_size(wal_path, db)} bytes")
 
     # Cleanup
-    for f in [db_path, wal_path]:
-        if os.path.exists(f):
-            os.remove(f)
+    cleanup(db_path, wal_path)
 
 
 if __name__ == "__main__":